@@ -0,0 +1,109 @@
+import os
+import math
+import logging
+
+from fastapi import HTTPException
+
+import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 대기열(빈 워커를 기다리는 이미지) 최대 길이, 초과시 429 (기본: 워커 수 x 4)
+MAX_QUEUE = int(os.environ.get("QFIT_MAX_QUEUE", 0))
+# 클라이언트 하나가 동시에 보낼 수 있는 처리 요청 수 (일괄 업로드 한 건도 요청 하나)
+MAX_PER_CLIENT = int(os.environ.get("QFIT_MAX_PER_CLIENT", 2))
+# 대기열이 이 길이 이상이면 빠른 샷 탐색("fast")으로 처리 (기본: 워커 수)
+FAST_SEARCH_QUEUE = int(os.environ.get("QFIT_FAST_SEARCH_QUEUE", 0))
+# 프록시(ngrok 등) 뒤에서는 X-Forwarded-For의 첫 주소로 클라이언트를 구분
+TRUST_FORWARDED = os.environ.get("QFIT_TRUST_FORWARDED", "0") == "1"
+
+MAX_RETRY_AFTER = 300  # Retry-After 최대값(초)
+
+
+def client_key(request):
+    if TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+#----------------------------------------------------------------------------#
+# 분석 요청 수용 제어 (워커 풀 앞의 대기열 제한)
+# - 대기열이 가득 찼거나 클라이언트별 동시 요청 수를 넘으면 바로 429 + Retry-After
+# - 대기열이 길면 빠른 샷 탐색 설정으로 처리하여 대기열을 빨리 비움
+# 사용: ticket = admission.acquire(request) -> 처리 -> admission.release(ticket)
+# (release는 ticket 하나당 한 번만 호출)
+#----------------------------------------------------------------------------#
+class AdmissionController:
+    def __init__(self, pool, max_queue=MAX_QUEUE, max_per_client=MAX_PER_CLIENT, fast_search_queue=FAST_SEARCH_QUEUE):
+        self.pool = pool
+        self.max_queue = max_queue or pool.size * 4
+        self.max_per_client = max_per_client
+        self.fast_search_queue = fast_search_queue or pool.size
+        self.per_client = {}   # {client: 처리중인 요청 수}
+        self.inflight = 0      # 받아들인 뒤 아직 끝나지 않은 이미지 수 (본문 수신중 ~ 워커 실행중)
+
+    @property
+    def queue_depth(self):
+        # 워커 풀에 제출되기 전(본문 수신/해시 계산중)인 이미지도 대기열로 센다
+        return self._queue_depth_with(0)
+
+    def _queue_depth_with(self, count):
+        # count장을 더 받았을 때의 대기열 길이
+        return max(self.pool.queued, self.inflight + count - self.pool.size)
+
+    def retry_after(self):
+        # 대기열이 워커 수만큼씩 (작업 한 건 평균 실행시간마다) 빠진다고 보고 자리가 날 때까지 걸리는 시간
+        waves = (self.queue_depth + 1) / self.pool.size
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(waves * self.pool.job_seconds)))
+
+    def _reject(self, reason, detail):
+        metrics.admission_rejected.labels(reason).inc()
+        retry_after = self.retry_after()
+        logger.info(f"요청 거절({reason}): {detail} (Retry-After: {retry_after}s)")
+        raise HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+
+    def acquire(self, request, count=1):
+        """
+        요청 하나(이미지 count장)를 처리할 자리가 있으면 ticket을 반환하고, 없으면 429 HTTPException을 발생시킵니다.
+        """
+        client = client_key(request)
+        if self.per_client.get(client, 0) + 1 > self.max_per_client:
+            self._reject("client_limit", f"동시에 보낼 수 있는 처리 요청은 {self.max_per_client}건입니다.")
+        if self._queue_depth_with(count) > self.max_queue:
+            self._reject("queue_full", "처리 대기열이 가득 찼습니다. 잠시 후 다시 시도해 주세요.")
+
+        self.per_client[client] = self.per_client.get(client, 0) + 1
+        self.inflight += count
+        return {"client": client, "count": count}
+
+    def resize(self, ticket, count):
+        """
+        본문을 받은 뒤 요청의 이미지 수가 정해지면(일괄 업로드) 자리를 늘립니다. 대기열을 넘으면 429.
+        """
+        extra = count - ticket["count"]
+        if extra > 0 and self._queue_depth_with(extra) > self.max_queue:
+            self._reject("queue_full", "처리 대기열이 가득 찼습니다. 잠시 후 다시 시도해 주세요.")
+        self.inflight += extra
+        ticket["count"] = count
+
+    def release(self, ticket):
+        client = ticket["client"]
+        self.inflight -= ticket["count"]
+        remaining = self.per_client.get(client, 0) - 1
+        if remaining > 0:
+            self.per_client[client] = remaining
+        else:
+            self.per_client.pop(client, None)
+
+    def search_mode(self):
+        # 지금 제출하는 이미지에 쓸 샷 탐색 설정
+        return "fast" if self.queue_depth >= self.fast_search_queue else "full"
+
+    def status(self):
+        return {"max_queue": self.max_queue, "max_per_client": self.max_per_client,
+                "fast_search_queue": self.fast_search_queue, "queue_depth": self.queue_depth,
+                "inflight": self.inflight, "clients": len(self.per_client),
+                "search_mode": self.search_mode()}
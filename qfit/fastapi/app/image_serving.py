@@ -0,0 +1,202 @@
+import os
+import base64
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import cv2
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# final_image 파일은 {current_time}_{idx}_ 접두어가 붙어 내용이 바뀌지 않으므로 1년간 캐시
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 업로드 응답 data 항목 중 앱이 화면에 그리는 결과 이미지
+RESULT_IMAGE_KEYS = ("best_shot", "front_view", "power_gauge")
+
+# 변환 이미지(variant) 설정
+# - 요청한 너비는 아래 단계 중 그 이상인 가장 작은 값으로 올림 (캐시 파일 수 제한, 원본보다 크게 만들지 않음)
+# - 변환 결과는 원본 폴더의 variants 하위 폴더에 {원본 이름}.{너비|full}.{형식} 으로 저장
+#   (파일명이 원본과 같은 {current_time}_{idx}_ 접두어로 시작하므로 보관 정책으로 원본과 함께 삭제됨)
+VARIANT_WIDTHS = (160, 320, 480, 640, 960, 1280)
+VARIANT_FORMATS = {  # 형식: (확장자, cv2.imencode 옵션)
+    "webp": (".webp", [cv2.IMWRITE_WEBP_QUALITY, 80]),
+    "jpeg": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 85]),
+    "png": (".png", [cv2.IMWRITE_PNG_COMPRESSION, 3]),
+}
+# 인코딩 전용 스레드 풀 (이벤트 루프와 기본 스레드 풀을 막지 않음)
+_variant_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("QFIT_IMAGE_THREADS", 2)),
+                                       thread_name_prefix="qfit-image")
+_variant_tasks = {}  # {변환 파일 경로: 인코딩 중인 Future} (같은 변환의 동시 요청은 한 번만 인코딩)
+
+
+#----------------------------------------------------------------------------#
+# 조건부 요청 확인 (If-None-Match 우선, 없으면 If-Modified-Since)
+#----------------------------------------------------------------------------#
+def is_not_modified(response_headers, request_headers):
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = response_headers["etag"]
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime(response_headers["last-modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+#----------------------------------------------------------------------------#
+# 결과 이미지 파일 응답 (모든 이미지 제공 경로가 이 함수를 사용)
+# - ETag / Last-Modified / Cache-Control(immutable) 헤더
+# - If-None-Match / If-Modified-Since 일치시 본문 없이 304
+# - Range 요청(부분 전송), If-Range 처리는 FileResponse가 담당
+# - 본문은 FileResponse가 64KB 단위로 읽어 전송 (sendfile 아님)
+#   FileResponse는 ASGI 서버가 http.response.pathsend 확장을 지원할 때만 경로를 넘겨 서버가 직접 보내는데,
+#   이 서버를 실행하는 uvicorn은 이 확장을 지원하지 않음 (zero-copy 전송 대신 캐시/304로 전송량을 줄임)
+#----------------------------------------------------------------------------#
+def image_file_response(request, image_name, locate):
+    # 하위 폴더나 상위 경로(../) 접근 차단
+    if os.path.basename(image_name) != image_name or image_name.startswith("."):
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+
+    image_path = locate(image_name)  # 파일명 -> 저장 경로 (샤딩된 폴더)
+    try:
+        stat_result = os.stat(image_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+
+    response = FileResponse(image_path, stat_result=stat_result, headers={"cache-control": CACHE_CONTROL})
+    if is_not_modified(response.headers, request.headers):
+        headers = {name: response.headers[name] for name in ("etag", "last-modified", "cache-control")}
+        return Response(status_code=304, headers=headers)
+    return response
+
+
+#----------------------------------------------------------------------------#
+# 업로드 응답 한 번으로 결과 화면을 그릴 수 있게 결과 이미지를 함께 보냄
+# - preload_links: 응답 헤더 Link(rel=preload)로 이미지 URL을 알려, 클라이언트/프록시가
+#   JSON을 파싱하기 전에 이미지 요청을 시작할 수 있게 함 (HTTP/2 push 대신 103/preload 방식)
+#   (data 항목의 image_urls를 그대로 사용해 본문과 같은 주소를 알림)
+# - embed_images: 이미지 파일을 base64 data URI로 data 항목에 넣음 (추가 요청 없음)
+#----------------------------------------------------------------------------#
+def preload_links(data):
+    links = []
+    for item in data:
+        for url in item.get("image_urls", {}).values():
+            links.append(f"<{url}>; rel=preload; as=image")
+    return ", ".join(links)
+
+
+def embed_images(data, locate):
+    # 파일 읽기가 있으므로 스레드에서 호출 (asyncio.to_thread)
+    for item in data:
+        images = {}
+        for key in RESULT_IMAGE_KEYS:
+            if not item.get(key):
+                continue
+            try:
+                with open(locate(os.path.basename(item[key])), "rb") as f:
+                    images[key] = "data:image/png;base64," + base64.b64encode(f.read()).decode("ascii")
+            except FileNotFoundError:
+                logger.warning(f"결과 이미지 없음: {item[key]}")
+        item["images_base64"] = images
+    return data
+
+
+#----------------------------------------------------------------------------#
+# 해상도/형식 변환 이미지 제공 (/images/{name}?w=480&format=webp)
+# - format이 없으면 Accept 헤더로 결정 (image/webp를 받으면 webp, 아니면 원본 형식)
+# - 처음 요청시 스레드 풀에서 변환/인코딩 후 디스크에 저장하고, 이후에는 저장된 파일을 그대로 전송
+#   (캐시 헤더, 304, Range 처리는 원본과 같이 image_file_response가 담당)
+#----------------------------------------------------------------------------#
+def negotiate_format(image_format, accept):
+    # 반환: VARIANT_FORMATS의 키 또는 None(원본 형식 그대로)
+    if image_format is not None:
+        image_format = image_format.lower().replace("jpg", "jpeg")
+        if image_format not in VARIANT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format은 {', '.join(VARIANT_FORMATS)} 중 하나여야 합니다.")
+        return image_format
+    if "image/webp" in (accept or ""):
+        return "webp"
+    return None
+
+
+def variant_width(width):
+    # 요청 너비 -> 캐시 단계 너비 (None: 원본 너비)
+    if width is None:
+        return None
+    if width <= 0:
+        raise HTTPException(status_code=400, detail="w는 1 이상이어야 합니다.")
+    return next((step for step in VARIANT_WIDTHS if step >= width), None)
+
+
+def encode_variant(source_path, variant_path, width, image_format):
+    image = cv2.imread(source_path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"이미지를 읽을 수 없음: {source_path}")
+    if width is not None and width < image.shape[1]:
+        height = max(1, round(image.shape[0] * width / image.shape[1]))
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    if image_format == "jpeg" and image.ndim == 3 and image.shape[2] == 4:
+        # JPEG는 투명도가 없으므로 흰 배경에 합성
+        alpha = image[:, :, 3:4].astype(np.uint16)
+        image = ((image[:, :, :3] * alpha + 255 * (255 - alpha) + 127) // 255).astype(np.uint8)
+
+    ext, params = VARIANT_FORMATS[image_format]
+    ok, encoded = cv2.imencode(ext, image, params)
+    if not ok:
+        raise ValueError(f"이미지 인코딩 실패: {variant_path}")
+    os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+    temp_path = f"{variant_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(encoded.tobytes())
+    os.replace(temp_path, variant_path)  # 전송 중인 요청이 덜 쓴 파일을 읽지 않도록 완성 후 교체
+    logger.info(f"변환 이미지 생성: {os.path.basename(variant_path)} ({len(encoded)} bytes)")
+
+
+async def variant_file_response(request, image_name, locate, width=None, image_format=None):
+    negotiated = image_format is None
+    image_format = negotiate_format(image_format, request.headers.get("accept"))
+    width = variant_width(width)
+    if image_format is None and width is None:
+        response = image_file_response(request, image_name, locate)
+    else:
+        if os.path.basename(image_name) != image_name or image_name.startswith("."):
+            raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+        source_path = locate(image_name)
+        if not os.path.exists(source_path):
+            raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+
+        stem, ext = os.path.splitext(image_name)
+        image_format = image_format or next((key for key, (variant_ext, _) in VARIANT_FORMATS.items()
+                                             if variant_ext == ext.lower().replace(".jpeg", ".jpg")), "png")
+        variant_name = f"{stem}.{width or 'full'}{VARIANT_FORMATS[image_format][0]}"
+        variant_path = os.path.join(os.path.dirname(source_path), "variants", variant_name)
+
+        if not os.path.exists(variant_path):
+            task = _variant_tasks.get(variant_path)
+            if task is None:
+                loop = asyncio.get_running_loop()
+                task = loop.run_in_executor(_variant_executor, encode_variant, source_path, variant_path,
+                                            width, image_format)
+                _variant_tasks[variant_path] = task
+                task.add_done_callback(lambda _: _variant_tasks.pop(variant_path, None))
+            try:
+                await asyncio.shield(task)
+            except ValueError as e:
+                logger.error(f"변환 이미지 생성 실패: {e}")
+                raise HTTPException(status_code=415, detail="변환할 수 없는 이미지입니다.")
+
+        response = image_file_response(request, variant_name, lambda _: variant_path)
+    if negotiated:
+        response.headers["vary"] = "Accept"  # Accept에 따라 형식이 달라지므로 캐시가 구분하도록
+    return response
@@ -0,0 +1,361 @@
+import os
+import time
+import shutil
+import asyncio
+import logging
+import threading
+import multiprocessing
+
+import result_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 서버 종료시 진행중인 작업이 끝나기를 기다리는 최대 시간(초)
+DRAIN_TIMEOUT = float(os.environ.get("QFIT_DRAIN_TIMEOUT", 60))
+# 위 시간이 지나 취소한 작업이 멈추기를 기다리는 최대 시간(초), 초과시 워커 프로세스 강제 종료
+# (워커는 단계 전환과 샷 탐색의 각도마다 취소 여부를 확인하므로 보통 1초 안에 멈춤)
+DRAIN_CANCEL_TIMEOUT = float(os.environ.get("QFIT_DRAIN_CANCEL_TIMEOUT", 10))
+# 메모리에 보관하는 완료된 작업 수 (초과시 오래된 작업부터 삭제)
+MAX_FINISHED_JOBS = int(os.environ.get("QFIT_MAX_FINISHED_JOBS", 1000))
+
+# 작업 단계: queued -> topview -> search -> render -> done (실패: failed, 취소: cancelled)
+FINISHED_STAGES = ("done", "failed", "cancelled")
+# 진행 이벤트 스트림(/jobs/{job_id}/events)에 아무 이벤트가 없을 때 keepalive를 보내는 간격(초)
+EVENT_KEEPALIVE = 15
+
+
+class JobCancelled(Exception):
+    pass
+
+
+#----------------------------------------------------------------------------#
+# 워커 프로세스에서 실행: 이미지 한 장을 품질 검사 -> 탑뷰 -> 샷 탐색 -> 결과 이미지 생성
+# 단계가 바뀌거나 중간 결과(테이블/공 검출, 후보 샷 갱신)가 나올 때마다 events 큐로
+# (job_id, 이벤트명, data)를 보내고, cancelled에 job_id가 있으면 중단
+# (취소 여부는 이벤트마다, 샷 탐색 중 각도마다, 결과 게시 직전에 확인)
+# 결과 파일은 기존 규칙({current_time}_{idx}_{name}{ext})으로 final_image 폴더에 저장
+# (업로드 원본 보관은 서버에서 별도로 실행)
+# search_mode: 샷 탐색 설정 ("full", 서버 대기열이 길 때 "fast")
+# render_mode: 결과 출력 방식 ("image", 결과 이미지 없이 궤적/충돌 지점만 "vector")
+#----------------------------------------------------------------------------#
+def run_job(job_id, data, image_name, image_hash, events, cancelled, search_mode="full", render_mode="image"):
+    import upload_image_check
+
+    def check_cancelled():
+        if job_id in cancelled:
+            raise JobCancelled()
+
+    def on_event(name, data):
+        check_cancelled()
+        events.put((job_id, name, data))
+
+    def on_stage(stage):
+        on_event("stage", {"stage": stage})
+
+    current_time, idx = job_id.split("_")
+
+    try:
+        on_stage("topview")
+        upload_image = upload_image_check.original_image_path(image_name, current_time, idx)
+        analysis, rejection = upload_image_check.analyze_image_data(data, image_name, on_stage=on_stage,
+                                                                    search_mode=search_mode, on_event=on_event,
+                                                                    render_mode=render_mode, on_progress=check_cancelled)
+        if rejection is not None:
+            upload_image_check.record_rejection(rejection, current_time, idx, upload_image, image_hash)
+            return {"stage": "failed", **rejection}
+
+        # 취소된 작업은 결과를 게시하지 않음
+        check_cancelled()
+        # 작업별 작업공간에 저장 후 final_image 폴더로 게시 (동시에 실행되는 작업끼리 결과 파일이 섞이지 않음)
+        workspace = upload_image_check.make_workspace(current_time, idx)
+        try:
+            upload_image_check.publish_results(analysis, workspace, current_time, idx, upload_image, image_hash)
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+        logger.info(f"==== [ 작업 완료: {job_id} {analysis['timings']} ] ====")
+
+        return {"stage": "done", "result": upload_image_check.shot_result_json(analysis)}
+    except JobCancelled:
+        logger.info(f"==== [ 작업 취소: {job_id} ] ====")
+        return {"stage": "cancelled"}
+
+
+#----------------------------------------------------------------------------#
+# 비동기 작업 관리: 제출 즉시 job_id 반환, 워커 풀에서 백그라운드 실행, 상태 조회/취소,
+# 진행 이벤트 구독, 서버 종료시 진행중인 작업 마무리(drain)
+# 작업별 이벤트: accepted -> stage(topview) -> table_found -> balls_detected -> stage(search)
+#               -> search_improved ... -> stage(render) -> done / failed / cancelled
+#----------------------------------------------------------------------------#
+class JobManager:
+    def __init__(self, pool):
+        self.pool = pool
+        self.jobs = {}        # {job_id: 작업 상태 dict}
+        self.tasks = {}       # {job_id: asyncio.Task}
+        self._futures = {}    # {job_id: 워커 future} (워커가 가져가기 전이면 취소 가능)
+        self.history = {}     # {job_id: [이벤트 dict]} (늦게 구독한 클라이언트에게 처음부터 다시 보냄)
+        self._subscribers = {}  # {job_id: {asyncio.Queue}}
+        self.accepting = False
+        self.dedup_stats = {"requests": 0, "idempotency_hits": 0, "inflight_hits": 0, "store_hits": 0}
+        self._by_hash = {}    # {content_hash: job_id}
+        self._by_key = {}     # {Idempotency-Key: job_id}
+        self._manager = None
+        self._events = None
+        self._cancelled = None
+        self._pump = None
+        self._loop = None
+
+    def start(self):
+        # 워커 -> 서버 단계 알림 큐와 취소 목록은 Manager 프로세스를 통해 공유
+        self._manager = multiprocessing.get_context("spawn").Manager()
+        self._events = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._loop = asyncio.get_running_loop()
+        self._pump = threading.Thread(target=self._pump_events, name="job-events", daemon=True)
+        self._pump.start()
+        self.accepting = True
+
+    def _pump_events(self):
+        while True:
+            item = self._events.get()
+            if item is None:
+                break
+            self._loop.call_soon_threadsafe(self._on_worker_event, *item)
+
+    def _on_worker_event(self, job_id, name, data):
+        if name == "stage":
+            self._update(job_id, data["stage"])
+            return
+        job = self.jobs.get(job_id)
+        if job is None or job["stage"] in FINISHED_STAGES:
+            return
+        if name == "search_improved":
+            job["provisional"] = data  # 상태 조회(GET /jobs/{job_id})로도 현재 후보 샷을 볼 수 있게
+        self._publish(job_id, name, data)
+
+    def _update(self, job_id, stage, **fields):
+        job = self.jobs.get(job_id)
+        # 완료된 작업에 늦게 도착한 단계 알림은 무시
+        if job is None or job["stage"] in FINISHED_STAGES or (job["stage"] == stage and not fields):
+            return
+        job["stage"] = stage
+        job["updated_at"] = time.time()
+        job.update(fields)
+        if stage in FINISHED_STAGES:
+            job.pop("provisional", None)
+            self._publish(job_id, stage, job)
+            # 완료 후에는 마지막(완료) 이벤트만 남김 (후보 샷 궤적 등을 메모리에 쌓지 않음)
+            self.history[job_id] = self.history[job_id][-1:]
+        else:
+            self._publish(job_id, "stage", {"stage": stage})
+
+    def _publish(self, job_id, name, data):
+        history = self.history.setdefault(job_id, [])
+        event = {"id": len(history) + 1, "event": name, "data": data}
+        history.append(event)
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    async def events(self, job_id, after=0, keepalive=EVENT_KEEPALIVE):
+        """
+        작업의 진행 이벤트를 순서대로 내보냅니다. (id가 after보다 큰 이벤트부터, 완료 이벤트에서 종료)
+        keepalive초 동안 새 이벤트가 없으면 None을 내보냅니다. (연결 유지용)
+        """
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            last_id = after
+            for event in list(self.history.get(job_id, [])):
+                if event["id"] > last_id:
+                    last_id = event["id"]
+                    yield event
+                    if event["event"] in FINISHED_STAGES:
+                        return
+
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            if job["stage"] in FINISHED_STAGES:
+                if self.history.get(job_id):
+                    return  # 완료 이벤트까지 이미 보낸 경우 (Last-Event-ID 재연결)
+                # 결과 DB에서 가져온 완료 작업 등 이벤트 기록이 없는 경우
+                yield {"id": last_id + 1, "event": job["stage"], "data": job}
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] <= last_id:
+                    continue
+                last_id = event["id"]
+                yield event
+                if event["event"] in FINISHED_STAGES:
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    async def new_job_id(self):
+        # final_image 파일명 규칙({current_time}_{idx})과 같은 형식 -> /image_info/{job_id}로도 조회 가능
+        # 순번은 결과 DB에서 예약 (폴더 처리 요청/다른 서버 프로세스와 겹치지 않음, DB 호출은 스레드에서)
+        return await asyncio.to_thread(result_store.allocate_prefix)
+
+    def submit(self, job_id, data, image_name, image_hash=None, idempotency_key=None, search_mode="full",
+               render_mode="image"):
+        now = time.time()
+        self.jobs[job_id] = {"job_id": job_id, "stage": "queued", "created_at": now, "updated_at": now,
+                             "search_mode": search_mode, "render_mode": render_mode}
+        # 빠른 탐색/vector 결과는 같은 이미지 재제출시 재사용하지 않음 (다시 full, image로 처리)
+        reusable = search_mode == "full" and render_mode == "image"
+        self._remember(job_id, image_hash if reusable else None, idempotency_key)
+        self._publish(job_id, "accepted", {"job_id": job_id, "search_mode": search_mode, "render_mode": render_mode})
+        self.tasks[job_id] = asyncio.create_task(self._run(job_id, data, image_name, image_hash, search_mode,
+                                                           render_mode))
+        self._forget_old_jobs()
+        return self.jobs[job_id]
+
+    def _remember(self, job_id, image_hash, idempotency_key):
+        if image_hash:
+            self._by_hash[image_hash] = job_id
+        if idempotency_key:
+            self._by_key[idempotency_key] = job_id
+
+    #------------------------------------------------------------------------#
+    # 중복 업로드 확인: 같은 Idempotency-Key -> 같은 이미지(내용 해시)로 진행중/완료된 작업 -> 결과 DB 순서
+    # 찾으면 해당 작업 상태 dict, 없으면 None (새로 처리해야 함)
+    # (결과 DB 조회는 스레드에서 실행: 게시/정리 작업이 DB에 쓰는 동안에도 이벤트 루프를 막지 않음)
+    # None을 받은 호출자가 submit 전에 await하면 (job_id 예약 등) 그 뒤 find_inflight()로 다시 확인해야
+    # 같은 이미지가 두 번 제출되지 않음
+    #------------------------------------------------------------------------#
+    async def find_duplicate(self, image_hash, idempotency_key=None, render_mode="image"):
+        job = self.find_by_key(idempotency_key)
+        if job is not None:
+            return job
+        self.dedup_stats["requests"] += 1
+
+        job = self.find_inflight(image_hash, idempotency_key)
+        # 결과 DB에는 궤적을 저장하지 않으므로 vector 요청은 다시 처리
+        if job is None and render_mode == "image":
+            stored = await asyncio.to_thread(result_store.find_by_hash, image_hash)
+            if stored is not None:
+                self.dedup_stats["store_hits"] += 1
+                return self._add_stored_result(stored, idempotency_key)
+            # DB를 조회하는 동안 같은 이미지로 제출된 작업
+            job = self.find_inflight(image_hash, idempotency_key)
+        return job
+
+    def find_inflight(self, image_hash, idempotency_key):
+        # 같은 이미지로 진행중이거나 완료된 작업 (실패/취소된 작업은 다시 처리)
+        job_id = self._by_hash.get(image_hash)
+        if job_id not in self.jobs or self.jobs[job_id]["stage"] in ("failed", "cancelled"):
+            return None
+        self.dedup_stats["inflight_hits"] += 1
+        self._remember(job_id, None, idempotency_key)
+        return self.jobs[job_id]
+
+    def find_by_key(self, idempotency_key):
+        # 같은 Idempotency-Key로 제출된 작업 (재시도 요청은 본문을 받기 전에 바로 응답)
+        job_id = self._by_key.get(idempotency_key) if idempotency_key else None
+        if job_id not in self.jobs:
+            return None
+        self.dedup_stats["requests"] += 1
+        self.dedup_stats["idempotency_hits"] += 1
+        return self.jobs[job_id]
+
+    def _add_stored_result(self, stored, idempotency_key):
+        # 결과 DB에 있는 완료 결과를 완료된 작업으로 등록 (job_id = 결과 prefix)
+        job_id = stored["prefix"]
+        if job_id not in self.jobs:
+            self.jobs[job_id] = {
+                "job_id": job_id, "stage": "done", "created_at": stored["created_at"], "updated_at": time.time(),
+                "result": result_store.to_shot_result(stored),
+            }
+            self._forget_old_jobs()
+        self._remember(job_id, stored["content_hash"], idempotency_key)
+        return self.jobs[job_id]
+
+    def dedup_hit_rate(self):
+        hits = self.dedup_stats["idempotency_hits"] + self.dedup_stats["inflight_hits"] + self.dedup_stats["store_hits"]
+        return round(hits / self.dedup_stats["requests"], 4) if self.dedup_stats["requests"] else 0.0
+
+    async def _run(self, job_id, data, image_name, image_hash, search_mode, render_mode):
+        try:
+            if job_id in self._cancelled:
+                self._update(job_id, "cancelled")  # 워커에 제출하기 전에 취소됨
+                return
+            outcome = await self.pool.run(run_job, job_id, data, image_name, image_hash,
+                                          self._events, self._cancelled, search_mode, render_mode,
+                                          on_submit=lambda future: self._futures.__setitem__(job_id, future))
+            self._update(job_id, **outcome)
+        except asyncio.CancelledError:
+            # 워커가 가져가기 전에 워커 future가 취소됨 (워커에서 실행되지 않음)
+            self._update(job_id, "cancelled")
+        except Exception as e:
+            logger.error(f"작업 실행 오류 ({job_id}): {e}")
+            self._update(job_id, "failed", reason="error", message=str(e))
+        finally:
+            # 워커 future가 끝난 뒤에만 취소 플래그를 지움 (실행중인 워커가 끝까지 플래그를 볼 수 있게)
+            self.tasks.pop(job_id, None)
+            self._futures.pop(job_id, None)
+            self._cancelled.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """
+        작업에 취소 플래그를 세웁니다. (cancel_requested: true)
+        - 워커가 아직 가져가지 않은 작업은 워커 future를 바로 취소
+        - 워커에서 실행중인 작업은 워커가 플래그를 확인하고 멈춘 뒤에 cancelled가 됨
+          (그 전에 처리가 끝나면 done, 결과 게시 직전에도 확인하므로 취소된 작업의 결과는 게시되지 않음)
+        취소 요청이 받아들여지면 True, 이미 끝난 작업이면 False를 반환합니다.
+        """
+        job = self.jobs[job_id]
+        if job["stage"] in FINISHED_STAGES:
+            return False
+        self._cancelled[job_id] = True
+        job["cancel_requested"] = True
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()  # 이미 워커로 넘어간 작업이면 False (워커가 플래그를 보고 멈춤)
+        return True
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["stage"] in FINISHED_STAGES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+            self.history.pop(job_id, None)
+        # 삭제된 작업을 가리키는 중복 확인 키 정리
+        if len(self._by_hash) + len(self._by_key) > 2 * len(self.jobs):
+            self._by_hash = {key: job_id for key, job_id in self._by_hash.items() if job_id in self.jobs}
+            self._by_key = {key: job_id for key, job_id in self._by_key.items() if job_id in self.jobs}
+
+    def status(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job["stage"]] = counts.get(job["stage"], 0) + 1
+        return {"accepting": self.accepting, "jobs": counts,
+                "dedup": dict(self.dedup_stats, hit_rate=self.dedup_hit_rate())}
+
+    async def drain(self, timeout=DRAIN_TIMEOUT):
+        # 새 작업은 받지 않고, 진행중인 작업은 timeout초까지 기다린 뒤 남은 작업은 취소
+        self.accepting = False
+        pending = list(self.tasks.values())
+        if pending:
+            logger.info(f"==== 진행중인 작업 {len(pending)}건 종료 대기 (최대 {timeout}초) ====")
+            _, still_running = await asyncio.wait(pending, timeout=timeout)
+            for job_id in list(self.tasks):
+                self.cancel(job_id)
+            if still_running:
+                _, stuck = await asyncio.wait(still_running, timeout=DRAIN_CANCEL_TIMEOUT)
+                if stuck:
+                    # 취소 플래그를 확인하지 못하고 멈춘 워커 (예: 한 번의 시뮬레이션/이미지 처리가 끝나지 않음)
+                    logger.warning(f"==== 취소 후 {DRAIN_CANCEL_TIMEOUT}초 안에 끝나지 않은 작업 {len(stuck)}건 ====")
+                    self.pool.terminate()
+                    await asyncio.wait(stuck, timeout=DRAIN_CANCEL_TIMEOUT)
+        self._events.put(None)
+        self._pump.join()
+        self._manager.shutdown()
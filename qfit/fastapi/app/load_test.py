@@ -0,0 +1,347 @@
+"""
+ 당구경로예측 API 부하 테스트 하네스
+
+로컬에서 실행중인(또는 --spawn으로 직접 띄운) server_fastapi_qfit:app에 샘플 이미지 폴더의 사진을
+업로드하고, 업로드 -> image_info -> 결과 이미지 받기 전체 흐름의 지연시간 백분위(p50/p95/p99),
+오류율, 서버(워커 포함) CPU/메모리 사용량을 JSON으로 보고합니다.
+
+ 흐름(--flow):
+- upload: POST /upload_image/ (처리 완료까지 대기) -> GET /image_info/{prefix} -> GET /images/...
+- jobs:   POST /jobs/ -> GET /jobs/{job_id} 폴링 -> GET /image_info/{prefix} -> GET /images/...
+
+ 부하 방식:
+- --rate 미지정: 닫힌 부하 (--concurrency 개의 클라이언트가 쉬지 않고 반복)
+- --rate 지정:   열린 부하 (초당 rate건 포아송 도착, 동시 진행은 --concurrency 이하,
+                 지연시간은 예정 도착 시각부터 측정하여 클라이언트 쪽 대기도 포함)
+
+ 실행 예:
+    python load_test.py --spawn --workers 4 --concurrency 8 --requests 40 --unique --json load_report.json
+    python load_test.py --url http://127.0.0.1:8000 --rate 0.5 --duration 300 --flow jobs
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx    # pip install httpx
+import numpy as np
+import psutil   # pip install psutil
+
+home_dir = os.path.expanduser("~")
+DEFAULT_CORPUS = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "upload_image")
+
+
+def percentiles(values):
+    if not values:
+        return None
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(np.mean(values)), 3),
+        "max": round(float(np.max(values)), 3),
+    }
+
+
+def load_corpus(folder):
+    paths = sorted(path for ext in ("jpg", "jpeg", "png") for path in glob.glob(os.path.join(folder, f"*.{ext}")))
+    if not paths:
+        raise SystemExit(f"샘플 이미지가 없습니다: {folder}")
+    return [(os.path.basename(path), open(path, "rb").read()) for path in paths]
+
+
+#----------------------------------------------------------------------------#
+# 서버 프로세스(및 워커 프로세스) CPU/메모리 주기적 측정
+#----------------------------------------------------------------------------#
+def find_server_pid(port):
+    for conn in psutil.net_connections(kind="tcp"):
+        if conn.status == psutil.CONN_LISTEN and conn.laddr.port == port and conn.pid:
+            return conn.pid
+    return None
+
+
+class ResourceSampler:
+    def __init__(self, pid, interval=0.5):
+        self.process = psutil.Process(pid) if pid else None
+        self.interval = interval
+        self.cpu = []       # 전체 프로세스 CPU 사용률 합(%) (코어 2개를 다 쓰면 200)
+        self.rss_mb = []
+        self._children = {}
+
+    def _processes(self):
+        # 워커 프로세스는 재시작될 수 있으므로 매번 자식 목록을 갱신 (cpu_percent 기준점 유지를 위해 객체 재사용)
+        procs = [self.process] + self.process.children(recursive=True)
+        current = {}
+        for proc in procs:
+            current[proc.pid] = self._children.get(proc.pid, proc)
+        self._children = current
+        return list(current.values())
+
+    async def run(self):
+        if self.process is None:
+            return
+        for proc in self._processes():
+            proc.cpu_percent(None)
+        while True:
+            await asyncio.sleep(self.interval)
+            cpu, rss = 0.0, 0
+            for proc in self._processes():
+                try:
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                except psutil.NoSuchProcess:
+                    continue
+            self.cpu.append(cpu)
+            self.rss_mb.append(rss / (1024 * 1024))
+
+    def report(self):
+        if not self.cpu:
+            return None
+        return {
+            "cpu_percent": {"mean": round(float(np.mean(self.cpu)), 1), "max": round(float(np.max(self.cpu)), 1)},
+            "rss_mb": {"mean": round(float(np.mean(self.rss_mb)), 1), "max": round(float(np.max(self.rss_mb)), 1)},
+            "cpu_count": os.cpu_count(),
+            "samples": len(self.cpu),
+        }
+
+
+#----------------------------------------------------------------------------#
+# 부하 생성기
+#----------------------------------------------------------------------------#
+class LoadTest:
+    def __init__(self, client, corpus, flow, unique, poll_interval):
+        self.client = client
+        self.corpus = corpus
+        self.flow = flow
+        self.unique = unique
+        self.poll_interval = poll_interval
+        self.latency = {}   # {단계: [초]}
+        self.errors = {}    # {"단계 상태코드/예외명": 횟수}
+        self.flows = 0
+        self.failed_flows = 0
+        self.rejected = 0   # 서버 과부하 거절(429)
+
+    def _record(self, step, seconds):
+        self.latency.setdefault(step, []).append(seconds)
+
+    def _error(self, step, kind):
+        key = f"{step} {kind}"
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    async def _request(self, step, method, url, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self._error(step, type(e).__name__)
+            return None
+        self._record(step, time.perf_counter() - t0)
+        if response.status_code >= 400:
+            self._error(step, response.status_code)
+            if response.status_code == 429:
+                self.rejected += 1
+        return response
+
+    def _next_image(self):
+        name, data = random.choice(self.corpus)
+        if self.unique:
+            # JPEG/PNG 끝 뒤의 바이트는 디코더가 무시 -> 같은 사진이지만 중복 업로드로 처리되지 않음
+            data = data + os.urandom(16)
+        return name, data
+
+    async def _upload(self):
+        name, data = self._next_image()
+        response = await self._request("upload", "POST", "/upload_image/", content=data,
+                                       headers={"content-type": "image/jpeg", "x-filename": name})
+        if response is None or response.status_code != 200:
+            return None
+        body = response.json()
+        if body.get("statusCode") != "200" or not body.get("data"):
+            self._error("upload", body.get("statusCode", "no_data"))
+            return None
+        best_shot = os.path.basename(body["data"][0]["best_shot"] or "")
+        return "_".join(best_shot.split("_")[:2]) or None
+
+    async def _submit_job(self):
+        name, data = self._next_image()
+        response = await self._request("submit", "POST", "/jobs/", content=data,
+                                       headers={"content-type": "image/jpeg", "x-filename": name})
+        if response is None or response.status_code not in (200, 202):
+            return None
+        job = response.json()
+        t0 = time.perf_counter()
+        while job["stage"] not in ("done", "failed", "cancelled"):
+            await asyncio.sleep(self.poll_interval)
+            response = await self._request("poll", "GET", f"/jobs/{job['job_id']}")
+            if response is None or response.status_code != 200:
+                return None
+            job = response.json()
+        self._record("job_wait", time.perf_counter() - t0)
+        if job["stage"] != "done":
+            self._error("job", job["stage"])
+            return None
+        return job["job_id"]
+
+    async def run_flow(self, started_at=None):
+        # 업로드 -> image_info -> 결과 이미지 받기 (started_at: 열린 부하의 예정 도착 시각)
+        t0 = started_at or time.perf_counter()
+        prefix = await (self._submit_job() if self.flow == "jobs" else self._upload())
+        ok = prefix is not None
+        if ok:
+            response = await self._request("image_info", "GET", f"/image_info/{prefix}")
+            ok = response is not None and response.status_code == 200
+            if ok:
+                # image_info의 URL은 요청을 받은 서버 주소 기준이므로 그대로 요청
+                urls = response.json()["image_urls"].values()
+                results = await asyncio.gather(*[self._request("image", "GET", url) for url in urls])
+                ok = all(r is not None and r.status_code == 200 for r in results)
+
+        self.flows += 1
+        if ok:
+            self._record("flow", time.perf_counter() - t0)
+        else:
+            self.failed_flows += 1
+
+    async def closed_loop(self, concurrency, total, deadline):
+        remaining = [total]
+
+        async def client_loop():
+            while (total is None or remaining[0] > 0) and (deadline is None or time.perf_counter() < deadline):
+                if total is not None:
+                    remaining[0] -= 1
+                await self.run_flow()
+
+        await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+
+    async def open_loop(self, rate, concurrency, total, deadline):
+        limit = asyncio.Semaphore(concurrency)
+        tasks = []
+
+        async def arrival(scheduled):
+            async with limit:
+                await self.run_flow(started_at=scheduled)
+
+        next_at = time.perf_counter()
+        while (total is None or len(tasks) < total) and (deadline is None or next_at < deadline):
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            tasks.append(asyncio.create_task(arrival(next_at)))
+            next_at += random.expovariate(rate)
+        await asyncio.gather(*tasks)
+
+    def report(self, elapsed):
+        requests = sum(len(values) for values in self.latency.values()) + sum(self.errors.values())
+        return {
+            "flows": self.flows,
+            "failed_flows": self.failed_flows,
+            "flow_error_rate": round(self.failed_flows / self.flows, 4) if self.flows else None,
+            "rejected_429": self.rejected,
+            "elapsed_s": round(elapsed, 2),
+            "flows_per_min": round((self.flows - self.failed_flows) / elapsed * 60, 2) if elapsed > 0 else None,
+            "latency_s": {step: percentiles(values) for step, values in self.latency.items()},
+            "errors": self.errors,
+            "http_requests": requests,
+        }
+
+
+#----------------------------------------------------------------------------#
+# --spawn: 테스트용 서버를 직접 띄우고 /ready가 될 때까지 대기
+#----------------------------------------------------------------------------#
+def spawn_server(port, workers, concurrency):
+    env = dict(os.environ)
+    if workers:
+        env["QFIT_WORKERS"] = str(workers)
+    # 부하 생성기는 클라이언트 하나(같은 주소)이므로 클라이언트별 동시 요청 제한을 동시 진행 수에 맞춤
+    env.setdefault("QFIT_MAX_PER_CLIENT", str(concurrency))
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", "server_fastapi_qfit:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=app_dir, env=env)
+
+
+async def wait_ready(client, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get("/ready")
+            if response.status_code == 200:
+                return response.json()
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit("서버가 준비되지 않았습니다.")
+
+
+async def run(args):
+    corpus = load_corpus(args.corpus)
+    server = spawn_server(args.port, args.workers, args.concurrency) if args.spawn else None
+    base_url = f"http://127.0.0.1:{args.port}" if args.spawn else args.url
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency * 4)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            ready = await wait_ready(client, args.ready_timeout)
+            pid = server.pid if server else (args.server_pid or find_server_pid(httpx.URL(base_url).port or 80))
+            sampler = ResourceSampler(pid)
+            sampler_task = asyncio.create_task(sampler.run())
+
+            test = LoadTest(client, corpus, args.flow, args.unique, args.poll_interval)
+            deadline = time.perf_counter() + args.duration if args.duration else None
+            total = args.requests
+            t0 = time.perf_counter()
+            if args.rate:
+                await test.open_loop(args.rate, args.concurrency, total, deadline)
+            else:
+                await test.closed_loop(args.concurrency, total, deadline)
+            elapsed = time.perf_counter() - t0
+            sampler_task.cancel()
+
+        report = {
+            "config": {"url": base_url, "flow": args.flow, "concurrency": args.concurrency, "rate": args.rate,
+                       "requests": total, "duration": args.duration, "unique": args.unique,
+                       "corpus": len(corpus), "server_workers": ready.get("size")},
+            **test.report(elapsed),
+            "server_resources": sampler.report(),
+        }
+        return report
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="당구경로예측 API 부하 테스트 (지연시간 백분위, 오류율, CPU/메모리)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="대상 서버 주소")
+    parser.add_argument("--spawn", action="store_true", help="테스트용 서버를 직접 실행 (--port 사용)")
+    parser.add_argument("--port", type=int, default=8001, help="--spawn으로 띄울 서버 포트")
+    parser.add_argument("--workers", type=int, default=None, help="--spawn 서버의 워커 프로세스 수 (QFIT_WORKERS)")
+    parser.add_argument("--server-pid", type=int, default=None, help="CPU/메모리를 측정할 서버 프로세스 PID")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="업로드할 샘플 이미지 폴더")
+    parser.add_argument("--flow", choices=("upload", "jobs"), default="upload", help="측정할 업로드 흐름")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 진행 흐름 수")
+    parser.add_argument("--rate", type=float, default=None, help="초당 도착 건수 (지정시 열린 부하)")
+    parser.add_argument("--requests", type=int, default=None, help="전체 흐름 수 (기본 20, --duration만 주면 제한 없음)")
+    parser.add_argument("--duration", type=float, default=None, help="측정 시간(초)")
+    parser.add_argument("--unique", action="store_true", help="매 업로드를 다른 이미지로 (중복 업로드 재사용 방지)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="jobs 흐름의 상태 조회 간격(초)")
+    parser.add_argument("--timeout", type=float, default=300, help="요청 타임아웃(초)")
+    parser.add_argument("--ready-timeout", type=float, default=120, help="서버 준비 대기 시간(초)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+    if args.requests is None and args.duration is None:
+        args.requests = 20
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=4))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
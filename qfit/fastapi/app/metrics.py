@@ -0,0 +1,201 @@
+import os
+import glob
+import time
+import shutil
+import tempfile
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 처리 단계별 소요시간 버킷(초): 디코딩/게시(수 ms) ~ 샷 탐색(수십 초)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIMULATION_BUCKETS = (0, 50, 100, 200, 400, 720, 1000, 2000, 5000)
+
+
+#------------------------------------------------------------#
+# 지표를 정의하기 전(서버 시작 전, 폴더 일괄 처리 등)에 쓰는 빈 지표: 기록하지 않음
+#------------------------------------------------------------#
+class _NoMetric:
+    def labels(self, *values):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+http_requests = http_request_seconds = stage_seconds = _NoMetric()
+simulations_per_image = admission_rejected = images_processed = _NoMetric()
+
+# 프로세스별 지표 파일 폴더 (start()/init() 전에는 None)
+multiproc_dir = None
+_owned_dir = False   # start()에서 만든 임시 폴더인지 (stop()에서 삭제)
+
+
+#----------------------------------------------------------------------------#
+# prometheus_client 멀티프로세스 모드 설정
+# 워커 프로세스에서 기록한 값은 프로세스별 mmap 파일에 쓰고, /metrics 요청시 서버가 합쳐서 응답
+# prometheus_client는 import 시점의 PROMETHEUS_MULTIPROC_DIR로 모드를 정하므로,
+# 서버 lifespan에서 워커 기동 전에 start()로 폴더와 환경변수를 정한 뒤 import 한다.
+# spawn된 워커는 환경변수를 물려받고 초기화 함수에서 init()을 호출한다.
+# (prometheus_client가 프로세스별 파일을 열어 두므로 start()는 프로세스당 한 번: uvicorn lifespan)
+#----------------------------------------------------------------------------#
+def start():
+    global multiproc_dir, _owned_dir
+    configured = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if configured:
+        # 직접 지정한 폴더는 이 서버 전용: 이전 실행의 지표 파일만 지우고 폴더는 남김
+        os.makedirs(configured, exist_ok=True)
+        for path in glob.glob(os.path.join(configured, "*.db")):
+            os.remove(path)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="qfit_metrics_")
+        _owned_dir = True
+    init()
+
+
+def stop():
+    # 서버 종료시(워커 풀 종료 후) start()에서 만든 임시 폴더 삭제
+    global _owned_dir
+    if _owned_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        _owned_dir = False
+
+
+def init():
+    """
+    지표를 정의합니다 (프로세스당 한 번, 어느 프로세스에서 기록해도 /metrics에 합산됨).
+    PROMETHEUS_MULTIPROC_DIR가 없으면(서버 밖에서 실행) 빈 지표를 그대로 둡니다.
+    """
+    global multiproc_dir, http_requests, http_request_seconds, stage_seconds
+    global simulations_per_image, admission_rejected, images_processed
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return
+    multiproc_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    if not isinstance(http_requests, _NoMetric):
+        return
+
+    from prometheus_client import Counter, Histogram, values  # pip install prometheus_client
+    if not values.ValueClass._multiprocess:
+        logger.warning("prometheus_client가 PROMETHEUS_MULTIPROC_DIR 설정 전에 import되어 워커 지표가 합산되지 않음")
+
+    # registry=None: 값은 프로세스별 파일로만 모으고 /metrics에서 MultiProcessCollector로 합산
+    http_requests = Counter("qfit_http_requests_total", "HTTP 요청 수",
+                            ["method", "route", "status"], registry=None)
+    http_request_seconds = Histogram("qfit_http_request_seconds", "HTTP 요청 처리 시간(초)",
+                                     ["route"], buckets=REQUEST_BUCKETS, registry=None)
+    stage_seconds = Histogram("qfit_stage_seconds", "이미지 처리 단계별 소요시간(초)",
+                              ["stage"], buckets=STAGE_BUCKETS, registry=None)
+    simulations_per_image = Histogram("qfit_simulations_per_image", "이미지 한 장의 샷 탐색에서 실행한 시뮬레이션 수",
+                                      buckets=SIMULATION_BUCKETS, registry=None)
+    admission_rejected = Counter("qfit_admission_rejected_total", "대기열 초과/클라이언트 제한으로 거절한 요청 수 (429)",
+                                 ["reason"], registry=None)
+    images_processed = Counter("qfit_images_processed_total", "처리한 이미지 수 (done / rejected)",
+                               ["outcome"], registry=None)
+
+# 파이프라인 timings(ms) 키 -> stage 라벨
+PIPELINE_STAGES = ("find_corners", "find_ball", "search", "render")
+
+
+def observe_stage(stage, seconds):
+    stage_seconds.labels(stage).observe(seconds)
+
+
+def observe_analysis(analysis):
+    # 워커에서 분석 완료 후 호출: 파이프라인 단계별 소요시간과 시뮬레이션 수 기록
+    timings = analysis.get("timings", {})
+    for stage in PIPELINE_STAGES:
+        if stage in timings:
+            stage_seconds.labels(stage).observe(timings[stage] / 1000)
+    if "simulations" in analysis:
+        simulations_per_image.observe(analysis["simulations"])
+
+
+#----------------------------------------------------------------------------#
+# HTTP 요청 수/처리 시간 기록 미들웨어 (route 라벨은 경로 템플릿: /jobs/{job_id})
+#----------------------------------------------------------------------------#
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            http_requests.labels(scope["method"], route, str(status)).inc()
+            http_request_seconds.labels(route).observe(time.perf_counter() - t0)
+
+
+#----------------------------------------------------------------------------#
+# 서버 프로세스의 현재 상태 (요청 때마다 계산: 대기열 길이, 워커 사용률, 중복 업로드 적중률)
+# 파일에 쓰지 않고 /metrics 요청시에만 읽으므로 처리 경로에 비용이 없다.
+#----------------------------------------------------------------------------#
+class ServerStateCollector:
+    def __init__(self, worker_pool, job_manager):
+        self.worker_pool = worker_pool
+        self.job_manager = job_manager
+
+    def collect(self):
+        pool = self.worker_pool.status()
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        yield GaugeMetricFamily("qfit_workers", "워커 프로세스 수", value=pool["size"])
+        yield GaugeMetricFamily("qfit_workers_busy", "작업 중인 워커 수", value=pool["running"])
+        yield GaugeMetricFamily("qfit_worker_utilization", "워커 사용률 (작업 중인 워커 / 워커 수)",
+                                value=pool["running"] / pool["size"] if pool["size"] else 0.0)
+        yield GaugeMetricFamily("qfit_queue_depth", "빈 워커를 기다리는 작업 수 (모든 업로드 경로)",
+                                value=pool["queued"])
+        yield GaugeMetricFamily("qfit_ready", "워커 풀 준비 여부", value=1 if pool["ready"] else 0)
+
+        jobs = GaugeMetricFamily("qfit_jobs", "단계별 작업 수 (메모리에 있는 작업)", labels=["stage"])
+        counts = self.job_manager.status()["jobs"]
+        for stage, count in counts.items():
+            jobs.add_metric([stage], count)
+        yield jobs
+
+        stats = self.job_manager.dedup_stats
+        yield CounterMetricFamily("qfit_dedup_requests", "중복 확인한 업로드 수", value=stats["requests"])
+        hits = CounterMetricFamily("qfit_dedup_hits", "중복 업로드 적중 수", labels=["kind"])
+        for kind in ("idempotency", "inflight", "store"):
+            hits.add_metric([kind], stats[f"{kind}_hits"])
+        yield hits
+        yield GaugeMetricFamily("qfit_dedup_hit_rate", "중복 업로드 적중률", value=self.job_manager.dedup_hit_rate())
+
+
+#----------------------------------------------------------------------------#
+# /metrics 응답용 레지스트리: 모든 프로세스의 파일 합산 + 서버 현재 상태
+#----------------------------------------------------------------------------#
+def make_registry(worker_pool, job_manager):
+    from prometheus_client import CollectorRegistry, multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=multiproc_dir)
+    registry.register(ServerStateCollector(worker_pool, job_manager))
+    return registry
+
+
+def render(registry):
+    # Prometheus 텍스트 형식 (본문, Content-Type)
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+home_dir = os.path.expanduser("~")  # 홈 디렉토리 가져오기
+
+# 결과 인덱스 DB (final_image 폴더는 /images로 공개되므로 DB는 그 밖에 둔다)
+db_path = os.environ.get("QFIT_RESULT_DB",
+                         os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_store.db"))
+
+# 결과 이미지 종류 (final_image 파일명: {current_time}_{idx}_{name}.png)
+ARTIFACT_NAMES = ("best_shot", "front_view", "power_gauge", "ball_labels", "table_with_balls")
+
+_COLUMNS = ("upload_time", "idx", "status", "content_hash", "upload_image") + ARTIFACT_NAMES + (
+    "reason", "message", "score", "angle", "power", "hit_offset", "ball_position", "timings", "created_at")
+_JSON_COLUMNS = ("hit_offset", "ball_position", "timings")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    prefix            TEXT PRIMARY KEY,   -- {current_time}_{idx}
+    upload_time       TEXT NOT NULL,      -- {current_time} (YYYYmmddHHMMSS)
+    idx               TEXT NOT NULL,
+    status            TEXT,               -- done / rejected
+    content_hash      TEXT,               -- 업로드 원본 SHA-256 (중복 업로드 확인용)
+    upload_image      TEXT,
+    best_shot         TEXT,
+    front_view        TEXT,
+    power_gauge       TEXT,
+    ball_labels       TEXT,
+    table_with_balls  TEXT,
+    reason            TEXT,               -- done: 득점 사유, rejected: 거절 사유
+    message           TEXT,
+    score             REAL,
+    angle             REAL,
+    power             REAL,
+    hit_offset        TEXT,               -- JSON [x, y]
+    ball_position     TEXT,               -- JSON {color: [x, y]}
+    timings           TEXT,               -- JSON
+    created_at        REAL
+);
+CREATE INDEX IF NOT EXISTS results_upload_time ON results (upload_time);
+CREATE TABLE IF NOT EXISTS prefixes (     -- 발급한 결과 prefix (처리 전에 예약, 요청끼리 겹치지 않게)
+    upload_time       TEXT NOT NULL,
+    idx               INTEGER NOT NULL,
+    PRIMARY KEY (upload_time, idx)
+);
+"""
+# 이전 버전 DB에 없는 컬럼 {컬럼명: 타입}
+_ADDED_COLUMNS = {"content_hash": "TEXT", "ball_position": "TEXT"}
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS results_content_hash ON results (content_hash);
+"""
+
+_local = threading.local()  # 스레드(프로세스)별 연결
+
+
+#----------------------------------------------------------------------------#
+# DB 연결 (WAL 모드: 여러 워커 프로세스가 쓰는 동안에도 서버는 막히지 않고 읽을 수 있음)
+#----------------------------------------------------------------------------#
+def connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(results)")}
+        for column, column_type in _ADDED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE results ADD COLUMN {column} {column_type}")
+        conn.executescript(_INDEXES)
+        _local.conn = conn
+    return conn
+
+
+def _split_prefix(prefix):
+    current_time, idx = prefix.split("_", 1)
+    return current_time, idx
+
+
+def allocate_prefix(current_time=None):
+    """
+    새 결과 prefix({current_time}_{idx})를 예약하여 반환합니다. (current_time을 주지 않으면 현재 시각)
+    작업 API(서버)와 upload_image 폴더 처리(워커)가 모두 여기서 순번을 받으므로,
+    같은 초에 들어온 요청끼리도 final_image 파일명과 결과 DB 키가 겹치지 않습니다.
+    (INSERT 한 문장 안에서 쓰기 잠금을 잡고 순번을 계산하므로 여러 프로세스가 동시에 호출해도 안전)
+    """
+    current_time = current_time or datetime.now().strftime("%Y%m%d%H%M%S")
+    conn = connect()
+    with conn:
+        # 이전 버전에서 예약 없이 기록된 결과(순번 0부터)와도 겹치지 않도록 results의 순번도 함께 확인
+        conn.execute("INSERT INTO prefixes (upload_time, idx) SELECT ?, 1 + MAX("
+                     "COALESCE((SELECT MAX(idx) FROM prefixes WHERE upload_time = ?), 0), "
+                     "COALESCE((SELECT MAX(CAST(idx AS INTEGER)) FROM results WHERE upload_time = ?), -1))",
+                     (current_time, current_time, current_time))
+        idx = conn.execute("SELECT idx FROM prefixes WHERE rowid = last_insert_rowid()").fetchone()[0]
+    return f"{current_time}_{idx}"
+
+
+def record_result(prefix, **fields):
+    """
+    결과 한 건({current_time}_{idx})을 기록합니다. 이미 있으면 넘긴 필드만 갱신합니다.
+    """
+    unknown = set(fields) - set(_COLUMNS)
+    if unknown:
+        raise ValueError(f"알 수 없는 필드: {sorted(unknown)}")
+
+    current_time, idx = _split_prefix(prefix)
+    fields = {"upload_time": current_time, "idx": idx, **fields}
+    fields.setdefault("created_at", time.time())
+    for column in _JSON_COLUMNS:
+        if column in fields and fields[column] is not None:
+            fields[column] = json.dumps(fields[column], ensure_ascii=False)
+
+    columns = ["prefix"] + list(fields)
+    updates = ", ".join(f"{column}=excluded.{column}" for column in fields if column != "created_at")
+    conn = connect()
+    with conn:
+        conn.execute(f"INSERT INTO results ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                     f"ON CONFLICT(prefix) DO UPDATE SET {updates}",
+                     [prefix] + list(fields.values()))
+
+
+def _row_to_dict(row):
+    item = dict(row)
+    for column in _JSON_COLUMNS:
+        if item.get(column) is not None:
+            item[column] = json.loads(item[column])
+    return item
+
+
+def get_result(prefix):
+    row = connect().execute("SELECT * FROM results WHERE prefix = ?", (prefix,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def get_results(prefixes):
+    # 요청한 순서대로 반환 (없는 prefix는 제외)
+    rows = {}
+    conn = connect()
+    for prefix in prefixes:
+        row = conn.execute("SELECT * FROM results WHERE prefix = ?", (prefix,)).fetchone()
+        if row:
+            rows[prefix] = _row_to_dict(row)
+    return [rows[prefix] for prefix in prefixes if prefix in rows]
+
+
+def find_by_hash(content_hash):
+    # 같은 원본 이미지로 처리 완료된 가장 최근 결과
+    row = connect().execute("SELECT * FROM results WHERE content_hash = ? AND status = 'done' "
+                            "ORDER BY created_at DESC LIMIT 1", (content_hash,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def list_results(start_time=None, end_time=None, limit=100):
+    """
+    업로드 시각(YYYYmmddHHMMSS) 범위로 결과를 조회합니다. (최신순, 최대 limit건)
+    """
+    query = "SELECT * FROM results WHERE upload_time >= ? AND upload_time <= ? " \
+            "ORDER BY upload_time DESC, CAST(idx AS INTEGER) DESC LIMIT ?"
+    rows = connect().execute(query, (start_time or "", end_time or "99999999999999", limit)).fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+
+def delete_results(prefixes):
+    conn = connect()
+    with conn:
+        conn.executemany("DELETE FROM results WHERE prefix = ?", [(prefix,) for prefix in prefixes])
+
+
+def delete_before(upload_time):
+    # upload_time(YYYYmmddHHMMSS) 이전 결과 삭제, 삭제 건수 반환
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM prefixes WHERE upload_time < ?", (upload_time,))
+        return conn.execute("DELETE FROM results WHERE upload_time < ?", (upload_time,)).rowcount
+
+
+#----------------------------------------------------------------------------#
+# 기존 응답 형식(generate_data_from_folder와 같은 구조)으로 변환
+#----------------------------------------------------------------------------#
+def to_data_item(item):
+    return {
+        "index": item["idx"],
+        "upload_image": item["upload_image"],
+        "best_shot": item["best_shot"],
+        "front_view": item["front_view"],
+        "power_gauge": item["power_gauge"],
+    }
+
+
+def to_shot_result(item):
+    # 저장된 결과의 샷 정보 (궤적은 저장하지 않으므로 없음)
+    return {
+        "score": item["score"],
+        "angle": item["angle"],
+        "power": item["power"],
+        "offset": item["hit_offset"],
+        "reason": item["reason"],
+        "ball_position": item["ball_position"],
+        "timings": item["timings"],
+    }
+
+
+#----------------------------------------------------------------------------#
+# DB가 비어 있으면 기존 final_image 폴더 내용을 한 번만 가져온다 (서버 시작시)
+#----------------------------------------------------------------------------#
+def import_from_folder(dest_folder="final_image"):
+    import upload_image_check
+
+    if connect().execute("SELECT 1 FROM results LIMIT 1").fetchone():
+        return 0
+
+    data = upload_image_check.generate_data_from_folder(dest_folder)
+    count = 0
+    for item in data:
+        path = next(filter(None, (item["upload_image"], item["best_shot"])), None)
+        if path is None:
+            continue
+        parsed = upload_image_check.parse_file_info(os.path.basename(path))
+        record_result(f"{parsed[0]}_{parsed[1]}",
+                      status="done" if item["best_shot"] else "rejected",
+                      upload_image=item["upload_image"], best_shot=item["best_shot"],
+                      front_view=item["front_view"], power_gauge=item["power_gauge"],
+                      created_at=os.path.getmtime(path))
+        count += 1
+    logger.info(f"==== 기존 결과 {count}건을 결과 DB로 가져옴: {db_path} ====")
+    return count
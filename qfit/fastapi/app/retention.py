@@ -0,0 +1,111 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from datetime import datetime
+
+import result_store
+from upload_image_check import final_folder
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 보관 정책 (0 이하이면 해당 제한 없음)
+RETENTION_DAYS = float(os.environ.get("QFIT_RETENTION_DAYS", 30))                            # 보관 기간(일)
+RETENTION_MAX_BYTES = int(os.environ.get("QFIT_RETENTION_MAX_BYTES", 10 * 1024 ** 3))          # final_image 최대 용량
+GC_INTERVAL = float(os.environ.get("QFIT_GC_INTERVAL", 3600))                                 # 정리 주기(초)
+GC_MIN_AGE = 600  # 용량 초과로 지울 때도 최근 10분 내 결과는 남김 (게시 중인 작업 보호)
+
+# final_image 파일명: {current_time}_{idx}_{name}{ext} 또는 {current_time}_result_{time}.json
+_FILE_PATTERN = re.compile(r"^(\d{14})_(\d+|result)_")
+
+
+def scan_results(folder):
+    # final_image 아래(날짜/해시 샤드 폴더, 샤딩 이전 파일 포함) 결과 파일을 결과 한 건씩 묶음
+    # {prefix: {"time": current_time, "paths": [...], "bytes": n}} (변환 이미지(variants)도 원본과 같은 묶음)
+    groups = {}
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            match = _FILE_PATTERN.match(filename)
+            if not match:
+                continue
+            path = os.path.join(root, filename)
+            try:
+                size = os.stat(path).st_size
+            except FileNotFoundError:
+                continue
+            # 결과 JSON은 파일 하나가 한 묶음
+            prefix = filename if match[2] == "result" else f"{match[1]}_{match[2]}"
+            group = groups.setdefault(prefix, {"time": match[1], "paths": [], "bytes": 0})
+            group["paths"].append(path)
+            group["bytes"] += size
+    return groups
+
+
+def _time_key(seconds):
+    # epoch 초 -> 파일명 시각 형식(YYYYmmddHHMMSS)
+    return datetime.fromtimestamp(seconds).strftime("%Y%m%d%H%M%S")
+
+
+def _remove_empty_dirs(folder, now):
+    # 방금 만든 샤드 폴더(게시 직전)는 지우지 않도록 GC_MIN_AGE 동안 변경이 없던 빈 폴더만 삭제
+    for root, dirs, files in os.walk(folder, topdown=False):
+        if root != folder and not dirs and not files and now - os.stat(root).st_mtime > GC_MIN_AGE:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass  # 그 사이 새 파일이 생긴 경우
+
+
+#----------------------------------------------------------------------------#
+# final_image 정리: 보관 기간이 지난 결과, 총 용량 초과시 오래된 결과부터 파일과 DB 행을 함께 삭제
+#----------------------------------------------------------------------------#
+def collect(folder=final_folder, now=None):
+    now = time.time() if now is None else now
+    cutoff = _time_key(now - RETENTION_DAYS * 86400) if RETENTION_DAYS > 0 else None
+    recent = _time_key(now - GC_MIN_AGE)
+
+    groups = scan_results(folder)
+    oldest_first = sorted(groups, key=lambda prefix: groups[prefix]["time"])
+
+    expired = [prefix for prefix in oldest_first if cutoff and groups[prefix]["time"] < cutoff]
+    kept = [prefix for prefix in oldest_first if not (cutoff and groups[prefix]["time"] < cutoff)]
+    total_bytes = sum(groups[prefix]["bytes"] for prefix in kept)
+    if RETENTION_MAX_BYTES > 0:
+        while kept and total_bytes > RETENTION_MAX_BYTES and groups[kept[0]]["time"] < recent:
+            prefix = kept.pop(0)
+            total_bytes -= groups[prefix]["bytes"]
+            expired.append(prefix)
+
+    deleted_files, freed_bytes = 0, 0
+    for prefix in expired:
+        for path in groups[prefix]["paths"]:
+            try:
+                os.remove(path)
+                deleted_files += 1
+            except FileNotFoundError:
+                pass
+        freed_bytes += groups[prefix]["bytes"]
+
+    result_store.delete_results([prefix for prefix in expired if not prefix.endswith(".json")])
+    if cutoff:
+        result_store.delete_before(cutoff)  # 파일 없이 남은 오래된 행
+    _remove_empty_dirs(folder, now)
+
+    stats = {"deleted_results": len(expired), "deleted_files": deleted_files,
+             "freed_bytes": freed_bytes, "total_bytes": total_bytes}
+    logger.info(f"==== final_image 정리 완료: {stats} ====")
+    return stats
+
+
+#----------------------------------------------------------------------------#
+# 서버 백그라운드 작업: GC_INTERVAL마다 collect()를 스레드에서 실행 (요청 처리는 막지 않음)
+#----------------------------------------------------------------------------#
+async def run_periodically(interval=GC_INTERVAL):
+    while True:
+        try:
+            await asyncio.to_thread(collect)
+        except Exception as e:
+            logger.error(f"final_image 정리 중 오류: {e}")
+        await asyncio.sleep(interval)
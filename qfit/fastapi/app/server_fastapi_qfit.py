@@ -1,18 +1,69 @@
 import uvicorn   # pip install uvicorn 
-from fastapi import FastAPI, HTTPException, File, UploadFile  # pip install fastapi
+from fastapi import FastAPI, HTTPException, File, UploadFile, Request, Response  # pip install fastapi
 #from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from upload_image_check import check_files_and_execute
+import metrics
+from upload_image_check import check_files_and_execute, execute_uploaded_image, archive_original, content_hash
+from upload_image_check import final_image_path, RENDER_MODES
+from upload_stream import read_image_body, read_image_files
+import result_store
+import retention
+from image_serving import variant_file_response, preload_links, embed_images, RESULT_IMAGE_KEYS
+from worker_pool import WorkerPool
+from job_manager import JobManager, FINISHED_STAGES
+from admission import AdmissionController
 import logging
 import os
 from pathlib import Path
 import shutil
-from fastapi.responses import FileResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import json
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+
+
+# 탑뷰 변환/당구경로검출을 실행할 워커 프로세스 풀 (QFIT_WORKERS로 크기 설정)
+worker_pool = WorkerPool()
+# 비동기 작업(job) 관리 (제출/상태조회/취소)
+job_manager = JobManager(worker_pool)
+# 분석 요청 수용 제어 (대기열/클라이언트별 동시 요청 제한, 과부하시 빠른 샷 탐색)
+admission = AdmissionController(worker_pool)
+# 응답과 별도로 실행되는 부가 작업(원본 이미지 보관 등)
+background_tasks = set()
+# /upload_image/ 로 처리중인 이미지 {content_hash: asyncio.Task} (같은 이미지 재요청은 같은 처리 결과를 기다림)
+inflight_uploads = {}
+
+
+def run_in_background(fn, *args):
+    # 블로킹 함수(디스크 쓰기 등)를 스레드에서 실행, 요청 처리는 기다리지 않음
+    task = asyncio.create_task(asyncio.to_thread(fn, *args))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+#------------------------------------------------------------#
+# 서버 시작시 워커 풀을 기동하고 각 워커에서 라이브러리/자원을 미리 로드
+# 서버 종료시 진행중인 작업을 마무리(drain)한 뒤 워커 풀 종료
+#------------------------------------------------------------#
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(result_store.import_from_folder)  # 결과 DB가 비어 있으면 기존 final_image 내용을 가져옴
+    metrics.start()  # 지표 파일 폴더 준비 (워커가 환경변수를 물려받도록 워커 기동 전에)
+    worker_pool.start()
+    job_manager.start()
+    gc_task = asyncio.create_task(retention.run_periodically())  # 보관기간/용량 초과 결과 정리
+    yield
+    gc_task.cancel()
+    await job_manager.drain()
+    if background_tasks:
+        await asyncio.wait(list(background_tasks))
+    worker_pool.shutdown()
+    metrics.stop()
 
 
 # FastAPI 애플리케이션 생성
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 # CORS configuration
@@ -25,6 +76,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 요청 수/처리 시간 기록 (순수 ASGI 미들웨어: 스트리밍/파일 전송 응답을 감싸지 않음)
+app.add_middleware(metrics.RequestMetricsMiddleware)
+
 # 로그설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,7 +88,8 @@ home_dir = os.path.expanduser("~")
 upload_folder = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "upload_image")
 final_folder = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "final_image")
 
-app.mount("/images", StaticFiles(directory=home_dir+"/aiffelthon_qfit/model_src/final_image"), name="images")
+# /images 는 아래 get_image API 하나로 제공 (캐시 헤더, 304, Range 처리)
+os.makedirs(final_folder, exist_ok=True)
 
 # 폴더 생성 (없다면)
 os.makedirs(upload_folder, exist_ok=True)
@@ -50,7 +105,37 @@ async def read_root():
     return "당구검출 API 테스트 페이지입니다"
 
 #------------------------------------------------------------#
-# 앱에서 찍은 이미지를 upload_image 폴더에 두면, 
+# 워커 풀 준비 상태 체크 API (모든 워커 초기화 전에는 503)
+#------------------------------------------------------------#
+@app.get("/ready",
+         summary="서버 준비 상태 API",
+         description="워커 프로세스 풀의 준비 상태(워커 수, 사용중 워커 수)를 제공하는 API")
+async def read_ready():
+    status = worker_pool.status()
+    status.update(job_manager.status())
+    status["admission"] = admission.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+#------------------------------------------------------------#
+# Prometheus 지표 API (텍스트 형식)
+# 요청 수, 단계별 소요시간(decode, find_corners, find_ball, search, render, publish),
+# 이미지당 시뮬레이션 수, 대기열 길이, 워커 사용률, 중복 업로드 적중률
+#------------------------------------------------------------#
+@app.get("/metrics",
+         summary="서버 지표 API",
+         description="Prometheus가 수집하는 서버/워커 지표를 텍스트 형식으로 제공하는 API")
+async def read_metrics():
+    # 프로세스별 지표 파일을 읽어 합치는 작업은 스레드에서 실행
+    registry = metrics.make_registry(worker_pool, job_manager)
+    body, content_type = await asyncio.to_thread(metrics.render, registry)
+    return Response(content=body, media_type=content_type)
+
+#------------------------------------------------------------#
+# 앱에서 찍은 이미지를 요청 본문으로 보내면(multipart 'file' 파트 또는 image/* 본문)
+# 메모리에서 바로 디코딩하여 처리하고, 원본은 백그라운드에서 final_image 폴더에 보관한다.
+# 본문 없이 호출하면 기존처럼 upload_image 폴더에 있는 이미지를 처리한다.
 # 1) 그 파일을 읽어서 topview화면의 이미지와 좌표로 생성한다.
 # 2) 생성된 정보를 기준으로 물리시뮬레이션 처리후 당구경로검출
 #    당점이미지 및 최종경로화면을 저장한다.
@@ -64,91 +149,333 @@ async def read_root():
 #      - best_shot.png        -> 20250131190155_1_best_shot.png
 #      - front_view.png       -> 20250131190155_1_front_view.png
 #      - power_gage.png       -> 20250131190155_1_power_gage.png
+# render=vector 이면 결과 이미지를 만들지 않고 궤적(폴리라인)과 큐볼 충돌 지점만 반환
+#------------------------------------------------------------#
+def image_urls(request, item):
+    # 결과 항목(파일 경로)의 이미지 URL {best_shot, front_view, power_gauge} (요청을 받은 서버 주소 기준)
+    return {key: str(request.url_for("get_image", image_name=os.path.basename(item[key])))
+            for key in RESULT_IMAGE_KEYS if item.get(key)}
+
+
+def with_image_urls(request, result):
+    # 응답 data 항목마다 image_urls 추가 (같은 이미지의 중복 업로드끼리 공유하는 결과 dict는 건드리지 않음)
+    return dict(result, data=[dict(item, image_urls=image_urls(request, item)) for item in result.get("data", [])])
+
+
+def check_render_mode(render):
+    if render not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"render는 {', '.join(RENDER_MODES)} 중 하나여야 합니다.")
+    return render
+
+
+async def process_uploaded_image(data, image_name, render_mode="image"):
+    # 같은 이미지가 이미 처리 완료됐으면 결과 DB의 결과를, 처리중이면 그 처리 결과를 기다려 반환
+    # (결과 DB에는 궤적이 없으므로 vector 요청은 DB 결과를 쓰지 않음)
+    image_hash = await asyncio.to_thread(content_hash, data)
+    job_manager.dedup_stats["requests"] += 1
+
+    # 결과 DB 조회는 스레드에서 (DB 쓰기 잠금을 기다리는 동안 이벤트 루프를 막지 않음)
+    stored = await asyncio.to_thread(result_store.find_by_hash, image_hash) if render_mode == "image" else None
+    if stored is not None:
+        job_manager.dedup_stats["store_hits"] += 1
+        logger.info(f"중복 업로드: {image_name} -> 기존 결과 {stored['prefix']}")
+        return {"statusCode": "200", "message": "이미 처리된 이미지입니다.", "data": [result_store.to_data_item(stored)],
+                "rejected": [], "result": result_store.to_shot_result(stored), "deduplicated": True}
+
+    # 처리중인 요청이 없을 때만 prefix 예약 (중복 요청은 결과 DB에 쓰지 않음)
+    # 예약하는 동안 같은 이미지 요청이 먼저 등록됐을 수 있으므로 다시 확인하고, 그 뒤 등록까지는 await 없이 실행
+    inflight_key = image_hash if render_mode == "image" else f"{image_hash}:{render_mode}"
+    task = inflight_uploads.get(inflight_key)
+    if task is None:
+        current_time, idx = (await job_manager.new_job_id()).split("_")
+        task = inflight_uploads.get(inflight_key)
+    if task is not None:
+        job_manager.dedup_stats["inflight_hits"] += 1
+        logger.info(f"중복 업로드: {image_name} -> 처리중인 요청 결과 대기")
+        return dict(await asyncio.shield(task), deduplicated=True)
+
+    run_in_background(archive_original, data, image_name, current_time, idx)
+    task = asyncio.create_task(worker_pool.run(execute_uploaded_image, data, image_name, current_time, idx, image_hash,
+                                               admission.search_mode(), render_mode))
+    inflight_uploads[inflight_key] = task
+    task.add_done_callback(lambda _: inflight_uploads.pop(inflight_key, None))
+    return await asyncio.shield(task)
+
+
+#------------------------------------------------------------#
+# 응답 한 번으로 결과 화면 구성:
+# - result: 샷 정보(각도, 힘, 당점, 사유), 공 위치, 간략화한 공별 궤적
+# - Link 헤더(rel=preload)와 data 항목의 image_urls로 결과 이미지 URL 제공 (요청을 받은 서버 주소 기준)
+# - embed=base64 이면 결과 이미지를 data 항목의 images_base64에 함께 담음 (/images 추가 요청 없음)
+# - render=vector 이면 결과 이미지 없이 result의 궤적/충돌 지점으로 앱에서 직접 그림
 #------------------------------------------------------------#
 @app.post("/upload_image/",
           summary="당구공기준 당구경로예측 API",
           description="앱에서 찍은 이미지 사진을 기준으로 탑뷰화면 및 당구공의 경로를 예측후 이미지로 제공하는 API")
-#async def upload_image(file: UploadFile = File(...)):
-async def upload_image():
+async def upload_image(request: Request, response: Response, embed: str = None, render: str = "image"):
+    if embed not in (None, "base64"):
+        raise HTTPException(status_code=400, detail="embed는 base64만 지원합니다.")
+    render_mode = check_render_mode(render)
+
+    # 대기열이 가득 찼거나 같은 클라이언트의 요청이 너무 많으면 본문을 받기 전에 429
+    ticket = admission.acquire(request)
     try:
         logger.info(f"==== upload_image 호출 =====")
         
-        # 저장할 파일 경로 설정
-        #file_path = os.path.join(upload_folder, file.filename)
-
-        # 파일 저장
-        #with open(file_path, "wb") as buffer:
-        #    shutil.copyfileobj(file.file, buffer)
-            
-        # 파일 저장
-        #with open(file_path, "wb") as buffer:
-        #    buffer.write(await file.read())
-                        
-
-        #logger.info(f"파일 업로드 완료: {file.filename}")       
-         
-        # 업로드 후 처리 실행        
-        result = check_files_and_execute()
+        # 이미지 본문을 청크 단위로 메모리에 수신 (크기 제한 초과시 413)
+        data, image_name = await read_image_body(request)
+
+        # 처리 실행 (워커 프로세스에서 실행, 이벤트 루프는 다른 요청을 계속 처리)
+        if data is not None:
+            result = await process_uploaded_image(data, image_name, render_mode)
+        else:
+            result = await worker_pool.run(check_files_and_execute)
         logger.info(f"result: {result}")
         
         if result.get('statusCode') == '200':
             logger.info(f"==== 파일 업로드 및 당구경로검출 처리 최종완료! ====")
+            result = with_image_urls(request, result)
+            links = preload_links(result["data"])
+            if links:
+                response.headers["link"] = links
+            if embed == "base64":
+                result["data"] = await asyncio.to_thread(embed_images, result["data"], final_image_path)
         return result
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"파일 업로드 중 오류 발생: {str(e)}")
         raise HTTPException(status_code=500, detail=f"업로드 실패: {str(e)}")
+    finally:
+        admission.release(ticket)
+
+
+#------------------------------------------------------------#
+# 일괄 업로드 API: multipart/form-data의 파일 파트 N개를 한 번에 받아
+# 워커 풀에 동시에 나눠 처리하고, 보낸 순서대로 이미지별 결과를 반환한다.
+# 이미지 하나가 실패해도 나머지는 계속 처리하고 실패는 해당 항목에만 표시한다.
+#------------------------------------------------------------#
+async def process_batch_item(index, data, image_name, render_mode="image"):
+    item = {"index": index, "filename": image_name}
+    if data is None:
+        return dict(item, statusCode="error", message="빈 파일입니다.")
+    try:
+        return dict(item, **await process_uploaded_image(data, image_name, render_mode))
+    except Exception as e:
+        logger.error(f"일괄 업로드 처리 오류 ({index}: {image_name}): {e}")
+        return dict(item, statusCode="error", message=str(e))
+
+
+@app.post("/upload_images/",
+          summary="당구경로예측 일괄 업로드 API",
+          description="여러 장의 이미지를 한 번에 업로드하면 워커 풀에서 동시에 처리하고 이미지별 결과를 보낸 순서대로 제공하는 API")
+async def upload_images(request: Request, render: str = "image"):
+    render_mode = check_render_mode(render)
+    ticket = admission.acquire(request)
+    try:
+        files = await read_image_files(request)
+        if not files:
+            raise HTTPException(status_code=400, detail="이미지 파일이 없습니다.")
+        admission.resize(ticket, len(files))
+
+        results = await asyncio.gather(*[process_batch_item(index, data, image_name, render_mode)
+                                         for index, (data, image_name) in enumerate(files)])
+        results = [with_image_urls(request, item) if item.get("statusCode") == "200" else item for item in results]
+        succeeded = sum(1 for item in results if item.get("statusCode") == "200")
+        logger.info(f"==== 일괄 업로드 처리 완료: {succeeded}/{len(results)}장 ====")
+        return {"statusCode": "200" if succeeded else "error", "count": len(results),
+                "succeeded": succeeded, "results": results}
+    finally:
+        admission.release(ticket)
+
+
+#------------------------------------------------------------#
+# 비동기 작업 API
+# 1) POST /jobs/          : 이미지 업로드 -> job_id 즉시 반환 (처리는 워커 풀에서 백그라운드 실행)
+# 2) GET /jobs/{job_id}    : 진행 단계(queued, topview, search, render, done) 및 결과 이미지 URL
+# 3) DELETE /jobs/{job_id} : 작업 취소
+# 4) GET /jobs/{job_id}/events : 진행 이벤트 스트림 (Server-Sent Events)
+# 같은 Idempotency-Key 헤더 또는 같은 이미지(내용 해시)로 진행중/완료된 작업이 있으면
+# 다시 처리하지 않고 그 작업을 반환한다. (deduplicated: true, 200)
+# 대기열이 가득 찼거나 클라이언트별 동시 작업 수를 넘으면 429 + Retry-After,
+# 대기열이 길면 빠른 샷 탐색(search_mode: "fast")으로 처리한다.
+# render=vector 이면 결과 이미지 없이 result의 궤적/충돌 지점만 제공한다. (image_urls 없음)
+#------------------------------------------------------------#
+def job_response(request, job):
+    response = dict(job)
+    if job["stage"] == "done" and job.get("render_mode", "image") == "image":
+        response["image_urls"] = image_urls(request, {name: f"{job['job_id']}_{name}.png" for name in RESULT_IMAGE_KEYS})
+    return response
+
+
+@app.post("/jobs/", status_code=202,
+          summary="당구경로예측 작업 제출 API",
+          description="이미지를 업로드하면 작업 ID를 즉시 반환하고, 탑뷰 변환 및 당구경로 예측은 백그라운드에서 실행하는 API")
+async def submit_job(request: Request, response: Response, render: str = "image"):
+    if not job_manager.accepting:
+        raise HTTPException(status_code=503, detail="서버 종료 중에는 작업을 받을 수 없습니다.")
+    render_mode = check_render_mode(render)
+
+    # 재시도(같은 Idempotency-Key)는 수용 제한과 상관없이 기존 작업을 반환
+    idempotency_key = request.headers.get("idempotency-key")
+    job = job_manager.find_by_key(idempotency_key)
+    if job is not None:
+        logger.info(f"중복 요청: Idempotency-Key -> 기존 작업 {job['job_id']} ({job['stage']})")
+        response.status_code = 200
+        return dict(job_response(request, job), deduplicated=True,
+                    status_url=str(request.url_for("get_job", job_id=job["job_id"])))
+
+    ticket = admission.acquire(request)  # 작업이 끝날 때까지 자리를 차지
+    try:
+        # 이미지 본문을 메모리로 스트리밍 수신 (multipart 'file' 파트 또는 image/* 본문)
+        data, image_name = await read_image_body(request)
+        if data is None:
+            raise HTTPException(status_code=400, detail="이미지 파일이 없습니다.")
+
+        # 중복 업로드 확인 (재시도/같은 사진 재제출)
+        image_hash = await asyncio.to_thread(content_hash, data)
+        job = await job_manager.find_duplicate(image_hash, idempotency_key, render_mode)
+        if job is None:
+            # 중복이 아닐 때만 prefix 예약, 예약하는 동안 같은 이미지가 먼저 제출됐는지 다시 확인
+            # (이후 submit까지는 await 없이 실행)
+            job_id = await job_manager.new_job_id()
+            job = job_manager.find_inflight(image_hash, idempotency_key)
+        if job is not None:
+            logger.info(f"중복 업로드: {image_name} -> 기존 작업 {job['job_id']} ({job['stage']})")
+            response.status_code = 200
+            deduplicated = True
+        else:
+            search_mode = admission.search_mode()
+            logger.info(f"작업 제출: {job_id} ({image_name}, search_mode={search_mode}, render_mode={render_mode})")
+            job = job_manager.submit(job_id, data, image_name, image_hash, idempotency_key, search_mode, render_mode)
+            run_in_background(archive_original, data, image_name, *job_id.split("_"))
+            job_manager.tasks[job_id].add_done_callback(lambda _, ticket=ticket: admission.release(ticket))
+            ticket = None  # 작업이 끝나면 반환
+            deduplicated = False
+    finally:
+        if ticket is not None:
+            admission.release(ticket)
+
+    body = job_response(request, job)
+    body["status_url"] = str(request.url_for("get_job", job_id=job["job_id"]))
+    body["deduplicated"] = deduplicated
+    return body
+
+
+@app.get("/jobs/{job_id}",
+         summary="당구경로예측 작업 상태 API",
+         description="작업의 진행 단계와 완료시 결과(샷 정보, 이미지 URL)를 제공하는 API")
+async def get_job(request: Request, job_id: str):
+    job = job_manager.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job_response(request, job)
+
+
+#------------------------------------------------------------#
+# 진행 이벤트 스트림 (text/event-stream)
+# accepted, stage, table_found(모서리), balls_detected(공 위치), search_improved(후보 샷: 각도/파워/
+# 당점/점수/궤적), 마지막으로 done / failed / cancelled (GET /jobs/{job_id}와 같은 내용)
+# 재연결시 Last-Event-ID 헤더를 주면 그 다음 이벤트부터 보낸다.
+#------------------------------------------------------------#
+def format_sse(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/jobs/{job_id}/events",
+         summary="당구경로예측 작업 진행 이벤트 API",
+         description="작업 접수, 테이블/공 검출, 탐색 중 후보 샷 갱신, 완료 이벤트를 SSE로 실시간 제공하는 API")
+async def get_job_events(request: Request, job_id: str):
+    if job_id not in job_manager.jobs:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    last_event_id = request.headers.get("last-event-id", "")
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+
+    async def stream():
+        async for event in job_manager.events(job_id, after):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            data = event["data"]
+            if event["event"] in FINISHED_STAGES:
+                data = job_response(request, data)
+            yield format_sse(event["id"], event["event"], data)
+
+    # 프록시(nginx 등)가 이벤트를 모아서 보내지 않도록 버퍼링 해제
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"cache-control": "no-cache", "x-accel-buffering": "no"})
+
+
+@app.delete("/jobs/{job_id}",
+            summary="당구경로예측 작업 취소 API",
+            description="대기중인 작업은 바로, 실행중인 작업은 다음 처리 단계에서 취소하는 API")
+async def cancel_job(request: Request, job_id: str):
+    if job_id not in job_manager.jobs:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="이미 완료된 작업입니다.")
+    return job_response(request, job_manager.jobs[job_id])
 
 
 #------------------------------------------------------------#
 # 3개의 이미지 파일명의 URL정보를 제공하는 API
 #------------------------------------------------------------#
 @app.get("/image_info/{image_prefix}")
-async def get_image_info(image_prefix: str):
+async def get_image_info(request: Request, image_prefix: str):
     try:
-        api_base_url = "https://1356-112-172-64-10.ngrok-free.app"  # FastAPI 서버 주소
         logger.info(f"API 요청 도착: image_prefix={image_prefix}")
 
-        image_names = [
-            f"{image_prefix}_best_shot.png",
-            f"{image_prefix}_front_view.png",
-            f"{image_prefix}_power_gauge.png",
-        ]
+        # 결과 DB에서 prefix로 조회 (final_image 폴더를 검사하지 않음)
+        item = await asyncio.to_thread(result_store.get_result, image_prefix) or {}
 
-        image_urls = {}
-        for img in image_names:
-            image_path = os.path.join(final_folder, img)
-            logger.info(f"확인할 이미지: {image_path}")
+        # URL은 요청을 받은 서버 주소 기준 (ngrok 등 프록시 주소가 바뀌어도 그대로 동작)
+        urls = image_urls(request, item)
+        for key, url in urls.items():
+            logger.info(f"추가된 이미지 URL: {key} -> {url}")
 
-            if os.path.exists(image_path):
-                key = '_'.join(img.split('_')[-2:]).split('.')[0]
-                image_urls[key] = f"{api_base_url}/images/{img}"
-                logger.info(f"추가된 이미지 URL: {key} -> {image_urls[key]}")
-
-        if not image_urls:
+        if not urls:
             logger.error(f"이미지가 존재하지 않음.")
             raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
         
-        return {"statusCode": "200", "image_urls": image_urls}
+        return {"statusCode": "200", "image_urls": urls}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"오류 발생: {str(e)}")
         raise HTTPException(status_code=500, detail=f"이미지 URL 생성 실패: {str(e)}")
 
 
 
+#------------------------------------------------------------#
+# 업로드 시각 범위로 결과 목록을 제공하는 API
+# start, end: YYYYmmddHHMMSS (앞자리만 줘도 됨, 예: start=20250131)
+# 결과마다 image_urls(요청을 받은 서버 주소 기준 /images URL) 포함
+#------------------------------------------------------------#
+@app.get("/results",
+         summary="당구경로예측 결과 목록 API",
+         description="업로드 시각 범위(start~end)로 결과(이미지 경로, 샷 정보, 소요시간)를 최신순으로 제공하는 API")
+async def get_results(request: Request, start: str = None, end: str = None, limit: int = 100):
+    if end is not None:
+        end = end.ljust(14, "9")  # 앞자리만 준 경우 해당 기간의 끝까지 포함
+    items = await asyncio.to_thread(result_store.list_results, start, end, min(max(limit, 1), 1000))
+    for item in items:
+        item["image_urls"] = image_urls(request, item)
+    return {"statusCode": "200", "count": len(items), "results": items}
+
+
 #------------------------------------------------------------#
 # 개별 이미지 제공 API (파일 전송)
+# 파일명에 시각/순번이 붙어 내용이 바뀌지 않으므로 immutable 캐시 헤더 + ETag/Last-Modified를 주고,
+# 조건부 요청(If-None-Match / If-Modified-Since)에는 304, Range 요청에는 부분 전송으로 응답
+# w(너비), format(webp/jpeg/png)을 주거나 Accept에 image/webp가 있으면 변환 이미지를 제공
+# (처음 요청시 스레드 풀에서 만들어 디스크에 캐시)
 #------------------------------------------------------------#
-@app.get("/images/{image_name}")
-async def get_image(image_name: str):
-    try:
-        image_path = os.path.join(final_folder, image_name)
-        
-        if os.path.exists(image_path):
-            return FileResponse(image_path, media_type="image/png")
-    except Exception as e:
-        logger.error(f"이미지 미존재: {str(e)}")
-        raise HTTPException(status_code=404, detail=f"개별 이미지화면 호출실패: {str(e)}")
+@app.api_route("/images/{image_name}", methods=["GET", "HEAD"],
+               summary="결과 이미지 제공 API",
+               description="final_image 폴더의 결과 이미지를 캐시 헤더와 함께 제공하는 API (w, format으로 크기/형식 변환)")
+async def get_image(request: Request, image_name: str, w: int = None, format: str = None):
+    return await variant_file_response(request, image_name, final_image_path, w, format)
 
 #------------------------------------------------------------#
 # 서버 실행
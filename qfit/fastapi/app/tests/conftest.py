@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+# 서버 모듈은 import할 때 ~/aiffelthon_qfit 아래 폴더를 만들고 경로를 정하므로 임시 홈 폴더에서 실행
+os.environ["HOME"] = tempfile.mkdtemp(prefix="qfit_test_home_")
+
+# 테스트는 서버 모듈을 서버 실행과 같은 방식(app 폴더 기준 import)으로 불러옴
+# (model_src 모듈은 ~/aiffelthon_qfit/model_src 대신 저장소의 model_src에서 import)
+app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, app_dir)
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.dirname(app_dir)), "model_src"))
+
+import result_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # 결과 DB를 임시 파일로 바꾸고 스레드별 연결을 새로 만듦
+    monkeypatch.setattr(result_store, "db_path", str(tmp_path / "result_store.db"))
+    monkeypatch.setattr(result_store, "_local", threading.local())
+    yield result_store
+    conn = getattr(result_store._local, "conn", None)
+    if conn is not None:
+        conn.close()
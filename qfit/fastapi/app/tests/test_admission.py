@@ -0,0 +1,99 @@
+import pytest
+from fastapi import HTTPException
+
+import admission
+from admission import AdmissionController
+
+
+class FakePool:
+    def __init__(self, size=2, queued=0, job_seconds=10.0):
+        self.size, self.queued, self.job_seconds = size, queued, job_seconds
+
+
+class FakeRequest:
+    def __init__(self, host="10.0.0.1", headers=None):
+        self.client = type("Client", (), {"host": host})()
+        self.headers = headers or {}
+
+
+def rejection(fn, *args):
+    with pytest.raises(HTTPException) as info:
+        fn(*args)
+    assert info.value.status_code == 429
+    return info.value
+
+
+def test_acquire_and_release():
+    controller = AdmissionController(FakePool(), max_queue=8, max_per_client=2)
+    first = controller.acquire(FakeRequest())
+    second = controller.acquire(FakeRequest(), count=3)
+    assert controller.inflight == 4 and controller.per_client == {"10.0.0.1": 2}
+    controller.release(first)
+    controller.release(second)
+    assert controller.inflight == 0 and controller.per_client == {}
+
+
+def test_per_client_limit():
+    controller = AdmissionController(FakePool(), max_queue=8, max_per_client=2)
+    controller.acquire(FakeRequest())
+    ticket = controller.acquire(FakeRequest())
+    error = rejection(controller.acquire, FakeRequest())
+    assert "2건" in error.detail and "Retry-After" in error.headers
+    # 다른 클라이언트는 받아들이고, 요청 하나가 끝나면 같은 클라이언트도 다시 받아들임
+    controller.acquire(FakeRequest("10.0.0.2"))
+    controller.release(ticket)
+    controller.acquire(FakeRequest())
+
+
+def test_queue_full_and_resize():
+    # 워커 2개, 대기열 2장: 이미지 4장까지 받아들임
+    controller = AdmissionController(FakePool(size=2), max_queue=2, max_per_client=10)
+    ticket = controller.acquire(FakeRequest())
+    controller.resize(ticket, 4)
+    assert controller.inflight == 4 and controller.queue_depth == 2
+    rejection(controller.acquire, FakeRequest("10.0.0.2"))
+    # 자리가 없으면 늘리지 않고 ticket도 그대로
+    rejection(controller.resize, ticket, 5)
+    assert ticket["count"] == 4 and controller.inflight == 4
+    controller.resize(ticket, 1)
+    controller.release(ticket)
+    assert controller.inflight == 0
+
+
+def test_retry_after_follows_queue_depth():
+    pool = FakePool(size=2, job_seconds=10.0)
+    controller = AdmissionController(pool, max_queue=100, max_per_client=1)
+    assert controller.retry_after() == 5      # ceil((0 + 1) / 2 * 10)
+    pool.queued = 5
+    assert controller.retry_after() == 30     # ceil((5 + 1) / 2 * 10)
+    pool.queued, pool.job_seconds = 5, 0.01
+    assert controller.retry_after() == 1      # 최소 1초
+    pool.queued, pool.job_seconds = 1000, 10.0
+    assert controller.retry_after() == admission.MAX_RETRY_AFTER
+
+    pool.queued = 3
+    controller.acquire(FakeRequest())
+    error = rejection(controller.acquire, FakeRequest())
+    assert error.headers["Retry-After"] == "20"
+
+
+def test_search_mode_switches_to_fast_when_queue_is_long():
+    pool = FakePool(size=2)
+    controller = AdmissionController(pool, max_queue=100, max_per_client=10)
+    assert controller.fast_search_queue == 2
+    ticket = controller.acquire(FakeRequest(), count=3)   # 대기열 1장
+    assert controller.search_mode() == "full"
+    controller.resize(ticket, 4)                          # 대기열 2장
+    assert controller.search_mode() == "fast"
+    controller.release(ticket)
+    pool.queued = 2                                       # 워커 풀에 제출된 대기 작업
+    assert controller.search_mode() == "fast"
+    assert controller.status()["search_mode"] == "fast"
+
+
+def test_forwarded_client_only_when_trusted(monkeypatch):
+    request = FakeRequest("127.0.0.1", {"x-forwarded-for": "203.0.113.7, 10.0.0.1"})
+    assert admission.client_key(request) == "127.0.0.1"
+    monkeypatch.setattr(admission, "TRUST_FORWARDED", True)
+    assert admission.client_key(request) == "203.0.113.7"
+    assert admission.client_key(FakeRequest("127.0.0.1")) == "127.0.0.1"
@@ -0,0 +1,212 @@
+import time
+import asyncio
+
+import pytest
+from fastapi import Response
+
+import result_store
+import server_fastapi_qfit
+from admission import AdmissionController
+from job_manager import JobManager
+from upload_image_check import content_hash
+
+
+class FakePool:
+    # release가 설정될 때까지 결과를 돌려주지 않는 워커 풀 (호출 인자만 기록)
+    size, queued, job_seconds = 1, 0, 1.0
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def run(self, fn, *args, on_submit=None):
+        self.calls.append(args)
+        await self.release.wait()
+        return self.outcome
+
+
+@pytest.fixture
+def manager(store):
+    manager = JobManager(FakePool({"stage": "done", "result": {"score": 1}}))
+    manager._cancelled = {}
+    return manager
+
+
+def record_done(store, prefix, image_hash):
+    store.record_result(prefix, status="done", content_hash=image_hash, score=100, angle=30, power=2,
+                        best_shot=f"/x/final_image/{prefix}_best_shot.png")
+
+
+def test_find_duplicate_order(manager, store):
+    async def scenario():
+        manager.pool.release = asyncio.Event()
+        assert await manager.find_duplicate("h1", "key-1") is None
+        job = manager.submit(await manager.new_job_id(), b"a", "a.jpg", "h1", "key-1")
+
+        # 같은 Idempotency-Key -> 같은 이미지로 진행중인 작업 -> 결과 DB 순서
+        assert await manager.find_duplicate("other", "key-1") is job
+        assert await manager.find_duplicate("h1", "key-2") is job
+        assert manager.find_by_key("key-2") is job
+        record_done(store, "20250131190155_1", "h2")
+        stored = await manager.find_duplicate("h2")
+        assert stored["job_id"] == "20250131190155_1" and stored["stage"] == "done"
+        assert stored["result"]["score"] == 100
+
+        manager.pool.release.set()
+        await manager.tasks[job["job_id"]]
+        assert manager.dedup_stats == {"requests": 5, "idempotency_hits": 2, "inflight_hits": 1, "store_hits": 1}
+        assert manager.dedup_hit_rate() == 0.8
+    asyncio.run(scenario())
+
+
+def test_vector_requests_skip_store(manager, store):
+    record_done(store, "20250131190155_1", "h1")
+
+    async def scenario():
+        return await manager.find_duplicate("h1", render_mode="vector")
+    assert asyncio.run(scenario()) is None
+
+
+def test_failed_and_cancelled_jobs_are_not_reused(manager):
+    async def scenario():
+        manager.pool.release = asyncio.Event()
+        job = manager.submit(await manager.new_job_id(), b"a", "a.jpg", "h1")
+        for stage in ("failed", "cancelled"):
+            manager.jobs[job["job_id"]]["stage"] = stage
+            assert await manager.find_duplicate("h1") is None
+        manager.pool.release.set()
+    asyncio.run(scenario())
+
+
+def test_store_lookup_does_not_block_event_loop(manager, monkeypatch):
+    # DB 조회가 쓰기 잠금 등으로 느린 동안 같은 이미지가 제출되면 그 작업을 반환 (두 번 처리하지 않음)
+    monkeypatch.setattr(result_store, "find_by_hash", lambda image_hash: time.sleep(0.2))
+
+    async def scenario():
+        manager.pool.release = asyncio.Event()
+        lookup = asyncio.create_task(manager.find_duplicate("h1"))
+        await asyncio.sleep(0.05)
+        assert not lookup.done()
+        job = manager.submit(await manager.new_job_id(), b"a", "a.jpg", "h1")
+        assert await lookup is job
+        manager.pool.release.set()
+    asyncio.run(scenario())
+
+
+def reserved_prefixes(store):
+    return store.connect().execute("SELECT COUNT(*) FROM prefixes").fetchone()[0]
+
+
+class FakeRequest:
+    # submit_job이 쓰는 요청 속성만 흉내 (본문은 read_image_body를 바꿔서 전달)
+    def __init__(self, data, idempotency_key=None):
+        self.data = data
+        self.headers = {"idempotency-key": idempotency_key} if idempotency_key else {}
+        self.client = type("Client", (), {"host": "10.0.0.1"})()
+
+    def url_for(self, name, **params):
+        return f"https://qfit.example.test/{name}/{'/'.join(params.values())}"
+
+
+@pytest.fixture
+def server(store, monkeypatch):
+    # 워커 풀/원본 보관 없이 /upload_image/, /jobs/ 처리 흐름만 실행
+    pool = FakePool({"statusCode": "200", "data": [], "result": {"score": 1}, "stage": "done"})
+    manager = JobManager(pool)
+    manager._cancelled = {}
+    manager.accepting = True
+
+    async def read_image_body(request):
+        return request.data, "a.jpg"
+
+    monkeypatch.setattr(server_fastapi_qfit, "worker_pool", pool)
+    monkeypatch.setattr(server_fastapi_qfit, "job_manager", manager)
+    monkeypatch.setattr(server_fastapi_qfit, "admission", AdmissionController(pool, max_queue=10, max_per_client=10,
+                                                                             fast_search_queue=10))
+    monkeypatch.setattr(server_fastapi_qfit, "archive_original", lambda *args: None)
+    monkeypatch.setattr(server_fastapi_qfit, "read_image_body", read_image_body)
+    monkeypatch.setattr(server_fastapi_qfit, "inflight_uploads", {})
+    return server_fastapi_qfit
+
+
+def slow_new_job_id(monkeypatch, manager):
+    # prefix 예약(DB 쓰기)이 느린 동안 같은 이미지 요청이 들어오는 상황
+    new_job_id = manager.new_job_id
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return await new_job_id()
+    monkeypatch.setattr(manager, "new_job_id", slow)
+
+
+def test_upload_waits_for_inflight_request(server, store, monkeypatch):
+    slow_new_job_id(monkeypatch, server.job_manager)
+
+    async def scenario():
+        server.worker_pool.release = asyncio.Event()
+        uploads = [asyncio.create_task(server.process_uploaded_image(b"same", name)) for name in ("a.jpg", "b.jpg")]
+        await asyncio.sleep(0.2)
+        server.worker_pool.release.set()
+        return await asyncio.gather(*uploads)
+    results = asyncio.run(scenario())
+    # 어느 요청이 먼저 등록될지는 스레드 실행 순서에 따름: 한 번만 처리하고 나머지는 그 결과를 받음
+    assert len(server.worker_pool.calls) == 1
+    assert sorted(bool(result.get("deduplicated")) for result in results) == [False, True]
+    assert results[0]["result"] == results[1]["result"]
+    assert server.job_manager.dedup_stats["inflight_hits"] == 1
+    assert not server.inflight_uploads
+
+
+def test_upload_reuses_stored_result(server, store):
+    record_done(store, "20250131190155_1", content_hash(b"same"))
+
+    async def scenario():
+        server.worker_pool.release = asyncio.Event()
+        server.worker_pool.release.set()
+        stored = await server.process_uploaded_image(b"same", "a.jpg")
+        assert reserved_prefixes(store) == 0  # 중복 요청은 prefix를 예약하지 않음
+        return stored, await server.process_uploaded_image(b"same", "a.jpg", render_mode="vector")
+    stored, vector = asyncio.run(scenario())
+    assert stored["deduplicated"] and stored["result"]["score"] == 100
+    assert stored["data"][0]["best_shot"] == "/x/final_image/20250131190155_1_best_shot.png"
+    # vector 요청은 결과 DB를 쓰지 않고 다시 처리
+    assert "deduplicated" not in vector and len(server.worker_pool.calls) == 1
+    assert server.job_manager.dedup_stats["store_hits"] == 1
+
+
+def test_submit_reserves_prefix_only_for_new_jobs(server, store):
+    record_done(store, "20250131190155_1", content_hash(b"stored"))
+
+    async def scenario():
+        server.worker_pool.release = asyncio.Event()
+        first = await server.submit_job(FakeRequest(b"same", "key-1"), Response())
+        replay = await server.submit_job(FakeRequest(b"same", "key-1"), Response())
+        same_image = await server.submit_job(FakeRequest(b"same"), Response())
+        stored = await server.submit_job(FakeRequest(b"stored"), Response())
+        server.worker_pool.release.set()
+        await server.job_manager.tasks[first["job_id"]]
+        return first, replay, same_image, stored
+    first, replay, same_image, stored = asyncio.run(scenario())
+    assert not first["deduplicated"]
+    assert replay["deduplicated"] and same_image["deduplicated"] and stored["deduplicated"]
+    assert replay["job_id"] == same_image["job_id"] == first["job_id"]
+    assert stored["job_id"] == "20250131190155_1"
+    assert reserved_prefixes(store) == 1
+    assert len(server.worker_pool.calls) == 1
+
+
+def test_submit_rechecks_after_reserving_prefix(server, store, monkeypatch):
+    slow_new_job_id(monkeypatch, server.job_manager)
+
+    async def scenario():
+        server.worker_pool.release = asyncio.Event()
+        bodies = await asyncio.gather(*(server.submit_job(FakeRequest(b"same"), Response()) for _ in range(2)))
+        server.worker_pool.release.set()
+        await asyncio.gather(*server.job_manager.tasks.values())
+        return bodies
+    bodies = asyncio.run(scenario())
+    # 두 요청 모두 중복이 아니라고 확인한 뒤 prefix를 예약해도 작업은 하나만 제출
+    assert len(server.worker_pool.calls) == 1
+    assert bodies[0]["job_id"] == bodies[1]["job_id"]
+    assert sorted(body["deduplicated"] for body in bodies) == [False, True]
@@ -0,0 +1,159 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import job_manager
+from job_manager import JobManager
+from worker_pool import WorkerPool
+
+# 가짜 워커 함수(run_job 대신)가 읽는 테스트 제어 상태
+release = threading.Event()   # 실행중인 작업을 끝내도록 허용
+started = []                  # 워커에서 실행을 시작한 job_id
+
+
+def fake_run_job(job_id, data, image_name, image_hash, events, cancelled, search_mode, render_mode):
+    # data: "watch"(취소 플래그를 주기적으로 확인) / "ignore"(플래그를 보지 않고 release까지 실행)
+    started.append(job_id)
+    events.put((job_id, "stage", {"stage": "search"}))
+    while not release.wait(0.01):
+        if data == "watch" and job_id in cancelled:
+            return {"stage": "cancelled"}
+    if data == "ignore" and job_id in cancelled:
+        raise RuntimeError("워커 강제 종료")
+    return {"stage": "done", "result": {"score": 1}}
+
+
+class ThreadWorkerPool(WorkerPool):
+    # 프로세스 대신 스레드 하나로 실행하는 워커 풀 (대기중 future 취소 / 실행중 future 취소 불가 동작은 같음)
+    def __init__(self):
+        super().__init__(size=1)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.terminated = False
+
+    def terminate(self):
+        self.terminated = True
+        release.set()
+
+
+@pytest.fixture
+def manager(store, monkeypatch):
+    monkeypatch.setattr(job_manager, "run_job", fake_run_job)
+    release.clear()
+    started.clear()
+    pool = ThreadWorkerPool()
+    yield JobManager(pool)
+    release.set()
+    pool.executor.shutdown(wait=True)
+
+
+async def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "시간 초과"
+        await asyncio.sleep(0.01)
+
+
+async def submit(manager, data):
+    job_id = await manager.new_job_id()
+    manager.submit(job_id, data, "a.jpg")
+    return job_id
+
+
+def test_new_job_ids_are_unique(manager):
+    async def scenario():
+        return [await manager.new_job_id() for _ in range(5)]
+    assert len(set(asyncio.run(scenario()))) == 5
+
+
+def test_cancel_queued_job_never_runs(manager):
+    async def scenario():
+        manager.start()
+        running = await submit(manager, "ignore")
+        queued = await submit(manager, "ignore")
+        await wait_for(lambda: started == [running])
+
+        assert manager.cancel(queued)
+        await wait_for(lambda: manager.jobs[queued]["stage"] == "cancelled")
+        release.set()
+        await wait_for(lambda: manager.jobs[running]["stage"] == "done")
+        assert started == [running]
+        await manager.drain()
+    asyncio.run(scenario())
+
+
+def test_cancel_running_job_waits_for_worker(manager):
+    async def scenario():
+        manager.start()
+        job_id = await submit(manager, "watch")
+        await wait_for(lambda: manager.jobs[job_id]["stage"] == "search")
+
+        # 워커가 플래그를 확인하기 전까지는 cancelled로 보고하지 않고, 워커는 계속 busy
+        assert manager.cancel(job_id)
+        assert manager.jobs[job_id]["stage"] == "search"
+        assert manager.jobs[job_id]["cancel_requested"]
+        await wait_for(lambda: manager.jobs[job_id]["stage"] == "cancelled")
+        await wait_for(lambda: manager.pool.busy == 0)
+        assert job_id not in manager._cancelled
+        await manager.drain()
+    asyncio.run(scenario())
+
+
+def test_running_job_that_finishes_first_is_reported_done(manager):
+    async def scenario():
+        manager.start()
+        job_id = await submit(manager, "done")
+        await wait_for(lambda: started == [job_id])
+        manager.cancel(job_id)
+        release.set()
+        await wait_for(lambda: manager.jobs[job_id]["stage"] in job_manager.FINISHED_STAGES)
+        assert manager.jobs[job_id]["stage"] == "done"
+        assert not manager.cancel(job_id)
+        await manager.drain()
+    asyncio.run(scenario())
+
+
+def test_busy_counts_running_worker_until_it_finishes(manager):
+    async def scenario():
+        manager.start()
+        job_id = await submit(manager, "ignore")
+        await wait_for(lambda: started == [job_id])
+        # 기다리던 쪽(작업 task)이 취소되어도 워커가 실행중인 동안 busy는 줄지 않음
+        manager.tasks[job_id].cancel()
+        await asyncio.sleep(0.05)
+        assert manager.pool.busy == 1
+        release.set()
+        await wait_for(lambda: manager.pool.busy == 0)
+        await manager.drain()
+    asyncio.run(scenario())
+
+
+def test_drain_is_bounded_and_terminates_stuck_workers(manager, monkeypatch):
+    monkeypatch.setattr(job_manager, "DRAIN_CANCEL_TIMEOUT", 0.2)
+
+    async def scenario():
+        manager.start()
+        job_id = await submit(manager, "ignore")
+        await wait_for(lambda: started == [job_id])
+        t0 = time.monotonic()
+        await manager.drain(timeout=0.1)
+        assert time.monotonic() - t0 < 2
+        assert manager.pool.terminated
+        assert manager.jobs[job_id]["stage"] == "failed"
+        assert not manager.accepting
+    asyncio.run(scenario())
+
+
+def test_drain_stops_watching_jobs_without_terminating(manager, monkeypatch):
+    monkeypatch.setattr(job_manager, "DRAIN_CANCEL_TIMEOUT", 5)
+
+    async def scenario():
+        manager.start()
+        job_id = await submit(manager, "watch")
+        await wait_for(lambda: started == [job_id])
+        await manager.drain(timeout=0.1)
+        assert manager.jobs[job_id]["stage"] == "cancelled"
+        assert not manager.pool.terminated
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+import os
+import sys
+import subprocess
+
+from conftest import app_dir
+
+# prometheus_client는 import 시점의 환경변수로 모드를 정하므로 새 프로세스에서 확인
+SCRIPT = """
+import os, sys
+import multiprocessing
+
+import metrics
+
+def worker():
+    metrics.init()
+    metrics.observe_stage("search", 1.5)
+
+class State:
+    dedup_stats = {"requests": 0, "idempotency_hits": 0, "inflight_hits": 0, "store_hits": 0}
+    def status(self):
+        return {"size": 1, "running": 0, "queued": 0, "ready": True, "jobs": {}}
+    def dedup_hit_rate(self):
+        return 0.0
+
+if __name__ == "__main__":
+    assert "PROMETHEUS_MULTIPROC_DIR" not in os.environ and "prometheus_client" not in sys.modules
+    metrics.images_processed.labels("done").inc()  # 시작 전 기록은 무시
+    metrics.start()
+    folder = metrics.multiproc_dir
+    metrics.images_processed.labels("done").inc()
+    process = multiprocessing.get_context("spawn").Process(target=worker)  # 워커 풀과 같은 방식
+    process.start()
+    process.join()
+    body, _ = metrics.render(metrics.make_registry(State(), State()))
+    metrics.stop()
+    print(folder, os.path.exists(folder), "PROMETHEUS_MULTIPROC_DIR" in os.environ)
+    print(body.decode())
+"""
+
+
+def test_metrics_folder_lives_with_server(tmp_path):
+    env = {key: value for key, value in os.environ.items() if key != "PROMETHEUS_MULTIPROC_DIR"}
+    env["TMPDIR"] = str(tmp_path)
+    env["PYTHONPATH"] = app_dir
+    script = tmp_path / "run_metrics.py"
+    script.write_text(SCRIPT)
+    result = subprocess.run([sys.executable, str(script)], env=env, cwd=tmp_path,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    # import만으로는 폴더를 만들지 않고, 서버 종료시 start()에서 만든 폴더를 삭제
+    folder, exists, env_left = result.stdout.splitlines()[0].split()
+    assert folder.startswith(str(tmp_path)) and exists == "False" and env_left == "False"
+    assert os.listdir(tmp_path) == ["run_metrics.py"]
+
+    # 서버와 워커 프로세스에서 기록한 값이 합산됨
+    assert 'qfit_images_processed_total{outcome="done"} 1.0' in result.stdout
+    assert 'qfit_stage_seconds_count{stage="search"} 1.0' in result.stdout
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+import upload_image_check
+
+ANALYSIS = {"score": 100, "angle": 30, "power": 2, "offset": (0, 1), "reason": "3쿠션",
+            "ball_position": {"white": (10, 20), "yellow": (30, 40), "red": (50, 60)}, "timings": {"search": 1.0}}
+NAMES = ("best_shot.png", "front_view.png", "power_gauge.png", "table_with_balls.png")
+
+
+@pytest.fixture
+def publish(tmp_path, store, monkeypatch):
+    # 분석 결과 저장(save_results) 대신 작업 폴더에 빈 결과 파일을 만들고, 게시 순서를 기록
+    def save_results(analysis, workspace):
+        for name in NAMES:
+            open(os.path.join(workspace, name), "wb").close()
+
+    replaced = []
+    os_replace = os.replace
+
+    def replace(src, dst):
+        replaced.append(os.path.basename(dst))
+        os_replace(src, dst)
+
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(upload_image_check.qfit_pipeline, "save_results", save_results)
+    monkeypatch.setattr(upload_image_check, "shard_folder", lambda current_time, idx: str(tmp_path / "final_image"))
+    monkeypatch.setattr(upload_image_check.os, "replace", replace)
+    return lambda analysis: (upload_image_check.publish_results(analysis, str(workspace), "20250131190155", "1",
+                                                                image_hash="abc"), replaced)
+
+
+def test_best_shot_is_published_last(publish, store):
+    # best_shot.png가 보이면 나머지 결과 파일도 모두 있음 (image_info/결과 조회가 반쯤 게시된 결과를 보지 않음)
+    published, replaced = publish(ANALYSIS)
+    assert replaced[-1] == "20250131190155_1_best_shot.png"
+    assert sorted(replaced) == sorted(f"20250131190155_1_{name}" for name in NAMES)
+    assert all(os.path.exists(path) for path in published.values())
+
+    item = store.get_result("20250131190155_1")
+    assert item["best_shot"] == published["best_shot"] and item["content_hash"] == "abc"
+    assert item["ball_position"] == {"white": [10, 20], "yellow": [30, 40], "red": [50, 60]}
+
+
+def test_fast_search_results_are_not_reused(publish, store):
+    publish(dict(ANALYSIS, search_mode="fast"))
+    assert store.get_result("20250131190155_1")["content_hash"] is None
+    assert store.find_by_hash("abc") is None
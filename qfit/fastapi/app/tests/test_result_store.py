@@ -0,0 +1,84 @@
+import os
+import multiprocessing
+
+import result_store
+import upload_image_check
+
+
+def _allocate_many(current_time, count):
+    # 별도 프로세스에서 새 연결로 순번 예약
+    return [result_store.allocate_prefix(current_time) for _ in range(count)]
+
+
+def test_allocate_prefix_counts_up_per_second(store):
+    assert store.allocate_prefix("20250131190155") == "20250131190155_1"
+    assert store.allocate_prefix("20250131190155") == "20250131190155_2"
+    assert store.allocate_prefix("20250131190156") == "20250131190156_1"
+
+
+def test_allocate_prefix_skips_results_recorded_without_reservation(store):
+    # 이전 버전의 폴더 처리 결과(순번 0부터, 예약 없음)와 겹치지 않음
+    store.record_result("20250131190155_0", status="done")
+    store.record_result("20250131190155_3", status="done")
+    assert store.allocate_prefix("20250131190155") == "20250131190155_4"
+
+
+def test_allocate_prefix_is_unique_across_processes(store):
+    # 서버(작업 API)와 워커(폴더 처리)가 같은 초에 동시에 예약해도 겹치지 않음
+    context = multiprocessing.get_context("fork")
+    with context.Pool(4) as pool:
+        batches = pool.starmap(_allocate_many, [("20250131190155", 25)] * 4)
+    prefixes = [prefix for batch in batches for prefix in batch]
+    assert len(set(prefixes)) == 100
+    assert sorted(int(prefix.split("_")[1]) for prefix in prefixes) == list(range(1, 101))
+
+
+def test_delete_before_prunes_reservations(store):
+    store.allocate_prefix("20250101000000")
+    store.allocate_prefix("20250301000000")
+    store.delete_before("20250201000000")
+    # 지운 시각의 순번은 다시 1부터 (해당 시각의 결과도 함께 지워졌으므로 겹칠 파일이 없음)
+    assert store.allocate_prefix("20250101000000") == "20250101000000_1"
+    assert store.allocate_prefix("20250301000000") == "20250301000000_2"
+
+
+def test_find_by_hash_returns_latest_done_result(store):
+    store.record_result("20250131190155_1", status="done", content_hash="abc", created_at=1)
+    store.record_result("20250131190156_1", status="done", content_hash="abc", created_at=2)
+    store.record_result("20250131190157_1", status="rejected", content_hash="abc", created_at=3)
+    assert store.find_by_hash("abc")["prefix"] == "20250131190156_1"
+    assert store.find_by_hash("other") is None
+
+
+def test_import_from_folder_reads_shard_tree(store, tmp_path, monkeypatch):
+    # final_image/{YYYYmmdd}/{해시 2자리}/ 샤드 폴더와 샤딩 이전(final_image 바로 아래) 파일을 모두 가져옴
+    folder = tmp_path / "final_image"
+    monkeypatch.setattr(upload_image_check, "final_folder", str(folder))
+
+    def write(prefix, *names, shard=True):
+        current_time, idx = prefix.split("_")
+        path = upload_image_check.shard_folder(current_time, idx) if shard else str(folder)
+        os.makedirs(os.path.join(path, "variants"), exist_ok=True)
+        for name in names:
+            # variants/ 아래 변환 이미지는 이름 그대로
+            with open(os.path.join(path, name if "/" in name else f"{prefix}_{name}"), "wb") as f:
+                f.write(b"x")
+        return path
+
+    done = write("20250131190155_1", "K_02.jpg", "best_shot.png", "front_view.png", "power_gauge.png",
+                 "ball_labels.txt", "table_with_balls.png", "variants/20250131190155_1_best_shot.png.320.webp")
+    rejected = write("20250131190200_2", "K_03.jpg")
+    legacy = write("20250130120000_0", "K_01.jpg", "best_shot.png", shard=False)
+    (folder / "20250131" / "20250131190300_result_20250131190300.json").write_text("[]")
+
+    assert store.import_from_folder(str(folder)) == 3
+    item = store.get_result("20250131190155_1")
+    assert item["status"] == "done"
+    assert item["upload_image"] == os.path.join(done, "20250131190155_1_K_02.jpg")
+    assert item["best_shot"] == os.path.join(done, "20250131190155_1_best_shot.png")
+    assert item["power_gauge"] == os.path.join(done, "20250131190155_1_power_gauge.png")
+    assert store.get_result("20250131190200_2")["status"] == "rejected"
+    assert store.get_result("20250131190200_2")["upload_image"] == os.path.join(rejected, "20250131190200_2_K_03.jpg")
+    assert store.get_result("20250130120000_0")["best_shot"] == os.path.join(legacy, "20250130120000_0_best_shot.png")
+    # DB가 비어 있을 때만 가져옴
+    assert store.import_from_folder(str(folder)) == 0
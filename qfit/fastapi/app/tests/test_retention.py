@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+import retention
+
+NOW = 1738300000.0  # 2025-01-31 부근 (고정 시각)
+DAY = 86400
+
+
+def prefix_at(seconds_ago, idx=1):
+    return f"{retention._time_key(NOW - seconds_ago)}_{idx}"
+
+
+def write_result(store, folder, prefix, size=100, names=("best_shot.png", "front_view.png")):
+    # final_image/{날짜}/{샤드}/{prefix}_{name} 에 결과 파일을 쓰고 결과 DB에 기록
+    shard = folder / prefix[:8] / prefix[-2:]
+    shard.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        path = shard / f"{prefix}_{name}"
+        path.write_bytes(b"x" * size)
+        paths.append(path)
+    store.record_result(prefix, status="done", best_shot=str(paths[0]))
+    return paths
+
+
+@pytest.fixture
+def folder(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_DAYS", 30)
+    monkeypatch.setattr(retention, "RETENTION_MAX_BYTES", 0)
+    monkeypatch.setattr(retention, "GC_MIN_AGE", 600)
+    folder = tmp_path / "final_image"
+    folder.mkdir()
+    return folder
+
+
+def test_expired_results_are_deleted_with_db_rows(folder, store):
+    old = prefix_at(31 * DAY)
+    new = prefix_at(29 * DAY)
+    old_paths = write_result(store, folder, old)
+    new_paths = write_result(store, folder, new)
+
+    stats = retention.collect(str(folder), NOW)
+    assert stats == {"deleted_results": 1, "deleted_files": 2, "freed_bytes": 200, "total_bytes": 200}
+    assert not any(path.exists() for path in old_paths)
+    assert all(path.exists() for path in new_paths)
+    assert store.get_result(old) is None
+    assert store.get_result(new) is not None
+
+
+def test_rows_without_files_are_deleted_after_retention(folder, store):
+    # 파일이 먼저 지워진 결과의 행도 보관 기간이 지나면 삭제
+    store.record_result(prefix_at(31 * DAY), status="rejected")
+    store.record_result(prefix_at(1 * DAY), status="rejected")
+    retention.collect(str(folder), NOW)
+    assert [item["prefix"] for item in store.list_results()] == [prefix_at(1 * DAY)]
+
+
+def test_byte_budget_evicts_oldest_first(folder, store, monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_MAX_BYTES", 450)
+    prefixes = [prefix_at(hours * 3600) for hours in (5, 4, 3)]
+    for prefix in prefixes:
+        write_result(store, folder, prefix)
+
+    stats = retention.collect(str(folder), NOW)
+    # 600바이트 -> 가장 오래된 결과 한 건만 지워 400바이트
+    assert stats["deleted_results"] == 1 and stats["total_bytes"] == 400
+    assert store.get_result(prefixes[0]) is None
+    assert all(store.get_result(prefix) for prefix in prefixes[1:])
+
+
+def test_byte_budget_keeps_recent_results(folder, store, monkeypatch):
+    # 용량 초과여도 최근 10분(GC_MIN_AGE) 내 결과는 게시 중일 수 있으므로 남김
+    monkeypatch.setattr(retention, "RETENTION_MAX_BYTES", 100)
+    old = prefix_at(3600)
+    recent = [prefix_at(300, idx) for idx in (1, 2)]
+    for prefix in [old] + recent:
+        write_result(store, folder, prefix)
+
+    stats = retention.collect(str(folder), NOW)
+    assert stats == {"deleted_results": 1, "deleted_files": 2, "freed_bytes": 200, "total_bytes": 400}
+    assert store.get_result(old) is None
+    assert all(store.get_result(prefix) for prefix in recent)
+
+
+def test_result_json_is_its_own_group(folder, store, monkeypatch):
+    # 폴더 처리 결과 JSON({current_time}_result_{time}.json)은 파일 하나씩 따로 정리 (DB 행 없음)
+    monkeypatch.setattr(retention, "RETENTION_MAX_BYTES", 150)
+    names = [f"{retention._time_key(NOW - seconds_ago)}_result_20250131.json" for seconds_ago in (7200, 3600)]
+    for name in names:
+        (folder / name).write_bytes(b"x" * 100)
+
+    stats = retention.collect(str(folder), NOW)
+    assert stats["deleted_results"] == 1 and stats["total_bytes"] == 100
+    assert [path.name for path in folder.iterdir()] == names[1:]
+
+
+def test_only_stale_empty_folders_are_pruned(folder):
+    # 방금 만든 샤드 폴더(게시 직전)는 비어 있어도 남김
+    fresh = folder / "20250131" / "ab"
+    fresh.mkdir(parents=True)
+    os.utime(fresh, (NOW - 60, NOW - 60))
+    stale = folder / "20250130" / "cd"
+    stale.mkdir(parents=True)
+    os.utime(stale, (NOW - 3600, NOW - 3600))
+
+    retention.collect(str(folder), NOW)
+    assert fresh.is_dir()
+    assert not stale.exists()
@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server_fastapi_qfit
+
+
+@pytest.fixture
+def client(store):
+    # lifespan(워커 풀 기동) 없이 조회 API만 호출
+    store.record_result("20250131190155_1", status="done", score=100,
+                        best_shot="/x/final_image/20250131/ab/20250131190155_1_best_shot.png",
+                        front_view="/x/final_image/20250131/ab/20250131190155_1_front_view.png",
+                        power_gauge="/x/final_image/20250131/ab/20250131190155_1_power_gauge.png")
+    return TestClient(server_fastapi_qfit.app, base_url="https://qfit.example.test")
+
+
+def test_image_info_uses_request_host(client):
+    body = client.get("/image_info/20250131190155_1").json()
+    assert body["image_urls"] == {
+        "best_shot": "https://qfit.example.test/images/20250131190155_1_best_shot.png",
+        "front_view": "https://qfit.example.test/images/20250131190155_1_front_view.png",
+        "power_gauge": "https://qfit.example.test/images/20250131190155_1_power_gauge.png",
+    }
+    assert client.get("/image_info/20250131190155_9").status_code == 404
+
+
+def test_results_and_image_info_return_same_links(client):
+    info = client.get("/image_info/20250131190155_1").json()["image_urls"]
+    results = client.get("/results", params={"start": "20250131"}).json()["results"]
+    assert [item["image_urls"] for item in results] == [info]
+
+
+def test_job_urls_match_image_info(client):
+    request = type("Request", (), {"url_for": lambda self, name, **params:
+                                   f"https://qfit.example.test/images/{params['image_name']}"})()
+    job = {"job_id": "20250131190155_1", "stage": "done"}
+    info = client.get("/image_info/20250131190155_1").json()["image_urls"]
+    assert server_fastapi_qfit.job_response(request, job)["image_urls"] == info
+
+
+def test_upload_preload_links_match_image_urls(client, monkeypatch):
+    # 업로드 응답의 Link 헤더는 본문 image_urls와 같은 주소 (요청을 받은 서버 주소 기준)
+    class Admission:
+        def acquire(self, request):
+            return None
+
+        def release(self, ticket):
+            pass
+
+    async def read_image_body(request):
+        return b"image", "a.jpg"
+
+    async def process_uploaded_image(data, image_name, render_mode="image"):
+        return {"statusCode": "200", "data": [{"best_shot": "/x/final_image/20250131190155_1_best_shot.png",
+                                               "front_view": "/x/final_image/20250131190155_1_front_view.png"}]}
+
+    monkeypatch.setattr(server_fastapi_qfit, "admission", Admission())
+    monkeypatch.setattr(server_fastapi_qfit, "read_image_body", read_image_body)
+    monkeypatch.setattr(server_fastapi_qfit, "process_uploaded_image", process_uploaded_image)
+    response = client.post("/upload_image/", content=b"image")
+    urls = list(response.json()["data"][0]["image_urls"].values())
+    assert urls == ["https://qfit.example.test/images/20250131190155_1_best_shot.png",
+                    "https://qfit.example.test/images/20250131190155_1_front_view.png"]
+    assert response.headers["link"] == ", ".join(f"<{url}>; rel=preload; as=image" for url in urls)
@@ -1,18 +1,57 @@
 import os
+import sys
 import glob
-import subprocess
 import logging
 import shutil
+import tempfile
+import hashlib
 from datetime import datetime
 import re
 import json
+import time
 
+import cv2
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 home_dir = os.path.expanduser("~")  # 홈 디렉토리 가져오기
 
+# model_src 모듈(품질 검사, 탑뷰/시뮬레이션 파이프라인)을 서버 프로세스에서 직접 import
+model_src_dir = os.path.join(home_dir, "aiffelthon_qfit", "model_src")
+if model_src_dir not in sys.path:
+    sys.path.append(model_src_dir)
+
+import image_quality
+import qfit_pipeline
+import result_store
+import metrics
+
+result_folder = os.path.join(model_src_dir, "result_image")  # 파이프라인 결과 저장 폴더 (작업별 하위 폴더 생성)
+final_folder = os.path.join(model_src_dir, "final_image")    # 최종 결과 게시 폴더
+RENDER_MODES = qfit_pipeline.qfit_simulation_v1.RENDER_MODES  # 결과 출력 방식 (image / vector)
+
+
+#----------------------------------------------------------------------------------#
+# final_image 저장 위치 (날짜/해시 샤딩)
+#   final_image/{YYYYmmdd}/{prefix 해시 2자리}/{current_time}_{idx}_{name}{ext}
+# 한 폴더에 파일이 무한히 쌓이지 않고, 파일명만으로 위치를 계산할 수 있어 목록 조회가 필요 없다.
+#----------------------------------------------------------------------------------#
+def shard_folder(current_time, idx):
+    prefix = f"{current_time}_{idx}"
+    return os.path.join(final_folder, str(current_time)[:8], hashlib.md5(prefix.encode()).hexdigest()[:2])
+
+
+def final_image_path(file_name):
+    # 파일명({current_time}_{idx}_{name}{ext}) -> 저장 경로 (샤딩 이전에 저장된 파일은 final_image 바로 아래)
+    parsed = parse_file_info(file_name)
+    if parsed:
+        path = os.path.join(shard_folder(parsed[0], parsed[1]), file_name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(final_folder, file_name)
+
 #-------------------------------------------------------#
 # 앱에서 찍어서 보낸 이미지가 upload폴더에 있는지 체크
 #-------------------------------------------------------#
@@ -48,6 +87,8 @@ def upload_image_move(source_folder, dest_folder, src_fullname, current_time, id
     # 절대 경로로 대상 폴더 설정
     source_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", source_folder)  # upload_image폴더
     dest_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", dest_folder)      # final_image폴더    
+    if dest_folder == "final_image":
+        dest_path = shard_folder(current_time, idx)
         
     # 대상 폴더가 존재하지 않으면 생성
     if not os.path.exists(dest_path):
@@ -70,45 +111,7 @@ def upload_image_move(source_folder, dest_folder, src_fullname, current_time, id
     # 파일 이동
     shutil.move(old_path, new_path)
     logger.info(f"==== 파일 이동 완료: {old_path} -> {new_path}")
-
-
-#----------------------------------------------------------------------------------#
-# result_image 폴더내 모든파일 ---> final_image 폴더로 이동
-# 파일명은 기존파일명_년월일시분초.확장자 형태로 수정함
-# topview 및 경로검출시 생성한 파일명이 동일하여, 덮어 써는것을 방지하기 위하여 이동해줌
-#----------------------------------------------------------------------------------#
-def result_image_image_move(source_folder, dest_folder, current_time, idx):
-    
-    source_path = None
-    dest_path = None
-    
-    # 절대 경로로 대상 폴더 설정
-    source_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", source_folder)  #2개의 폴더가 존재
-    dest_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", dest_folder) #final_image 폴더    
-        
-    # 대상 폴더가 존재하지 않으면 생성
-    if not os.path.exists(dest_path):
-        os.makedirs(dest_path)   
-
-    # 각 소스 폴더의 파일 처리
-    filename = []
-    for filename in os.listdir(source_path):
-        
-        # 대상파일 종류
-        if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp', 'txt')):
-            # 현재 시간 추가
-            #current_time = datetime.now().strftime('%Y%m%d%H%M%S')
-
-            # 기존 파일 경로 및 새 파일명 생성
-            old_path = os.path.join(source_path, filename)
-            name, ext = os.path.splitext(filename)
-            #new_filename = f"{name}_{current_time}{ext}"
-            new_filename = f"{current_time}_{idx}_{name}{ext}"
-            new_path = os.path.join(dest_path, new_filename)
-
-            # 파일 이동
-            shutil.move(old_path, new_path)
-            logger.info(f"==== 파일 이동 완료: {old_path} -> {new_path}")
+    return new_path
 
 
 #----------------------------------------------------------------------------#   
@@ -137,13 +140,17 @@ def generate_data_from_folder(dest_folder):
     # 제외해야 할 이름 정의(해당파일 2개는 제외, 대상파일(3개)=best_shot, front_view, xxx.jpg)
     excluded_names = ["ball_labels", "table_with_balls"]
 
-    # 폴더 내 파일 목록 읽기 및 정렬
-    files = sorted(os.listdir(dest_path))
-    #logger.info(f"files: {files}")
+    # 샤드 폴더(final_image/{YYYYmmdd}/{해시 2자리}/)까지 보관 정책(retention)과 같은 방식으로 파일 목록을 읽고
+    # 파일명(시간순)으로 정렬 (변환 이미지(variants)는 결과 파일이 아니므로 제외)
+    import retention  # retention이 이 모듈을 import하므로 사용할 때 import
+    paths = [path for group in retention.scan_results(dest_path).values() for path in group["paths"]
+             if os.path.basename(os.path.dirname(path)) != "variants"]
+    #logger.info(f"files: {paths}")
        
     # 파일 정보 파싱 및 필터링
     file_info = []
-    for file_name in files:
+    for full_path in sorted(paths, key=os.path.basename):
+        file_name = os.path.basename(full_path)
         parsed = parse_file_info(file_name) #파일이름에서 current_time, idx, name, ext 정보를 추출       
         
         #파일이름 구조: {current_time}_{idx}_{name}.{ext} => 20250126182140_0_K_04.jpg
@@ -154,7 +161,7 @@ def generate_data_from_folder(dest_folder):
                 "idx": parsed[1],            #파일순번
                 "name": parsed[2],           #파일이름
                 "ext": parsed[3],            #확장자
-                "full_path": os.path.join(dest_path, file_name) #파일전체경로
+                "full_path": full_path       #파일전체경로
             })
             
             #logger.info(f"file_info: {file_info}")
@@ -202,6 +209,8 @@ def generate_data_from_folder(dest_folder):
 def save_json_to_folder(data, dest_folder, current_time):
         
     dest_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", dest_folder)  #final_image 폴더    
+    if dest_folder == "final_image":
+        dest_path = os.path.join(dest_path, current_time[:8])  # 날짜 폴더
     
     if not os.path.isdir(dest_path):
         os.makedirs(dest_path)
@@ -217,6 +226,199 @@ def save_json_to_folder(data, dest_folder, current_time):
     return json_file_path
 
 
+#----------------------------------------------------------------------------#
+# 업로드 원본의 내용 해시 (같은 사진을 다시 올리면 이전 결과를 재사용하기 위한 키)
+#----------------------------------------------------------------------------#
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+#----------------------------------------------------------------------------#
+# 작업(요청 이미지 한 장)별 작업공간 폴더 생성: result_image/{current_time}_{idx}_xxxx
+# 동시에 실행되는 요청끼리 같은 파일명(ball_labels.txt, best_shot.png 등)을 덮어쓰지 않도록 분리
+# final_image와 같은 파일시스템에 두어 게시(os.replace)가 원자적으로 이루어지게 한다.
+#----------------------------------------------------------------------------#
+def make_workspace(current_time, idx):
+    os.makedirs(result_folder, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f"{current_time}_{idx}_", dir=result_folder)
+
+
+#----------------------------------------------------------------------------#
+# 작업공간에 결과 파일을 저장한 뒤 final_image 폴더로 게시 (파일명: {current_time}_{idx}_{name}{ext})
+# - 파일마다 os.replace로 이동하므로 읽는 쪽은 쓰는 중인 파일을 보지 않는다.
+# - best_shot.png를 마지막에 게시하여, best_shot이 보이면 나머지 결과 파일도 모두 존재하게 한다.
+# - 게시한 파일 경로와 샷 정보, 단계별 소요시간은 결과 DB(result_store)에 한 번 기록한다.
+#----------------------------------------------------------------------------#
+def publish_results(analysis, workspace, current_time, idx, upload_image=None, image_hash=None):
+    t0 = time.perf_counter()
+    qfit_pipeline.save_results(analysis, workspace)
+    dest_path = shard_folder(current_time, idx)
+    os.makedirs(dest_path, exist_ok=True)
+
+    filenames = sorted(os.listdir(workspace), key=lambda filename: filename == "best_shot.png")
+    published = {}
+    for filename in filenames:
+        name, ext = os.path.splitext(filename)
+        new_path = os.path.join(dest_path, f"{current_time}_{idx}_{name}{ext}")
+        os.replace(os.path.join(workspace, filename), new_path)
+        published[name] = new_path
+    logger.info(f"==== 결과 파일 게시 완료: {len(published)}개 -> {dest_path}")
+
+    artifacts = {name: path for name, path in published.items() if name in result_store.ARTIFACT_NAMES}
+    # 과부하로 빠른 탐색("fast")을 한 결과, 결과 이미지가 없는 vector 결과는
+    # 중복 업로드 재사용 대상에서 제외 (내용 해시를 기록하지 않음)
+    if analysis.get("search_mode", "full") != "full" or analysis.get("render_mode", "image") != "image":
+        image_hash = None
+    result_store.record_result(f"{current_time}_{idx}", status="done", upload_image=upload_image,
+                               content_hash=image_hash, score=analysis["score"], angle=analysis["angle"], power=analysis["power"],
+                               hit_offset=list(analysis["offset"]), reason=analysis["reason"],
+                               ball_position=ball_position_json(analysis["ball_position"]),
+                               timings=analysis["timings"], **artifacts)
+    metrics.observe_stage("publish", time.perf_counter() - t0)
+    metrics.images_processed.labels("done").inc()
+    return published
+
+
+def ball_position_json(ball_position):
+    # {color: (x, y)} -> JSON으로 저장/응답 가능한 {color: [x, y]}
+    return {color: [int(x), int(y)] for color, (x, y) in ball_position.items()}
+
+
+def shot_result_json(analysis):
+    # 분석 결과 중 응답에 담을 샷 정보 (샷 파라미터, 공 위치, 간략화한 궤적, 큐볼 충돌 지점, 단계별 소요시간)
+    return {
+        "score": analysis["score"],
+        "angle": analysis["angle"],
+        "power": analysis["power"],
+        "offset": list(analysis["offset"]),
+        "reason": analysis["reason"],
+        "ball_position": ball_position_json(analysis["ball_position"]),
+        "trajectory": qfit_pipeline.qfit_simulation_v1.trajectory_json(analysis["trajectory"]),
+        "collisions": analysis["collisions"],
+        "timings": analysis["timings"],
+        "search_mode": analysis["search_mode"],
+        "render_mode": analysis["render_mode"],
+    }
+
+
+#----------------------------------------------------------------------------#
+# 품질 검사/경로검출에서 거절된 이미지를 결과 DB에 기록
+#----------------------------------------------------------------------------#
+def record_rejection(rejection, current_time, idx, upload_image=None, image_hash=None):
+    result_store.record_result(f"{current_time}_{idx}", status="rejected", upload_image=upload_image,
+                               content_hash=image_hash, reason=rejection["reason"], message=rejection["message"])
+    metrics.images_processed.labels("rejected").inc()
+
+
+#----------------------------------------------------------------------------#
+# 이미지 데이터(메모리 버퍼)를 품질 검사 후 topview변환, 경로검출 처리
+# 반환: (analysis, None) 또는 품질 검사/경로검출 실패시 (None, 거절 사유 dict)
+#----------------------------------------------------------------------------#
+def analyze_image_data(data, image_name, on_stage=None, search_mode="full", on_event=None, render_mode="image",
+                       on_progress=None):
+    t0 = time.perf_counter()
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    metrics.observe_stage("decode", time.perf_counter() - t0)
+
+    #------------------------------------------------#
+    # 무거운 처리 전에 썸네일로 이미지 품질 사전 검사
+    # (탑뷰 변환에 필요한 원본 디코딩 결과로 검사, 검사용 축소 디코딩을 따로 하지 않음)
+    #------------------------------------------------#
+    quality = image_quality.check_image(image, image_name)
+    if not quality["ok"]:
+        logger.info(f"==== [ 품질 검사 실패: {quality['reason']} ] ====")
+        return None, {"reason": quality["reason"], "message": quality["message"], "metrics": quality["metrics"]}
+
+    #------------------------------------------------------------------#
+    # topview 변환 + 당구경로검출을 현재 프로세스에서 바로 실행
+    # (이미 로드된 라이브러리와 자원을 재사용)
+    #------------------------------------------------------------------#
+    logger.info(f"==== [ topview 변환 및 당구경로검출 실행 ] ====")
+    try:
+        analysis = qfit_pipeline.analyze_image(image, on_stage=on_stage, search_mode=search_mode, on_event=on_event,
+                                               render_mode=render_mode, on_progress=on_progress)
+    except qfit_pipeline.PipelineError as e:
+        logger.info(f"==== [ 당구경로검출 실패: {e.reason} ] ====")
+        return None, {"reason": e.reason, "message": str(e)}
+    metrics.observe_analysis(analysis)
+
+    logger.info(f"==== [ 당구공 경로검출 작업 완료: {analysis['timings']} ]  ====")
+    return analysis, None
+
+
+#----------------------------------------------------------------------------#
+# 업로드 원본 이미지를 final_image 폴더에 저장 (파일명: {current_time}_{idx}_{name}{ext})
+# 서버에서는 처리와 별도로 백그라운드 스레드에서 실행 (요청 처리 경로에서 디스크 쓰기 제외)
+#----------------------------------------------------------------------------#
+def original_image_path(image_name, current_time, idx):
+    name, ext = os.path.splitext(os.path.basename(image_name))
+    return os.path.join(shard_folder(current_time, idx), f"{current_time}_{idx}_{name}{ext}")
+
+
+def archive_original(data, image_name, current_time, idx):
+    new_path = original_image_path(image_name, current_time, idx)
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+
+    tmp_path = new_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, new_path)  # 쓰는 중인 파일이 목록에 보이지 않도록
+    logger.info(f"==== 원본 이미지 보관 완료: {new_path}")
+    return new_path
+
+
+#----------------------------------------------------------------------------#
+# 이번 요청에서 처리한 결과(prefixes: {current_time}_{idx} 목록)로 결과 JSON을 생성/저장하고 API 응답을 구성
+#----------------------------------------------------------------------------#
+def build_result_response(current_time, prefixes, rejected):
+    #--------------------------------------------------------------------------------#
+    # final_image 폴더 전체를 다시 읽지 않고, 결과 DB에서 이번 요청의 결과만 조회한다.
+    # json형태로 자료를 저장하고 저장된 이미지건에 맞게 정보를 넘긴다.
+    #--------------------------------------------------------------------------------#
+    logger.info(f"==== [ JSON 파일 생성시작  ]  ====")
+
+    data = [result_store.to_data_item(item) for item in result_store.get_results(prefixes)]
+    logger.info(f"data: {data}")
+
+    # JSON 파일로 저장
+    json_path = save_json_to_folder(data, "final_image", current_time)
+
+    # 결과 로그
+    logger.info(f"===== [ JSON 파일 저장 완료: {json_path} ] ====")
+
+    return {"statusCode": "200", "message": "파일 업로드 및 당구경로검출 처리완료", "json_file": json_path, "data": data,
+            "rejected": rejected}
+
+
+#----------------------------------------------------------------------------#
+# 요청 본문으로 받은 이미지 한 장을 처리 (upload_image 폴더를 거치지 않음)
+# 원본 이미지 보관(archive_original)은 호출하는 쪽에서 별도로 실행
+#----------------------------------------------------------------------------#
+def execute_uploaded_image(data, image_name, current_time, idx, image_hash=None, search_mode="full", render_mode="image"):
+    try:
+        upload_image = original_image_path(image_name, current_time, idx)
+        analysis, rejection = analyze_image_data(data, image_name, search_mode=search_mode, render_mode=render_mode)
+        if rejection is not None:
+            record_rejection(rejection, current_time, idx, upload_image, image_hash)
+            rejected = [{"index": str(idx), "upload_image": image_name, **rejection}]
+            return {"statusCode": "error", "message": "처리 가능한 이미지 없음", "rejected": rejected}
+
+        workspace = make_workspace(current_time, idx)
+        try:
+            publish_results(analysis, workspace, current_time, idx, upload_image, image_hash)
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+        logger.info(f"==== [ topview 및 당구경로 검출작업 완료 ]  ====")
+
+        # 결과 JSON 파일명에 순번까지 붙여 같은 초에 끝난 이미지끼리(일괄 업로드 등) 덮어쓰지 않게 함
+        response = build_result_response(f"{current_time}_{idx}", [f"{current_time}_{idx}"], [])
+        response["result"] = shot_result_json(analysis)
+        return response
+    except Exception as e:
+        logger.error(f"알 수 없는 오류 발생: {e}")
+        return {"statusCode": "error", "message": f"Unexpected error: {str(e)}"}
+
+
 #----------------------------------------------------------------------------#
 # upload_image 폴더에 파일이 존재하는지 체크, 
 # 파일이 존재시 topview변환, 경로검출처리를 수행후 최종이미지 생성
@@ -228,85 +430,60 @@ def check_files_and_execute():
         
         # 현재 시간 추가
         current_time = datetime.now().strftime('%Y%m%d%H%M%S')
+        rejected = []  # 품질 검사에서 거절된 이미지 목록
+        prefixes = []  # 이 요청이 처리한 이미지 ({current_time}_{idx})
                             
-        for index, image_filename in enumerate(result):         
+        for image_filename in result:
+            # 이미지마다 결과 DB에서 순번을 예약 (같은 초의 다른 요청/작업 API와 파일명이 겹치지 않음)
+            index = int(result_store.allocate_prefix(current_time).split("_")[1])
             logger.info(f"==== index:{index}, 이미지파일명: {image_filename}")
-            
-            #------------------------------------------------#
-            # 파일이 있는 경우 topview.py 스크립트 실행
-            #------------------------------------------------#
-            topview_file = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "topview.py")    #앱이미지 존재시 실행할 탑뷰처리하는 파일명
-            logger.info(f"파이썬 파일 경로: {topview_file}")
-            
-            logger.info(f"==== [ topview.py 스크립트 실행 ] ====")               
-            top_result = subprocess.run(["python", topview_file, image_filename], check=True, capture_output=True, text=True)
-            logger.info(f"top_result: {top_result}")
-        
-            logger.info(f"==== [ TopView 이미지로 변환작업 완료 ] ====")
-            
-            #------------------------------------------------------#
-            # 성공한 경우 당구경로검출 qfit_simulation_v1.py 스크립트 실행
-            #------------------------------------------------------#
-            qfit_simulation_v1_file = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "qfit_simulation_v1.py")            
-
-            logger.info(f"==== [ qfit_simulation_v1.py 스크립트 실행 ] ====")
-            sim_v1_result = subprocess.run(["python", qfit_simulation_v1_file], check=True)
-            logger.info(f"pym_result: {sim_v1_result}")
-            
-            logger.info(f"==== [ 당구공 경로검출 작업 완료 ]  ====")
-                            
-            #-----------------------------------------------------------------------------#
-            # upload_image 폴더내 image_filename 파일만 -> final_image 폴더로 이동(한개파일)
-            #-----------------------------------------------------------------------------#
-            src_folder = "upload_image" # 원본 폴더 목록
-            dest_folder = "final_image" # 이동할 폴더
-            
-            logger.info(f"==== [ upload_image 폴더내 파일 이동 작업 시작 ]  ====")
-            upload_image_move(src_folder, dest_folder, image_filename, current_time, index)
-            logger.info(f"==== upload_image 폴더의 [{image_filename}] -> final_image 폴더로 이동완료(move)")                  
-            
+
             #-----------------------------------------------------------------------------#
-            # result_image 폴더내 모든파일 -> final_image 폴더로 이동 (여러건 파일존재)
+            # upload_image 폴더의 파일을 작업공간으로 옮겨 선점 (동시에 들어온 다른 요청이 이미 가져갔으면 건너뜀)
             #-----------------------------------------------------------------------------#
-            src_folder = "result_image" # 원본 폴더 목록
-            dest_folder = "final_image"  # 이동할 폴더
-            
-            logger.info(f"==== [ result_image 폴더내 모든파일 이동 작업 시작 ]  ====")
-            result_image_image_move(src_folder, dest_folder, current_time, index)
-            logger.info(f"==== result_image 폴더내 모든파일 -> final_image 폴더로 이동완료(move)")
-            
+            workspace = make_workspace(current_time, index)
+            claimed_filename = os.path.join(workspace, os.path.basename(image_filename))
+            try:
+                os.replace(image_filename, claimed_filename)
+            except FileNotFoundError:
+                logger.info(f"==== 다른 요청에서 처리중인 파일: {image_filename}")
+                shutil.rmtree(workspace, ignore_errors=True)
+                continue
+            prefixes.append(f"{current_time}_{index}")
+
+            try:
+                with open(claimed_filename, "rb") as f:
+                    data = f.read()
+                image_hash = content_hash(data)
+
+                analysis, rejection = analyze_image_data(data, os.path.basename(image_filename))
+                if rejection is not None:
+                    rejected.append({"index": str(index), "upload_image": os.path.basename(image_filename), **rejection})
+                    # 거절된 원본도 final_image 폴더로 이동
+                    upload_image = upload_image_move("upload_image", "final_image", claimed_filename, current_time, index)
+                    record_rejection(rejection, current_time, index, upload_image, image_hash)
+                    continue
+
+                #-----------------------------------------------------------------------------#
+                # 원본 이미지 -> final_image 폴더로 이동 후, 작업공간의 결과 파일을 final_image 폴더로 게시
+                #-----------------------------------------------------------------------------#
+                upload_image = upload_image_move("upload_image", "final_image", claimed_filename, current_time, index)
+                publish_results(analysis, workspace, current_time, index, upload_image, image_hash)
+            finally:
+                shutil.rmtree(workspace, ignore_errors=True)
 
         logger.info(f"==== [ topview 및 당구경로 검출작업 완료 ]  ====")
         
-        #--------------------------------------------------------------------------------#
-        # upload_image 폴더에 있는 이미지 파일건수 기준으로
-        # 건수만큼 loop돌면서 final_image 폴더내 파일을 우선 sort하고
-        # 각 파일의 _idx_ 기준으로 파일의 정보를 찾아서 각 파일을 구성한다.
-        # json형태로 자료를 저장하고 저장된 이미지건에 맞게 정보를 넘긴다.
-        #--------------------------------------------------------------------------------#
-        logger.info(f"==== [ JSON 파일 생성시작  ]  ====")
-               
-        data = generate_data_from_folder("final_image")
-        logger.info(f"data: {data}")
-        
-        # JSON 파일로 저장
-        json_path = save_json_to_folder(data, "final_image", current_time)
-        
-        # 결과 로그
-        logger.info(f"===== [ JSON 파일 저장 완료: {json_path} ] ====")
+        if not prefixes:
+            raise FileNotFoundError("처리할 이미지 파일이 없습니다.")
+        if len(rejected) == len(prefixes):
+            return {"statusCode": "error", "message": "처리 가능한 이미지 없음", "rejected": rejected}
         
-        # 결과 반환
-        #return {
-        #    "statusCode": "200",
-        #    "data": data
-        #}
-        return {"statusCode": "200", "message": "파일 업로드 및 당구경로검출 처리완료", "json_file": json_path, "data": data}
+        # 결과 JSON 파일명에 첫 이미지의 순번까지 붙여 같은 초의 다른 요청과 덮어쓰지 않게 함
+        return build_result_response(prefixes[0], prefixes, rejected)
     except FileNotFoundError as e:
         logger.error(f"{e}")
         return {"statusCode": "error", "message": "No image files found in the folder."}
-    except subprocess.CalledProcessError as e:
-        logger.error(f"스크립트 실행 중 오류 발생: {e}")
-        return {"statusCode": "error", "message": f"Script execution error: {str(e)}"}
     except Exception as e:
         logger.error(f"알 수 없는 오류 발생: {e}")
         return {"statusCode": "error", "message": f"Unexpected error: {str(e)}"}
\ No newline at end of file
@@ -0,0 +1,135 @@
+import os
+import logging
+
+from fastapi import HTTPException
+from python_multipart.multipart import MultipartParser, parse_options_header  # pip install python-multipart
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 업로드 이미지 최대 크기 (기본 20MB, 초과시 413)
+MAX_UPLOAD_BYTES = int(os.environ.get("QFIT_MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+# 일괄 업로드 한 요청의 최대 이미지 수 (초과시 413)
+MAX_BATCH_FILES = int(os.environ.get("QFIT_MAX_BATCH_FILES", 10))
+DEFAULT_FILENAME = "upload.jpg"
+
+
+#----------------------------------------------------------------------------#
+# multipart/form-data 본문에서 파일 파트를 앞에서부터 max_files개까지 메모리 버퍼에 모으는 스트리밍 파서
+# (Starlette의 request.form()은 1MB가 넘는 파일을 임시파일로 디스크에 쓰므로 사용하지 않음)
+#----------------------------------------------------------------------------#
+class _FileParts:
+    def __init__(self, boundary, max_files=1):
+        self.files = []        # [(bytearray, filename)]
+        self.max_files = max_files
+        self.buffer = None     # 현재 받고 있는 파일 파트
+        self.filename = None
+        self.done = False
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self.parser = MultipartParser(boundary, {
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_field.lower() == b"content-disposition" and not self.done:
+            _, options = parse_options_header(self._header_value)
+            if b"filename" in options:
+                self.filename = options[b"filename"].decode("utf-8", errors="replace")
+                self.buffer = bytearray()
+                self._in_file = True
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_part_data(self, data, start, end):
+        if self._in_file:
+            self.buffer += data[start:end]
+            if len(self.buffer) > MAX_UPLOAD_BYTES:
+                raise _too_large()
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self.files.append((self.buffer, self.filename))
+            self.done = len(self.files) >= self.max_files
+
+    def write(self, chunk):
+        self.parser.write(chunk)
+
+
+def _too_large():
+    return HTTPException(status_code=413, detail=f"이미지 크기가 {MAX_UPLOAD_BYTES // (1024 * 1024)}MB를 넘습니다.")
+
+
+#----------------------------------------------------------------------------#
+# 요청 본문을 청크 단위로 읽어 메모리 버퍼로 반환 (디스크에 쓰지 않음)
+# - multipart/form-data: 첫번째 파일 파트 (파일명은 파트의 filename)
+# - 그 외(image/jpeg 등): 본문 전체 (파일명은 ?filename= 또는 X-Filename 헤더)
+# 본문이 비어 있으면 (None, None) 반환
+#----------------------------------------------------------------------------#
+async def read_image_body(request):
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise _too_large()
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+
+    if content_type == b"multipart/form-data":
+        if b"boundary" not in options:
+            raise HTTPException(status_code=400, detail="multipart boundary가 없습니다.")
+        parts = _FileParts(options[b"boundary"])
+        async for chunk in request.stream():
+            parts.write(chunk)
+            if parts.done:
+                break
+        data, filename = parts.files[0] if parts.files else (None, None)
+    else:
+        data = bytearray()
+        async for chunk in request.stream():
+            data += chunk
+            if len(data) > MAX_UPLOAD_BYTES:
+                raise _too_large()
+        filename = request.query_params.get("filename") or request.headers.get("x-filename")
+
+    if not data:
+        return None, None
+    filename = os.path.basename(filename or "") or DEFAULT_FILENAME
+    logger.info(f"이미지 수신: {filename} ({len(data)} bytes)")
+    return bytes(data), filename
+
+
+#----------------------------------------------------------------------------#
+# 일괄 업로드: multipart/form-data 본문의 파일 파트를 순서대로 모두 메모리로 수신
+# 반환: [(bytes, filename)] (빈 파일 파트는 (None, filename)으로 자리를 유지)
+# 파일이 MAX_BATCH_FILES개를 넘거나 한 파일이 MAX_UPLOAD_BYTES를 넘으면 413
+#----------------------------------------------------------------------------#
+async def read_image_files(request):
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data":
+        raise HTTPException(status_code=415, detail="multipart/form-data로 이미지 파일들을 보내야 합니다.")
+    if b"boundary" not in options:
+        raise HTTPException(status_code=400, detail="multipart boundary가 없습니다.")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES * MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail="일괄 업로드 크기가 너무 큽니다.")
+
+    parts = _FileParts(options[b"boundary"], max_files=MAX_BATCH_FILES + 1)
+    async for chunk in request.stream():
+        parts.write(chunk)
+        if len(parts.files) > MAX_BATCH_FILES:
+            raise HTTPException(status_code=413, detail=f"한 번에 {MAX_BATCH_FILES}장까지 업로드할 수 있습니다.")
+
+    files = [(bytes(data) or None, os.path.basename(filename or "") or DEFAULT_FILENAME) for data, filename in parts.files]
+    logger.info(f"일괄 이미지 수신: {len(files)}장 ({sum(len(data or b'') for data, _ in files)} bytes)")
+    return files
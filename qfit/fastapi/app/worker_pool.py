@@ -0,0 +1,137 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 워커 프로세스 수 (기본: CPU 코어 수 - 1, 이벤트 루프용으로 코어 하나를 남김)
+POOL_SIZE = int(os.environ.get("QFIT_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+
+
+#----------------------------------------------------------------------------#
+# 워커 프로세스 초기화: 라이브러리 import + 자원 로드 (프로세스당 한 번)
+#----------------------------------------------------------------------------#
+def _init_worker():
+    import metrics
+    import upload_image_check  # model_src 경로 추가 + cv2/pymunk/파이프라인 import
+    metrics.init()  # 서버에서 물려받은 PROMETHEUS_MULTIPROC_DIR에 지표 기록
+    upload_image_check.qfit_pipeline.warm_up()
+
+
+def _timed(fn, *args):
+    # 워커에서 fn(*args) 실행 시간(대기열 대기 제외)을 함께 반환
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def _ping(hold=0.0):
+    # hold초 동안 워커를 점유하여 다른 ping이 새 프로세스로 가도록 한다
+    time.sleep(hold)
+    return os.getpid()
+
+
+#----------------------------------------------------------------------------#
+# CPU 작업(탑뷰 변환, 샷 탐색)을 이벤트 루프 밖에서 실행하는 미리 데워둔 프로세스 풀
+#----------------------------------------------------------------------------#
+class WorkerPool:
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.executor = None
+        self.warm_pids = set()
+        self.busy = 0         # 제출된 작업 수 (실행중 + 워커를 기다리는 작업)
+        self.job_seconds = 30.0  # 작업 한 건의 워커 실행시간 지수이동평균 (대기 시간 추정용)
+        self.started_at = None
+        self._warm_task = None
+
+    def start(self):
+        # fork 대신 spawn: uvicorn 이벤트 루프/스레드 상태를 자식 프로세스로 복제하지 않는다
+        self.executor = ProcessPoolExecutor(max_workers=self.size,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker)
+        self.started_at = time.time()
+        self._warm_task = asyncio.get_running_loop().create_task(self._warm_up())
+        logger.info(f"==== 워커 풀 시작 (size={self.size}) ====")
+
+    async def _warm_up(self):
+        # 워커 수만큼 동시에 작업을 넣어 모든 프로세스를 미리 기동/초기화
+        # (ProcessPoolExecutor는 놀고 있는 워커가 없을 때만 새 프로세스를 띄우므로 ping이 워커를 잠시 점유)
+        loop = asyncio.get_running_loop()
+        hold = 0.1
+        while len(self.warm_pids) < self.size:
+            pids = await asyncio.gather(*[loop.run_in_executor(self.executor, _ping, hold)
+                                          for _ in range(self.size)])
+            self.warm_pids.update(pids)
+            hold *= 2
+        logger.info(f"==== 워커 풀 준비 완료: {len(self.warm_pids)}개 프로세스, "
+                    f"{time.time() - self.started_at:.1f}초 ====")
+
+    @property
+    def ready(self):
+        return self._warm_task is not None and self._warm_task.done() and not self._warm_task.exception()
+
+    async def run(self, fn, *args, on_submit=None):
+        """
+        fn(*args)를 워커 프로세스에서 실행하고 결과를 기다린다 (이벤트 루프는 막지 않음)
+        on_submit(future)를 넘기면 제출 직후 워커 future(concurrent.futures.Future)를 전달한다.
+        (future.cancel()은 아직 워커가 가져가지 않은 작업만 취소하고, 실행중인 작업은 끝까지 실행됨)
+        busy는 워커 future가 실제로 끝났을 때 줄인다. (기다리던 쪽이 먼저 취소되어도 실행중인 동안은 busy)
+        """
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(_timed, fn, *args)
+        self.busy += 1
+        future.add_done_callback(lambda _: self._call_soon(loop, self._release))
+        if on_submit is not None:
+            on_submit(future)
+        result, seconds = await asyncio.wrap_future(future)
+        self.job_seconds = 0.8 * self.job_seconds + 0.2 * seconds
+        return result
+
+    @staticmethod
+    def _call_soon(loop, callback):
+        # 워커 future 완료 콜백(executor 스레드)에서 이벤트 루프로 넘김
+        try:
+            loop.call_soon_threadsafe(callback)
+        except RuntimeError:
+            pass  # 서버 종료로 이벤트 루프가 이미 닫힌 경우
+
+    def _release(self):
+        self.busy -= 1
+
+    @property
+    def running(self):
+        return min(self.busy, self.size)
+
+    @property
+    def queued(self):
+        # 빈 워커가 없어 executor 대기열에서 기다리는 작업 수
+        return max(0, self.busy - self.size)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "size": self.size,
+            "warm_workers": len(self.warm_pids),
+            "busy": self.busy,
+            "running": self.running,
+            "queued": self.queued,
+            "job_seconds": round(self.job_seconds, 2),
+        }
+
+    def terminate(self):
+        # 워커 프로세스 강제 종료 (서버 종료시 취소 요청에도 끝나지 않는 작업용)
+        # 실행중/대기중이던 작업의 future는 BrokenProcessPool 예외로 끝남
+        processes = getattr(self.executor, "_processes", None) or {}
+        for process in list(processes.values()):
+            process.terminate()
+        logger.warning(f"==== 워커 프로세스 {len(processes)}개 강제 종료 ====")
+
+    def shutdown(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            logger.info("==== 워커 풀 종료 ====")
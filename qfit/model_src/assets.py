@@ -0,0 +1,145 @@
+"""
+ 렌더링 자원(이미지/폰트) 레지스트리
+
+결과 이미지를 만들 때마다 frame.png, 공 이미지, hit_point.png, white_cue_ball.png를 cv2.imread로,
+Roboto-Regular.ttf를 ImageFont.truetype으로 다시 읽던 것을 프로세스당 한 번만 읽어 재사용합니다.
+
+- 스프라이트(알파 채널 이미지)는 premultiplied alpha(색상 x 알파/255) BGRA uint8 배열로 저장하고,
+  실제로 쓰는 크기로 미리 줄여 둡니다. (premultiplied 상태에서 줄여야 가장자리 색이 번지지 않음)
+- 없는 자원은 처음 읽을 때 한 번만 경고하고, 이후에는 None(폰트는 기본 폰트)을 바로 반환합니다.
+- 워커 시작시 load()로 미리 읽어 두면 첫 요청의 지연이 없고, 없는 자원이 시작 로그에 한 번 나옵니다.
+
+ 사용:
+- sprite("frame.png"): premultiplied BGRA 스프라이트 (원본 크기)
+- sprite("hit_point.png", (24, 24)): 지정 크기로 줄인 스프라이트
+- image("table-cloth.png"): 알파 채널 없는 BGR 이미지
+- font(20): Roboto-Regular.ttf 20pt
+"""
+
+import os
+import logging
+
+import cv2
+import numpy as np
+from PIL import ImageFont
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+home_dir = os.path.expanduser("~")  # 홈 디렉토리 가져오기
+asset_dir = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image")
+
+FONT_FILE = "Roboto-Regular.ttf"
+
+# 시작시 미리 읽는 자원 (렌더링 함수가 실제로 쓰는 크기)
+# - frame.png: 결과 이미지 프레임 (overlay_frame)
+# - red/white/yellow.png: 테이블 위 공 (place_ball_on_table, 원본 크기)
+# - white_cue_ball.png: 정면 큐볼 (render_front_hit_point, 반지름 80 -> 160x160)
+# - hit_point.png: 당점 표시 (render_front_hit_point, 반지름의 30% -> 24x24)
+PRELOAD_SPRITES = (
+    ("frame.png", None),
+    ("red.png", None),
+    ("white.png", None),
+    ("yellow.png", None),
+    ("white_cue_ball.png", (160, 160)),
+    ("hit_point.png", (24, 24)),
+)
+PRELOAD_IMAGES = ("table-cloth.png",)
+PRELOAD_FONT_SIZES = (20, 24)  # 파워 게이지 20pt, "Hit Here" 24pt
+
+_sprites = {}   # {(경로, 크기): premultiplied BGRA 또는 None}
+_images = {}    # {경로: BGR 또는 None}
+_fonts = {}     # {크기: 폰트}
+_missing = set()
+
+
+def asset_path(name):
+    # 파일명이면 image 폴더 기준, 절대 경로면 그대로
+    return name if os.path.isabs(name) else os.path.join(asset_dir, name)
+
+
+def _report_missing(path):
+    if path not in _missing:
+        _missing.add(path)
+        logger.warning(f"렌더링 자원 없음: {path}")
+
+
+def premultiply(bgra):
+    # 색상 채널에 알파를 곱해 둔 BGRA (반올림 정수 연산)
+    result = bgra.copy()
+    alpha = bgra[:, :, 3:4].astype(np.uint16)
+    result[:, :, :3] = (bgra[:, :, :3] * alpha + 127) // 255
+    return result
+
+
+def _read(path, flags):
+    image = cv2.imread(path, flags) if os.path.exists(path) else None
+    if image is None:
+        _report_missing(path)
+    return image
+
+
+def sprite(name, size=None):
+    """
+    premultiplied BGRA 스프라이트를 반환합니다. size=(w, h)를 주면 그 크기로 줄인 것을 반환합니다.
+    (반환 배열은 공유되므로 수정하지 말 것) 파일이 없으면 None.
+    """
+    key = (asset_path(name), size)
+    if key not in _sprites:
+        base_key = (key[0], None)
+        if base_key not in _sprites:
+            image = _read(key[0], cv2.IMREAD_UNCHANGED)
+            if image is not None:
+                if image.ndim == 2:
+                    image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+                elif image.shape[2] == 3:
+                    image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+                image = premultiply(image)
+                image.flags.writeable = False
+            _sprites[base_key] = image
+        image = _sprites[base_key]
+        if size is not None and image is not None:
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            image.flags.writeable = False
+        _sprites[key] = image
+    return _sprites[key]
+
+
+def image(name):
+    """
+    알파 채널 없는 BGR 이미지를 반환합니다. (반환 배열은 공유되므로 수정하지 말 것) 파일이 없으면 None.
+    """
+    path = asset_path(name)
+    if path not in _images:
+        loaded = _read(path, cv2.IMREAD_COLOR)
+        if loaded is not None:
+            loaded.flags.writeable = False
+        _images[path] = loaded
+    return _images[path]
+
+
+def font(size):
+    # Roboto-Regular.ttf (없으면 PIL 기본 폰트)
+    if size not in _fonts:
+        path = asset_path(FONT_FILE)
+        try:
+            _fonts[size] = ImageFont.truetype(path, size)
+        except IOError:
+            _report_missing(path)
+            _fonts[size] = ImageFont.load_default()
+    return _fonts[size]
+
+
+def load():
+    """
+    렌더링 자원을 모두 미리 읽습니다. 없는 자원 경로 목록을 반환합니다. (경고는 자원마다 한 번)
+    """
+    for name, size in PRELOAD_SPRITES:
+        sprite(name, size)
+    for name in PRELOAD_IMAGES:
+        image(name)
+    for size in PRELOAD_FONT_SIZES:
+        font(size)
+    if _missing:
+        logger.warning(f"렌더링 자원 {len(_missing)}개 없음 (해당 요소 없이 렌더링): {sorted(_missing)}")
+    return sorted(_missing)
@@ -0,0 +1,151 @@
+"""
+ 공 검출 방식 벤치마크 (HSV vs YOLO)
+
+원본 사진들을 topview 파이프라인으로 탑뷰 변환한 뒤,
+같은 탑뷰 이미지에 대해 HSV 색상 검출과 YOLO(ONNX, CPU) 검출의 지연시간과 정확도를 비교합니다.
+
+- 정답 좌표: 이미지와 같은 이름의 .txt 파일 (ball_labels.txt와 같은 '공이름 x y' 형식)
+  정답 파일이 없으면 두 방식의 좌표 차이(일치도)만 보고합니다.
+- YOLO는 1장씩 추론한 경우와 --batch 장씩 묶어서 추론한 경우를 모두 측정합니다.
+
+ 실행 예:
+    python bench_ball_detector.py upload_image/*.jpg --repeat 20 --batch 8
+"""
+
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+import topview
+
+
+def load_labels(image_file):
+    label_path = os.path.splitext(image_file)[0] + ".txt"
+    labels = {}
+    if not os.path.exists(label_path):
+        return None
+    with open(label_path, "r") as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) >= 3:
+                labels[parts[0]] = (int(parts[1]), int(parts[2]))
+    return labels
+
+
+def prepare_tables(image_files):
+    # 원본 -> 축소 -> 모서리 검출 -> 탑뷰 (검출 대상 이미지 준비)
+    tables = []
+    for image_file in image_files:
+        image = cv2.imread(image_file)
+        if image is None:
+            print(f"[오류] 이미지 불러오기 실패: {image_file}")
+            continue
+        image = cv2.resize(image, (int(image.shape[1] * 0.15), int(image.shape[0] * 0.15)))
+        warped = topview.get_warped_table(image, topview.find_corners(image))
+        if warped is None:
+            continue
+        tables.append((image_file, warped, load_labels(image_file)))
+    return tables
+
+
+def position_error(found, expected):
+    # 색상별 픽셀 오차와 미검출 개수
+    errors, missed = [], 0
+    for color, (ex, ey) in expected.items():
+        if color not in found:
+            missed += 1
+            continue
+        fx, fy = found[color]
+        errors.append(float(np.hypot(fx - ex, fy - ey)))
+    return errors, missed
+
+
+def summarize(latencies_ms):
+    return {
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "mean_ms": round(float(np.mean(latencies_ms)), 3),
+    }
+
+
+def run_benchmark(tables, repeat, batch):
+    images = [t[1] for t in tables]
+    report = {"images": len(images)}
+
+    # 1) HSV
+    latencies, results_hsv = [], []
+    for image in images:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            found = topview.find_ball(image, "hsv")
+            latencies.append((time.perf_counter() - t0) * 1000)
+        results_hsv.append(found)
+    report["hsv"] = summarize(latencies)
+
+    # 2) YOLO 1장씩 (첫 호출의 모델 로드 시간은 별도 기록)
+    t0 = time.perf_counter()
+    topview.find_ball(images[0], "yolo")
+    report["yolo_load_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+
+    latencies, results_yolo = [], []
+    for image in images:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            found = topview.find_ball(image, "yolo")
+            latencies.append((time.perf_counter() - t0) * 1000)
+        results_yolo.append(found)
+    report["yolo"] = summarize(latencies)
+
+    # 3) YOLO 배치 추론 (이미지 1장당 지연시간으로 환산)
+    latencies = []
+    for _ in range(repeat):
+        for i in range(0, len(images), batch):
+            chunk = images[i:i + batch]
+            t0 = time.perf_counter()
+            topview.find_ball_batch(chunk, "yolo")
+            latencies.append((time.perf_counter() - t0) * 1000 / len(chunk))
+    report[f"yolo_batch{batch}_per_image"] = summarize(latencies)
+
+    # 4) 정확도 (정답 파일이 있으면 정답 기준, 없으면 HSV 대비 일치도)
+    for name, results in (("hsv", results_hsv), ("yolo", results_yolo)):
+        errors, missed, total = [], 0, 0
+        for (image_file, _, labels), found, ref in zip(tables, results, results_hsv):
+            expected = labels if labels is not None else ref
+            e, m = position_error(found, expected)
+            errors += e
+            missed += m
+            total += len(expected)
+        report[name]["mean_error_px"] = round(float(np.mean(errors)), 2) if errors else None
+        report[name]["missed"] = f"{missed}/{total}"
+
+    report["ground_truth"] = all(t[2] is not None for t in tables)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HSV / YOLO 공 검출 지연시간 및 정확도 비교")
+    parser.add_argument("images", nargs="+", help="원본 사진 파일 목록")
+    parser.add_argument("--repeat", type=int, default=10, help="이미지당 반복 측정 횟수")
+    parser.add_argument("--batch", type=int, default=8, help="YOLO 배치 크기")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    tables = prepare_tables(args.images)
+    if not tables:
+        print("[오류] 탑뷰 변환에 성공한 이미지가 없음")
+        return
+
+    report = run_benchmark(tables, args.repeat, args.batch)
+    print(json.dumps(report, ensure_ascii=False, indent=4))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
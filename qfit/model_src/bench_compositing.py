@@ -0,0 +1,179 @@
+"""
+ 알파 합성 벤치마크 (기존 float64 채널별 블렌딩 vs compositing.composite)
+
+결과 이미지 한 장을 만들 때의 세 가지 합성을 같은 입력으로 비교합니다.
+- overlay_frame: 900x500 프레임을 테이블 이미지 위에 합성 (BGRA)
+- place_ball_on_table: 공 3개를 테이블 천 위에 합성 (BGR)
+- front_hit_point: 정면 큐볼(160x160) + 당점(24x24) 합성 (BGRA)
+
+기존 방식은 이전 렌더링 코드와 같은 계산(스프라이트 전체를 / 255.0 으로 float64 변환 후 채널별 루프)이고,
+시간(ms)과 호출 한 번의 최대 임시 메모리(tracemalloc, NumPy 할당 기준)를 함께 보고합니다.
+
+ 실행 예:
+    python bench_compositing.py --repeat 200
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+import assets
+import compositing
+import topview
+
+
+#------------------------------------------------------------#
+# 기존 방식 (straight alpha 스프라이트, float64 채널별 블렌딩)
+#------------------------------------------------------------#
+def unpremultiply(sprite):
+    alpha = sprite[:, :, 3:4].astype(np.float64)
+    straight = sprite.copy()
+    straight[:, :, :3] = np.where(alpha > 0, np.minimum(255, sprite[:, :, :3] * 255.0 / np.maximum(alpha, 1)), 0)
+    return straight
+
+
+def legacy_overlay_frame(base_image, frame_image):
+    base_rgba = np.dstack([base_image, np.full(base_image.shape[:2], 255, np.uint8)])
+    h_f, w_f = frame_image.shape[:2]
+    h_b, w_b = base_image.shape[:2]
+    x_offset, y_offset = (w_f - w_b) // 2, (h_f - h_b) // 2
+    padded_base = np.zeros((h_f, w_f, 4), dtype=np.uint8)
+    padded_base[y_offset:y_offset + h_b, x_offset:x_offset + w_b] = base_rgba
+    alpha_frame = frame_image[:, :, 3:4] / 255.0
+    result = np.zeros_like(padded_base)
+    for c in range(3):
+        result[:, :, c] = (frame_image[:, :, c] * alpha_frame[:, :, 0] +
+                           padded_base[:, :, c] * (1 - alpha_frame[:, :, 0])).astype(np.uint8)
+    result[:, :, 3] = np.where(frame_image[:, :, 3] == 0, padded_base[:, :, 3], frame_image[:, :, 3])
+    return result
+
+
+def legacy_blend(dst, sprite, x, y):
+    h, w = sprite.shape[:2]
+    alpha = sprite[:, :, 3] / 255.0
+    for c in range(3):
+        dst[y:y + h, x:x + w, c] = (alpha * sprite[:, :, c] + (1 - alpha) * dst[y:y + h, x:x + w, c]).astype(np.uint8)
+    if dst.shape[2] == 4:
+        dst[y:y + h, x:x + w, 3] = (alpha * 255 + (1 - alpha) * dst[y:y + h, x:x + w, 3]).astype(np.uint8)
+    return dst
+
+
+#------------------------------------------------------------#
+# 새 방식 (premultiplied 스프라이트, 정수 ROI 합성)
+#------------------------------------------------------------#
+def kernel_overlay_frame(base_image, frame_image):
+    h_f, w_f = frame_image.shape[:2]
+    h_b, w_b = base_image.shape[:2]
+    x_offset, y_offset = (w_f - w_b) // 2, (h_f - h_b) // 2
+    result = np.zeros((h_f, w_f, 4), dtype=np.uint8)
+    result[y_offset:y_offset + h_b, x_offset:x_offset + w_b, :3] = base_image
+    result[y_offset:y_offset + h_b, x_offset:x_offset + w_b, 3] = 255
+    return compositing.composite(result, frame_image, 0, 0)
+
+
+def make_cases():
+    cloth = assets.image("table-cloth.png")
+    frame = assets.sprite("frame.png")
+    balls = [assets.sprite(f"{color}.png") for color in ("red", "white", "yellow")]
+    front_ball = assets.sprite("white_cue_ball.png", (160, 160))
+    hit_point = assets.sprite("hit_point.png", (24, 24))
+    if any(image is None for image in [cloth, frame, front_ball, hit_point] + balls):
+        raise SystemExit("[오류] 렌더링 자원이 없습니다 (assets.load() 경고 참고)")
+
+    table = topview.place_ball_on_table(cloth, {"red": (327, 109), "white": (426, 247), "yellow": (625, 206)})
+    positions = [(313, 95), (412, 233), (611, 192)]
+    straight = {"frame": unpremultiply(frame), "balls": [unpremultiply(ball) for ball in balls],
+                "front_ball": unpremultiply(front_ball), "hit_point": unpremultiply(hit_point)}
+
+    def legacy_balls():
+        result = cloth.copy()
+        for ball, (x, y) in zip(straight["balls"], positions):
+            legacy_blend(result, ball, x, y)
+        return result
+
+    def kernel_balls():
+        result = cloth.copy()
+        for ball, (x, y) in zip(balls, positions):
+            compositing.composite(result, ball, x, y)
+        return result
+
+    def legacy_front():
+        canvas = np.zeros((200, 200, 4), dtype=np.uint8)
+        legacy_blend(canvas, straight["front_ball"], 20, 20)
+        return legacy_blend(canvas, straight["hit_point"], 82, 10)
+
+    def kernel_front():
+        canvas = np.zeros((200, 200, 4), dtype=np.uint8)
+        compositing.composite(canvas, front_ball, 20, 20)
+        return compositing.composite(canvas, hit_point, 82, 10)
+
+    return {
+        "overlay_frame": (lambda: legacy_overlay_frame(table, straight["frame"]),
+                          lambda: kernel_overlay_frame(table, frame)),
+        "place_ball_on_table": (legacy_balls, kernel_balls),
+        "front_hit_point": (legacy_front, kernel_front),
+    }
+
+
+def measure(fn, repeat):
+    fn()  # 첫 호출(캐시/할당 준비) 제외
+    latencies = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "mean_ms": round(float(np.mean(latencies)), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmark(repeat):
+    report = {}
+    total = {"legacy": 0.0, "kernel": 0.0, "legacy_peak_kb": 0.0, "kernel_peak_kb": 0.0}
+    for name, (legacy, kernel) in make_cases().items():
+        before, after = measure(legacy, repeat), measure(kernel, repeat)
+        report[name] = {"legacy": before, "kernel": after,
+                        "speedup": round(before["p50_ms"] / max(after["p50_ms"], 1e-6), 1)}
+        total["legacy"] += before["p50_ms"]
+        total["kernel"] += after["p50_ms"]
+        total["legacy_peak_kb"] = max(total["legacy_peak_kb"], before["peak_kb"])
+        total["kernel_peak_kb"] = max(total["kernel_peak_kb"], after["peak_kb"])
+
+    # 결과 이미지 한 장(세 가지 합성 모두) 기준
+    report["per_image"] = {
+        "legacy_ms": round(total["legacy"], 3),
+        "kernel_ms": round(total["kernel"], 3),
+        "saved_ms": round(total["legacy"] - total["kernel"], 3),
+        "legacy_peak_kb": total["legacy_peak_kb"],
+        "kernel_peak_kb": total["kernel_peak_kb"],
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="알파 합성 (float64 채널별 vs 정수 premultiplied ROI) 비교")
+    parser.add_argument("--repeat", type=int, default=100, help="반복 측정 횟수")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    assets.load()
+    report = run_benchmark(args.repeat)
+    print(json.dumps(report, ensure_ascii=False, indent=4))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
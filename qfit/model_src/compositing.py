@@ -0,0 +1,50 @@
+"""
+ premultiplied alpha 합성 커널 (모든 결과 이미지 렌더링 함수가 공유)
+
+overlay_frame, place_ball_on_table, render_front_hit_point의 알파 블렌딩을 한 곳에서 처리합니다.
+
+- 스프라이트는 assets.sprite()의 premultiplied BGRA uint8 (색상에 알파가 이미 곱해져 있음)
+- 대상 이미지(BGR 또는 BGRA, uint8 또는 16비트 PNG의 uint16)를 제자리에서 수정하고,
+  스프라이트가 놓이는 영역(ROI)만 계산
+- float64 변환 없이 정수 연산: out = src + dst * (max - a) / max (max: uint8 255, uint16 65535)
+  cv2.multiply/cv2.add의 SIMD 구현을 사용 (결과는 정수 반올림 나눗셈과 같음, 포화 덧셈)
+- uint16 대상에 uint8 스프라이트를 놓으면 ROI만 257배(255 -> 65535)로 올려서 합성
+- 대상이 BGRA이면 알파도 같은 방식(over)으로 합성: a_out = a + a_dst * (max - a) / max
+"""
+
+import cv2
+import numpy as np
+
+
+def composite(dst, sprite, x, y):
+    """
+    premultiplied BGRA sprite를 dst의 (x, y)(스프라이트 왼쪽 위) 위치에 제자리 합성합니다.
+    dst 밖으로 나가는 부분은 잘라내며, dst를 그대로 반환합니다.
+    """
+    h, w = sprite.shape[:2]
+    dst_h, dst_w = dst.shape[:2]
+    x1, y1 = max(x, 0), max(y, 0)
+    x2, y2 = min(x + w, dst_w), min(y + h, dst_h)
+    if x1 >= x2 or y1 >= y2:
+        return dst
+
+    if dst.dtype not in (np.uint8, np.uint16):
+        raise ValueError(f"지원하지 않는 이미지 형식: {dst.dtype} (uint8, uint16만 가능)")
+    if sprite.dtype != dst.dtype and sprite.dtype != np.uint8:
+        raise ValueError(f"스프라이트 형식 {sprite.dtype}를 {dst.dtype} 이미지에 합성할 수 없음")
+
+    src = sprite[y1 - y:y2 - y, x1 - x:x2 - x]
+    if src.dtype != dst.dtype:
+        src = src.astype(np.uint16) * np.uint16(257)
+    peak = np.iinfo(dst.dtype).max
+    channels = dst.shape[2]
+    inverse = cv2.subtract(peak, np.ascontiguousarray(src[:, :, 3]))
+    inverse = cv2.merge([inverse] * channels)
+    if channels == 3:
+        src = cv2.cvtColor(src, cv2.COLOR_BGRA2BGR)
+
+    # inverse 버퍼에 dst * (max - a) / max를 받고, src를 더해 dst의 ROI에 바로 기록 (임시 배열 1개)
+    roi = dst[y1:y2, x1:x2]
+    cv2.multiply(roi, inverse, dst=inverse, scale=1 / peak)
+    cv2.add(inverse, src, dst=roi)
+    return dst
@@ -0,0 +1,110 @@
+"""
+ 탑뷰 변환 + 당구경로 검출 파이프라인 (프로세스 내 실행)
+
+서버가 이미지마다 topview.py / qfit_simulation_v1.py를 별도 파이썬 프로세스로 실행하면
+매 업로드마다 인터프리터 2개 기동, cv2/NumPy/matplotlib/pymunk import, 이미지 자원 읽기 비용을 다시 냅니다.
+이 모듈은 두 단계를 데이터를 주고받는 함수로 묶어, 라이브러리와 자원이 이미 로드된
+오래 살아있는 프로세스(서버/워커) 안에서 바로 호출할 수 있게 합니다.
+
+ 주요 함수:
+- warm_up(): 라이브러리 import, 렌더링 자원(assets) 및 파워 게이지/정면 타격 지점 PNG 캐시 미리 준비
+- analyze_image(input_image, on_stage, search_mode, on_event): 원본 BGR 이미지 -> 공 위치, 최적 샷, 결과 이미지 (dict)
+- save_results(analysis, result_folder): 기존 result_image 폴더와 같은 파일명으로 저장
+"""
+
+import os
+import time
+import logging
+
+import cv2
+
+import assets
+import topview
+import qfit_simulation_v1
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    # 파이프라인 단계 실패 (reason: "no_table", "no_ball", "no_shot")
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+def warm_up():
+    """
+    무거운 라이브러리와 이미지 자원을 미리 로드하여 첫 요청의 지연을 없앤다.
+    """
+    t0 = time.perf_counter()
+    assets.load()  # 프레임/공/당점 이미지, 폰트 (없는 자원은 여기서 한 번 경고)
+    cached = qfit_simulation_v1.warm_sprite_cache()  # 탐색 설정의 파워 게이지/정면 타격 지점 PNG
+    logger.info(f"결과 스프라이트 캐시 준비: {cached}")
+    logger.info(f"파이프라인 준비 완료 ({(time.perf_counter() - t0) * 1000:.1f} ms, pid={os.getpid()})")
+    return os.getpid()
+
+
+def analyze_image(input_image, on_stage=None, search_mode="full", on_event=None, render_mode="image", on_progress=None):
+    """
+    원본 BGR 이미지에서 탑뷰 변환, 공 검출, 최적 샷 탐색, 결과 이미지 생성을 순서대로 수행합니다.
+    실패시 PipelineError를 발생시킵니다.
+    on_stage(stage)를 넘기면 각 단계("topview", "search", "render") 시작 전에 호출합니다.
+    (작업 진행상태 보고/취소용, on_stage에서 발생한 예외는 그대로 전달됨)
+    search_mode: 샷 탐색 설정 ("full", 서버 과부하시 "fast")
+    on_event(name, data)를 넘기면 중간 결과를 바로 알립니다. (진행 화면용)
+      - "table_found": 테이블 모서리 좌표, 탑뷰 크기
+      - "balls_detected": 공 위치 {color: [x, y]}, 테이블 이미지 크기
+      - "search_improved": 탐색 중 최종 후보 샷이 바뀔 때마다 (각도, 파워, 당점, 점수, 궤적)
+    render_mode: "image"(결과 이미지 생성) 또는 "vector"(이미지 없이 궤적/충돌 지점만)
+    on_progress()를 넘기면 샷 탐색 중 각도마다 호출합니다. (작업 취소 확인용, 발생한 예외는 그대로 전달됨)
+    """
+    timings = {}
+    on_stage = on_stage or (lambda stage: None)
+    on_event = on_event or (lambda name, data: None)
+
+    on_stage("topview")
+    topview_result = topview.run_topview(input_image, timings=timings, on_event=on_event)
+    if topview_result is None:
+        raise PipelineError("no_table", "테이블을 인식할 수 없음")
+
+    ball_position = topview_result["ball_position"]
+    if qfit_simulation_v1.cue_choice not in ball_position:
+        raise PipelineError("no_ball", f"큐볼({qfit_simulation_v1.cue_choice})을 찾을 수 없음")
+    table_image = topview_result["table_image"]
+    on_event("balls_detected", {"ball_position": {color: [int(x), int(y)] for color, (x, y) in ball_position.items()},
+                                "table_size": [table_image.shape[1], table_image.shape[0]]})
+
+    on_stage("search")
+    simulation = qfit_simulation_v1.run_simulation(topview_result["table_image"], ball_position,
+                                                   timings=timings, on_stage=on_stage, search_mode=search_mode,
+                                                   on_event=on_event, render_mode=render_mode,
+                                                   on_progress=on_progress)
+    if simulation is None:
+        raise PipelineError("no_shot", "득점 가능한 샷을 찾을 수 없음")
+
+    simulation["ball_position"] = ball_position
+    simulation["table_image"] = topview_result["table_image"]
+    simulation["timings"] = {stage: round(ms, 2) for stage, ms in timings.items()}
+    return simulation
+
+
+def save_results(analysis, result_folder):
+    """
+    분석 결과를 result_folder에 기존 스크립트와 같은 파일명으로 저장합니다.
+    (ball_labels.txt, table_with_balls.png, best_shot.png, front_view.png, power_gauge.png)
+    """
+    os.makedirs(result_folder, exist_ok=True)
+
+    topview.save_ball_labels(os.path.join(result_folder, "ball_labels.txt"), analysis["ball_position"])
+    if analysis.get("render_mode", "image") == "vector":
+        # vector 모드: PNG 인코딩/저장 없이 ball_labels.txt만 남김 (궤적은 응답으로 전달)
+        logger.info(f"결과 파일 저장 완료(vector): {result_folder}")
+        return
+    cv2.imwrite(os.path.join(result_folder, "table_with_balls.png"), analysis["table_image"])
+    cv2.imwrite(os.path.join(result_folder, "best_shot.png"), analysis["best_shot_image"])
+    # 정면 타격 지점/파워 게이지는 캐시된 PNG bytes를 그대로 기록 (다시 그리거나 인코딩하지 않음)
+    for name in ("front_view", "power_gauge"):
+        with open(os.path.join(result_folder, f"{name}.png"), "wb") as f:
+            f.write(analysis[f"{name}_png"])
+    logger.info(f"결과 파일 저장 완료: {result_folder}")
@@ -25,15 +25,21 @@ import numpy as np
 import pymunk
 from pymunk import Vec2d
 import matplotlib.pyplot as plt
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import os
+import time
 import logging
+import functools
+
+import assets
+import compositing
 
 ############################################################################
 # (A) 글로벌 설정
 ############################################################################
 cue_choice = "white"  # "white" 또는 "yellow"
 collision_log = []
+collision_frames = []  # collision_log 항목별 충돌 프레임 번호
 frame_count = 0
 last_collision_frame = -999
 last_collision_type = None
@@ -48,11 +54,27 @@ logger = logging.getLogger(__name__)
 best_shot_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_image", "best_shot.png")
 
 # 프론트 큐볼(흰색 공) 이미지 경로 (4채널 PNG)
-front_ball_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_image", "white_cue_ball.png")
+front_ball_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "white_cue_ball.png")
 
 # 파워 게이지 이미지 저장 경로
 gauge_image_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_image", "power_gauge.png")
 
+# 샷 탐색 설정 (각도 간격, 파워 목록)
+# - full: 5도 간격 x 파워 1~10 (720회)
+# - fast: 5도 간격 x 파워 2,4,..,10 (360회) - 서버 대기열이 길 때 사용
+#   (각도 간격을 넓히면 득점 샷을 놓치는 경우가 많아 파워만 줄임)
+SEARCH_CONFIGS = {
+    "full": {"angle_step": 5, "powers": np.arange(1, 11, 1.0)},
+    "fast": {"angle_step": 5, "powers": np.arange(2, 11, 2.0)},
+}
+
+# 응답용 궤적 간략화 허용 오차(픽셀, Douglas-Peucker)
+PATH_TOLERANCE = float(os.environ.get("QFIT_PATH_TOLERANCE", 1.5))
+# 결과 출력 방식: image(궤적을 그린 PNG 생성), vector(PNG 없이 궤적/충돌 지점만 반환, 앱에서 직접 그림)
+RENDER_MODES = ("image", "vector")
+# 파워 게이지/정면 타격 지점 PNG 캐시 크기 (각각 최대 항목 수, 0이면 캐시 없음)
+SPRITE_CACHE_SIZE = int(os.environ.get("QFIT_SPRITE_CACHE_SIZE", 256))
+
 ############################################################################
 # (F') 코드1에서 사용한 overlay_frame 함수 (프레임 합성용)
 ############################################################################
@@ -62,15 +84,11 @@ def overlay_frame(base_image, frame_image_path):
     - base_image: 공이 배치된 당구대 이미지 (BGR 형식)
     - frame_image_path: 프레임 이미지 경로 (BGRA 포맷, 알파 채널 포함)
     """
-    # 프레임 이미지 로드 (4채널, BGRA)
-    frame_image = cv2.imread(frame_image_path, cv2.IMREAD_UNCHANGED)
+    # 프레임 이미지 (자원 레지스트리에서 한 번만 읽은 premultiplied BGRA)
+    frame_image = assets.sprite(frame_image_path)
     if frame_image is None:
-        print(f"[오류] 프레임 이미지 불러오기 실패: {frame_image_path}")
         return base_image
 
-    # base_image를 BGRA로 변환 (알파 채널 추가)
-    base_rgba = cv2.cvtColor(base_image, cv2.COLOR_BGR2BGRA)
-    
     # 프레임 크기에 맞게 패딩된 BGRA 이미지 생성
     h_f, w_f = frame_image.shape[:2]
     h_b, w_b = base_image.shape[:2]
@@ -79,28 +97,13 @@ def overlay_frame(base_image, frame_image_path):
     y_offset = (h_f - h_b) // 2
     
     # 완전 투명한 배경으로 초기화 (알파 채널 = 0)
-    padded_base = np.zeros((h_f, w_f, 4), dtype=np.uint8)
+    result = np.zeros((h_f, w_f, 4), dtype=np.uint8)
     # base 이미지 복사 (알파 채널 = 255)
-    padded_base[y_offset:y_offset + h_b, x_offset:x_offset + w_b] = base_rgba
-    
-    # 알파 채널을 활용한 블렌딩
-    alpha_frame = frame_image[:, :, 3:4] / 255.0
-
-    # 결과 이미지 생성 (BGRA)
-    result = np.zeros_like(padded_base)
+    result[y_offset:y_offset + h_b, x_offset:x_offset + w_b, :3] = base_image
+    result[y_offset:y_offset + h_b, x_offset:x_offset + w_b, 3] = 255
     
-    for c in range(3):
-        result[:, :, c] = (
-            frame_image[:, :, c] * alpha_frame[:, :, 0] +
-            padded_base[:, :, c] * (1 - alpha_frame[:, :, 0])
-        ).astype(np.uint8)
-    
-    # 알파 채널 설정
-    result[:, :, 3] = np.where(frame_image[:, :, 3] == 0,
-                               padded_base[:, :, 3],
-                               frame_image[:, :, 3])
-    
-    return result
+    # 프레임을 위에 합성 (정수 premultiplied alpha 합성, 제자리 계산)
+    return compositing.composite(result, frame_image, 0, 0)
 
 
 def load_ball_position(label_text_path):
@@ -117,10 +120,9 @@ def load_ball_position(label_text_path):
         print(f"[오류] 파일 형식 오류. '공이름 x y' 형태여야 함")
     return bpos
 
-def save_power_gauge_image(power_gauge):
+def render_power_gauge_image(power_gauge):
     """
-    파워 게이지 바 이미지를 생성하고 지정된 경로(gauge_image_path)에 저장합니다.
-    (지금은 사용하지 않을 수도 있음)
+    파워 게이지 바 이미지를 생성하여 BGRA 배열로 반환합니다. (파일 저장 없음)
     """
     bar_w, bar_h = 200, 40
 
@@ -132,13 +134,8 @@ def save_power_gauge_image(power_gauge):
     image_pil = Image.fromarray(image)
     draw = ImageDraw.Draw(image_pil)
 
-    # 폰트 경로 (조정 필요)
-    font_path = (home_dir, "aiffelthon_qfit", "model_src", "image", "Roboto-Regular.ttf")
-    try:
-        font = ImageFont.truetype(font_path, 20)  # Roboto-Regular.ttf 폰트 적용
-    except IOError:
-        print(f"[오류] 폰트 파일 찾기 실패: {font_path}")
-        font = ImageFont.load_default()  # 기본 폰트 사용
+    # Roboto-Regular.ttf 20pt (자원 레지스트리, 없으면 기본 폰트)
+    font = assets.font(20)
 
     # 배경 바 (회색)
     draw.rectangle([0, 0, bar_w, bar_h], fill=(50, 50, 50, 255))
@@ -158,16 +155,7 @@ def save_power_gauge_image(power_gauge):
 
     # 최종 이미지 변환 (투명 배경 유지)
     image = np.array(image_pil)
-
-    success = cv2.imwrite(
-        gauge_image_path, 
-        cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)  # RGBA → BGRA 변환 후 저장
-    )
-    if success:
-        print(f"[정보] 파워 게이지 이미지 저장 완료: {gauge_image_path}")
-    else:
-        print(f"[오류] 파워 게이지 이미지 저장 실패")
-    return success
+    return cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)  # RGBA → BGRA 변환
 
 def show_power_gauge_image(power_gauge):
     """
@@ -189,7 +177,7 @@ def show_power_gauge_image(power_gauge):
 # (B) 충돌 이벤트 로깅 + 중복 쿠션 필터
 ############################################################################
 def collision_logger(arbiter, space, data):
-    global collision_log, cue_choice
+    global collision_log, collision_frames, cue_choice
     global frame_count, last_collision_frame, last_collision_type
 
     shapeA, shapeB = arbiter.shapes
@@ -219,6 +207,7 @@ def collision_logger(arbiter, space, data):
 
     if collision_char is not None:
         collision_log.append(collision_char)
+        collision_frames.append(frame_count)
         last_collision_type = collision_char
         last_collision_frame = frame_count
 
@@ -286,10 +275,11 @@ def compute_shot_score(log_list, base_score = 100) :
 공과 당구대 배경이 포함된 이미지(table_image)에서 실제 당구 샷을 시뮬레이션합니다.
 """
 def simulate_shot(table_image, ball_position, angle_deg, power_gauge, spin_offset):
-    global collision_log, frame_count
+    global collision_log, collision_frames, frame_count
     global last_collision_frame, last_collision_type
 
     collision_log = []
+    collision_frames = []
     frame_count = 0
     last_collision_frame = -999
     last_collision_type = None
@@ -401,22 +391,31 @@ def simulate_shot(table_image, ball_position, angle_deg, power_gauge, spin_offse
 ############################################################################
 # (E) 직접 경로 샷 탐색
 ############################################################################
-def find_direct_path_shot(table_image, ball_position):
+def find_direct_path_shot(table_image, ball_position, stats = None, search_mode = "full", on_improve = None,
+                          on_progress = None):
     """
     목적구를 먼저 맞추는 샷을 우선적으로 탐색하고,
     없을 경우 쿠션을 활용한 샷을 찾는다.
+    stats(dict)를 넘기면 실행한 시뮬레이션 횟수를 stats["simulations"]에 기록.
+    search_mode: SEARCH_CONFIGS의 탐색 설정 ("full" 또는 "fast")
+    on_improve(shot)를 넘기면 지금까지의 최종 후보 샷이 바뀔 때마다 호출 (반환값과 같은 튜플).
+    on_progress()를 넘기면 각도 하나의 탐색이 끝날 때마다 호출 (예외를 던지면 탐색 중단: 작업 취소 확인용)
     """
-    initial_angles = range(0, 360, 5)
-    initial_powers = np.arange(1, 11, 1.0)
+    config = SEARCH_CONFIGS[search_mode]
+    initial_angles = range(0, 360, config["angle_step"])
+    initial_powers = config["powers"]
     initial_offsets = [(0, 0)]
 
     best_shots = []
     backup_shots = []
+    provisional_key = None  # 현재 최종 후보의 (목적구 우선 여부, 점수)
 
     for ang in initial_angles:
         for pwr in initial_powers:
             for off in initial_offsets:
                 scored, reason, traj, clog, shot_score = simulate_shot(table_image, ball_position, ang, pwr, off)
+                if stats is not None:
+                    stats["simulations"] = stats.get("simulations", 0) + 1
 
                 # 3쿠션이 아닌 샷은 제외
                 if not scored:
@@ -424,10 +423,20 @@ def find_direct_path_shot(table_image, ball_position):
                     continue  
 
                 # 3쿠션 충족 시, best_shots에 추가
-                if clog[0] in ["R", "Y"]:
-                    best_shots.append((shot_score, ang, pwr, off, reason, traj, clog))
+                shot = (shot_score, ang, pwr, off, reason, traj, clog)
+                is_best = clog[0] in ["R", "Y"]
+                if is_best:
+                    best_shots.append(shot)
                 else:
-                    backup_shots.append((shot_score, ang, pwr, off, reason, traj, clog))
+                    backup_shots.append(shot)
+
+                # 최종 선택 규칙(목적구 우선 샷 중 최고점, 없으면 쿠션 샷 중 최고점)으로 후보가 바뀌면 알림
+                if on_improve is not None and (provisional_key is None or (is_best, shot_score) > provisional_key):
+                    provisional_key = (is_best, shot_score)
+                    on_improve(shot)
+
+        if on_progress is not None:
+            on_progress()
 
     if best_shots:
         return max(best_shots, key=lambda x: x[0])
@@ -465,10 +474,10 @@ def draw_trajectory_on_table(table_image, traj):
 ############################################################################
 # (G) 정면에서 본 공 + 당점 표시 + "Hit Here" 텍스트 + 투명 배경
 ############################################################################
-def show_front_hit_point(angle_deg, offset_xy):
+def render_front_hit_point(angle_deg, offset_xy):
     """
-    정면에서 본 흰색 공 위에 당점(red dot)과 'Hit Here' 텍스트를 표시.
-    배경은 전부 투명 처리해서 공만 보이도록 한다.
+    정면에서 본 흰색 공 위에 당점(red dot)과 'Hit Here' 텍스트를 그린 BGRA 이미지를 반환.
+    배경은 전부 투명 처리해서 공만 보이도록 한다. (화면 표시 없음)
     """
     w, h = 200, 200
     center = (w // 2, h // 2)
@@ -477,63 +486,32 @@ def show_front_hit_point(angle_deg, offset_xy):
     # 1) 완전 투명 RGBA 캔버스
     front_view_image = np.zeros((h, w, 4), dtype=np.uint8)
 
-    # 2) 흰색 공 텍스처 합성
-    front_ball_texture = cv2.imread(front_ball_path, cv2.IMREAD_UNCHANGED)
+    # 2) 흰색 공 텍스처 합성 (공 크기로 줄여 둔 premultiplied BGRA)
+    front_ball_texture = assets.sprite(front_ball_path, (2*radius, 2*radius))
     if front_ball_texture is not None:
-        front_ball_texture = cv2.resize(front_ball_texture, (2*radius, 2*radius), interpolation=cv2.INTER_AREA)
-        x1, y1 = center[0] - radius, center[1] - radius
-        x2, y2 = center[0] + radius, center[1] + radius
-
-        alpha_s = front_ball_texture[:, :, 3] / 255.0
-        for c in range(3):
-            front_view_image[y1:y2, x1:x2, c] = (
-                alpha_s * front_ball_texture[:, :, c] +
-                (1 - alpha_s) * front_view_image[y1:y2, x1:x2, c]
-            ).astype(np.uint8)
-        front_view_image[y1:y2, x1:x2, 3] = (alpha_s * 255).astype(np.uint8)
+        compositing.composite(front_view_image, front_ball_texture, center[0] - radius, center[1] - radius)
 
     # 3) 당점(red dot) 표시
-    hit_point_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "hit_point.png")
-    hit_point_image = cv2.imread(hit_point_path, cv2.IMREAD_UNCHANGED)
+    dot_size = int(radius * 0.3)  # 공 반지름의 30%
+    hit_point_image = assets.sprite("hit_point.png", (dot_size, dot_size))
+
+    # 각도 + 오프셋 기반 당점 좌표 (당점 이미지가 없어도 텍스트 위치에 사용)
+    rad = np.deg2rad(angle_deg)
+    dx, dy = np.cos(rad), -np.sin(rad)
+    scale_offset = 0.1
+    tx = int(center[0] + dx * radius * 0.8 + offset_xy[0] * scale_offset)
+    ty = int(center[1] + dy * radius * 0.8 + offset_xy[1] * scale_offset)
 
     if hit_point_image is not None:
-        dot_size = int(radius * 0.3)  # 공 반지름의 30%
-        hit_point_image = cv2.resize(hit_point_image, (dot_size, dot_size), interpolation=cv2.INTER_AREA)
-
-        # 각도 + 오프셋 기반 당점 좌표
-        rad = np.deg2rad(angle_deg)
-        dx, dy = np.cos(rad), -np.sin(rad)
-        scale_offset = 0.1
-        tx = int(center[0] + dx * radius * 0.8 + offset_xy[0] * scale_offset)
-        ty = int(center[1] + dy * radius * 0.8 + offset_xy[1] * scale_offset)
-
-        # 합성 좌표
-        dx2, dy2 = dot_size // 2, dot_size // 2
-        px1, py1 = tx - dx2, ty - dy2
-        px2, py2 = tx + dx2, ty + dy2
-
-        alpha_p = hit_point_image[:, :, 3] / 255.0
-        for c in range(3):
-            front_view_image[py1:py2, px1:px2, c] = (
-                alpha_p * hit_point_image[:, :, c] +
-                (1 - alpha_p) * front_view_image[py1:py2, px1:px2, c]
-            ).astype(np.uint8)
-        front_view_image[py1:py2, px1:px2, 3] = (
-            alpha_p * 255 + (1 - alpha_p) * front_view_image[py1:py2, px1:px2, 3]
-        ).astype(np.uint8)
+        compositing.composite(front_view_image, hit_point_image, tx - dot_size // 2, ty - dot_size // 2)
 
     # 4) "Hit Here" 텍스트 표시 (PIL)
     #    - 당점 아래쪽에 표시해서 원 밖으로 나가지 않도록 조정
     image_pil = Image.fromarray(front_view_image)
     draw = ImageDraw.Draw(image_pil)
 
-    # 폰트 경로 (적절히 수정)
-    font_path = (home_dir, "aiffelthon_qfit", "model_src", "image", "Roboto-Regular.ttf")
-    try:
-        font = ImageFont.truetype(font_path, 24)
-    except IOError:
-        print(f"[오류] 폰트 파일 찾기 실패: {font_path}")
-        font = ImageFont.load_default()
+    # Roboto-Regular.ttf 24pt (자원 레지스트리, 없으면 기본 폰트)
+    font = assets.font(24)
 
     text_str = "Hit Here"
     text_size = draw.textbbox((0, 0), text_str, font=font)
@@ -569,6 +547,15 @@ def show_front_hit_point(angle_deg, offset_xy):
     alpha[mask == 0] = 0
     front_view_image[:, :, 3] = alpha
 
+    return front_view_image
+
+
+def show_front_hit_point(angle_deg, offset_xy):
+    """
+    정면 타격 지점 이미지를 생성하여 화면에 표시하고 반환.
+    """
+    front_view_image = render_front_hit_point(angle_deg, offset_xy)
+
     # 최종 표시
     out_rgba = cv2.cvtColor(front_view_image, cv2.COLOR_BGRA2RGBA)
     plt.figure(figsize=(3, 3))
@@ -581,7 +568,184 @@ def show_front_hit_point(angle_deg, offset_xy):
 
 
 ############################################################################
-# (H) 메인 함수
+# (G') 파워 게이지/정면 타격 지점 PNG 캐시
+# - 샷 탐색이 만드는 파워/각도는 몇 가지뿐이라 (full: 파워 10개 x 각도 72개) 같은 이미지를 매번 다시 그리고 인코딩함
+# - 파워는 0.1 단위, 각도/당점은 0.1 단위로 맞춘 값마다 한 번만 그려 PNG bytes로 보관 (LRU, SPRITE_CACHE_SIZE개)
+# - 워커 시작시 warm_sprite_cache()로 탐색 설정의 파워/각도를 미리 그려 둠 (이후 요청은 캐시의 bytes를 그대로 저장)
+############################################################################
+def _encode_png(image):
+    ok, buffer = cv2.imencode(".png", image)
+    if not ok:
+        raise RuntimeError("PNG 인코딩 실패")
+    return buffer.tobytes()
+
+
+@functools.lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def _power_gauge_png(power):
+    return _encode_png(render_power_gauge_image(power))
+
+
+@functools.lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def _front_view_png(angle, offset):
+    return _encode_png(render_front_hit_point(angle, offset))
+
+
+def power_gauge_png(power_gauge):
+    """
+    파워 게이지 이미지의 PNG bytes (파워 0.1 단위로 캐시, 반환값은 공유되는 bytes)
+    """
+    return _power_gauge_png(round(float(power_gauge), 1))
+
+
+def front_view_png(angle_deg, offset_xy):
+    """
+    정면 타격 지점 이미지의 PNG bytes (각도/당점 0.1 단위로 캐시, 반환값은 공유되는 bytes)
+    """
+    angle = round(float(angle_deg), 1)
+    offset = tuple(round(float(value), 1) for value in offset_xy)
+    return _front_view_png(int(angle) if angle.is_integer() else angle, offset)
+
+
+def warm_sprite_cache():
+    """
+    샷 탐색 설정(SEARCH_CONFIGS)의 모든 파워와 각도(당점 (0, 0))의 PNG를 미리 만들어 둡니다.
+    캐시된 항목 수 {"power_gauge": n, "front_view": n}을 반환합니다.
+    """
+    powers = sorted({float(power) for config in SEARCH_CONFIGS.values() for power in config["powers"]})
+    angles = sorted({angle for config in SEARCH_CONFIGS.values() for angle in range(0, 360, config["angle_step"])})
+    for power in powers:
+        power_gauge_png(power)
+    for angle in angles:
+        front_view_png(angle, (0, 0))
+    return {"power_gauge": _power_gauge_png.cache_info().currsize,
+            "front_view": _front_view_png.cache_info().currsize}
+
+
+############################################################################
+# (H) 시뮬레이션 실행 (파일 저장/화면 표시 없이 결과 반환)
+############################################################################
+def trajectory_json(traj, tolerance = PATH_TOLERANCE):
+    """
+    공별 궤적을 응답용 폴리라인 dict로 변환 {color: [[x, y], ...]}
+    Douglas-Peucker(cv2.approxPolyDP)로 tolerance 픽셀 이내의 점을 생략 (직선 구간은 양 끝점만 남음)
+    움직이지 않은 공은 점 하나
+    """
+    compact = {}
+    for cname, points in traj.items():
+        if not points:
+            compact[cname] = []
+            continue
+        curve = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+        polyline = np.rint(cv2.approxPolyDP(curve, tolerance, False).reshape(-1, 2)).astype(int).tolist()
+        if len(polyline) == 2 and polyline[0] == polyline[1]:
+            polyline = polyline[:1]
+        compact[cname] = polyline
+    return compact
+
+
+def collision_events(table_image, ball_position, angle_deg, power_gauge, spin_offset):
+    """
+    최종 샷을 한 번 더 시뮬레이션하여 큐볼의 충돌 지점 목록을 반환 (시뮬레이션은 결정적이라 탐색 때와 같은 결과)
+    [{"hit": "cushion" | "red" | "yellow" | "white", "point": [x, y]}, ...] (충돌 순서)
+    """
+    _, _, traj, clog, _ = simulate_shot(table_image, ball_position, angle_deg, power_gauge, spin_offset)
+    cue_points = traj[cue_choice]
+    names = {"C": "cushion", "R": "red", "Y": "yellow", "W": "white"}
+    events = []
+    for char, frame in zip(clog, collision_frames):
+        x, y = cue_points[min(frame, len(cue_points)) - 1]
+        events.append({"hit": names[char], "point": [int(round(x)), int(round(y))]})
+    return events, clog
+
+
+def provisional_shot_json(shot):
+    """
+    탐색 중인 후보 샷을 진행 알림용 dict로 변환
+    """
+    shot_score, angle, power, offset, reason, traj, _ = shot
+    return {
+        "score": shot_score,
+        "angle": angle,
+        "power": float(power),
+        "offset": list(offset),
+        "reason": reason,
+        "trajectory": trajectory_json(traj),
+    }
+
+
+def run_simulation(table_image, ball_position, timings = None, on_stage = None, search_mode = "full", on_event = None,
+                   render_mode = "image", on_progress = None):
+    """
+    공이 배치된 테이블 이미지와 공 위치로 최적의 샷을 탐색하고, 결과 이미지 3개를 생성하여 dict로 반환.
+    - best_shot_image: 궤적 + 프레임 합성 이미지 (BGRA)
+    - front_view_png: 정면 타격 지점 이미지 (PNG bytes, 캐시에서 가져옴)
+    - power_gauge_png: 파워 게이지 이미지 (PNG bytes, 캐시에서 가져옴)
+    - collisions: 큐볼 충돌 지점 목록 (collision_events)
+    득점 가능한 샷이 없으면 None을 반환.
+    timings(dict)를 넘기면 단계별 소요시간(ms)을 기록.
+    on_stage(stage)를 넘기면 결과 이미지 생성("render") 시작 전에 호출.
+    search_mode: 샷 탐색 설정 ("full" 또는 빠른 탐색 "fast")
+    on_event(name, data)를 넘기면 탐색 중 최종 후보 샷이 바뀔 때마다 ("search_improved", 후보 샷) 호출.
+    render_mode: "image" 또는 "vector" (결과 이미지 3개를 만들지 않고 None으로 반환, 앱에서 궤적을 직접 그림)
+    on_progress()를 넘기면 샷 탐색 중 각도마다 호출 (예외를 던지면 탐색 중단)
+    """
+    timings = {} if timings is None else timings
+
+    # 최적의 샷 찾기
+    t0 = time.perf_counter()
+    stats = {"simulations": 0}
+    on_improve = None
+    if on_event is not None:
+        on_improve = lambda shot: on_event("search_improved", dict(provisional_shot_json(shot),
+                                                                   simulations=stats["simulations"]))
+    result = find_direct_path_shot(table_image, ball_position, stats, search_mode, on_improve, on_progress)
+    if result is None and search_mode != "full":
+        # 빠른 탐색에서 득점 샷이 없으면 전체 탐색으로 다시 시도
+        search_mode = "full"
+        result = find_direct_path_shot(table_image, ball_position, stats, search_mode, on_improve, on_progress)
+    timings["search"] = (time.perf_counter() - t0) * 1000
+
+    if result is None:
+        return None
+
+    best_score, best_angle, best_power, best_offset, best_reason, best_traj, best_log = result
+
+    # 결과 이미지 생성
+    if on_stage is not None:
+        on_stage("render")
+    t0 = time.perf_counter()
+    collisions, replay_log = collision_events(table_image, ball_position, best_angle, best_power, best_offset)
+    if replay_log != best_log:
+        logger.warning(f"충돌 지점 재계산 결과가 탐색 결과와 다름: {replay_log} != {best_log}")
+    best_shot_image = front_view = power_gauge = None
+    if render_mode == "image":
+        trajectory_image = draw_trajectory_on_table(table_image, best_traj)
+        frame_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "frame.png")
+        best_shot_image = overlay_frame(trajectory_image, frame_path)
+        front_view = front_view_png(best_angle, best_offset)
+        power_gauge = power_gauge_png(best_power)
+    timings["render"] = (time.perf_counter() - t0) * 1000
+
+    return {
+        "score": best_score,
+        "angle": best_angle,
+        "power": float(best_power),
+        "offset": best_offset,
+        "reason": best_reason,
+        "collision_log": best_log,
+        "trajectory": best_traj,
+        "collisions": collisions,
+        "best_shot_image": best_shot_image,
+        "front_view_png": front_view,
+        "power_gauge_png": power_gauge,
+        "simulations": stats["simulations"],
+        "search_mode": search_mode,
+        "render_mode": render_mode,
+    }
+
+
+############################################################################
+# (I) 메인 함수
 ############################################################################
 def main():
     """
@@ -591,6 +755,7 @@ def main():
     """
     label_text_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_image", "ball_labels.txt")
     result_image_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_image", "table_with_balls.png")
+    front_view_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_image", "front_view.png")
 
     # 테이블 이미지 로드
     table_image = cv2.imread(result_image_path)
@@ -604,48 +769,52 @@ def main():
         print("[오류] 공 위치 정보가 없음")
         return
 
-    # 최적의 샷 찾기
-    result = find_direct_path_shot(table_image, ball_position)
+    # 최적의 샷 찾기 + 결과 이미지 생성
+    result = run_simulation(table_image, ball_position)
 
     if result is None:
         print("득점 가능한 샷을 찾을 수 없음")
         return
 
-    # 결과 언팩
-    best_score, best_angle, best_power, best_offset, best_reason, best_traj, best_log = result
-
     print("\n[최종 결과]")
-    print(f"점수 = {best_score}, 각도 = {best_angle}, 파워 = {best_power}, 오프셋 = {best_offset}")
-    print(f"현황: {best_reason}")
-    print(f"충돌 기록: {best_log}")
-
-    # (1) 궤적 그리기 (파워 게이지 없음)
-    trajectory_image = draw_trajectory_on_table(table_image, best_traj)
-
-    # (2) 테이블 프레임 합성
-    frame_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "frame.png")
-    overlaid_image = overlay_frame(trajectory_image, frame_path)
+    print(f"점수 = {result['score']}, 각도 = {result['angle']}, 파워 = {result['power']}, 오프셋 = {result['offset']}")
+    print(f"현황: {result['reason']}")
+    print(f"충돌 기록: {result['collision_log']}")
 
-    # 시각화
-    out_rgb = cv2.cvtColor(overlaid_image, cv2.COLOR_BGRA2RGBA)
+    # (1) 궤적 + 테이블 프레임 합성 이미지 표시 및 저장
+    out_rgb = cv2.cvtColor(result["best_shot_image"], cv2.COLOR_BGRA2RGBA)
     plt.figure(figsize=(10, 5))
     plt.imshow(out_rgb)
     plt.title(
-        f"Best Shot : A = {best_angle}, "
-        f"P = {best_power}, "
-        f"Off = {best_offset}, "
-        f"Score = {best_score}"
+        f"Best Shot : A = {result['angle']}, "
+        f"P = {result['power']}, "
+        f"Off = {result['offset']}, "
+        f"Score = {result['score']}"
     )
     plt.axis("off")
     plt.show()
 
-    # (3) 정면 타격 지점 - 투명 배경 + 'Hit Here' 표시
-    show_front_hit_point(best_angle, best_offset)
+    cv2.imwrite(best_shot_path, result["best_shot_image"])
+    logger.info(f"Best Shot 이미지: [{best_shot_path}] 저장")
+
+    # (2) 정면 타격 지점 - 투명 배경 + 'Hit Here' 표시 및 저장
+    plt.figure(figsize=(3, 3))
+    front_view_image = cv2.imdecode(np.frombuffer(result["front_view_png"], np.uint8), cv2.IMREAD_UNCHANGED)
+    plt.imshow(cv2.cvtColor(front_view_image, cv2.COLOR_BGRA2RGBA))
+    plt.axis("off")
+    plt.title("Front View: Angle / Offset")
+    plt.show()
+
+    with open(front_view_path, "wb") as f:
+        f.write(result["front_view_png"])
+    logger.info(f"Front View 이미지: [{front_view_path}] 저장")
 
-    # 만약 파워 게이지 이미지를 따로 저장/표시하고 싶다면 아래 사용
-    save_power_gauge_image(best_power)
-    show_power_gauge_image(best_power)
+    # (3) 파워 게이지 이미지 저장 + 표시
+    with open(gauge_image_path, "wb") as f:
+        f.write(result["power_gauge_png"])
+    logger.info(f"파워 게이지 이미지: [{gauge_image_path}] 저장")
+    show_power_gauge_image(result["power"])
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
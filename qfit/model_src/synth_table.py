@@ -0,0 +1,178 @@
+"""
+ 합성 당구대 사진 생성기
+
+기존 테이블 천(table-cloth.png)과 공 이미지(red/white/yellow.png)로
+공 위치(정답)를 알고 있는 당구대 사진을 합성합니다.
+무작위 원근(촬영 각도), 조명, 블러, 노이즈를 적용해 실제 업로드 사진과 비슷하게 만듭니다.
+
+- 정답 좌표는 topview.get_warped_table() 결과(800 x 400 탑뷰) 기준입니다.
+- 저장시 이미지와 같은 이름의 .txt 파일에 '공이름 x y' 형식(ball_labels.txt와 동일)으로 기록합니다.
+
+ 실행 예:
+    python synth_table.py synth_corpus --count 1000 --seed 0
+"""
+
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+import topview
+
+# 설정 값
+PHOTO_SIZE = (2016, 1512)   # 합성 사진 크기 (가로, 세로)
+BALL_MARGIN = 20            # 공 중심과 테이블 가장자리 사이 최소 거리 (px)
+BALL_MIN_DIST = 35          # 공 중심 사이 최소 거리 (px)
+RAIL_WIDTH = 30             # 테이블 바깥 나무 레일 두께 (탑뷰 기준 px)
+RAIL_COLOR = (30, 60, 110)  # 나무 레일 색상 (BGR)
+
+# get_warped_table()이 잘라내는 가장자리 크기 (y, x)
+CROP_Y, CROP_X = 10, 20
+
+
+def load_cloth():
+    # 테이블 천은 자원 레지스트리(assets)에서 프로세스당 한 번만 읽음
+    cloth = topview.load_cloth_image()
+    if cloth is None:
+        raise IOError(f"테이블 천 이미지 불러오기 실패: {topview.cloth_image_path}")
+    # 탑뷰 결과(WIDTH x HEIGHT에서 가장자리를 잘라낸 크기)와 같은 크기로 맞춘다
+    size = (topview.WIDTH - 2 * CROP_X, topview.HEIGHT - 2 * CROP_Y)
+    return cv2.resize(cloth, size, interpolation=cv2.INTER_AREA)
+
+
+def random_ball_positions(rng, width, height):
+    # 서로 겹치지 않는 3개의 공 위치
+    positions = {}
+    for color in ("red", "white", "yellow"):
+        while True:
+            x = int(rng.integers(BALL_MARGIN, width - BALL_MARGIN))
+            y = int(rng.integers(BALL_MARGIN, height - BALL_MARGIN))
+            if all(np.hypot(x - px, y - py) >= BALL_MIN_DIST for px, py in positions.values()):
+                positions[color] = (x, y)
+                break
+    return positions
+
+
+def render_topview(rng):
+    # 탑뷰 테이블: 천 + 공 배치 (get_warped_table() 결과와 같은 크기, 조명/원근/노이즈 없음)
+    cloth = load_cloth()
+    h, w = cloth.shape[:2]
+    ball_position = random_ball_positions(rng, w, h)
+    return topview.place_ball_on_table(cloth, ball_position), ball_position
+
+
+def render_table(rng):
+    # 1) 탑뷰 테이블: 천 + 공 배치
+    table, ball_position = render_topview(rng)
+
+    # 2) find_corners가 찾는 천 영역이 WIDTH x HEIGHT가 되도록 가장자리를 천 색으로 확장
+    table = cv2.copyMakeBorder(table, CROP_Y, CROP_Y, CROP_X, CROP_X, cv2.BORDER_REPLICATE)
+
+    # 3) 바깥쪽 나무 레일
+    table = cv2.copyMakeBorder(table, RAIL_WIDTH, RAIL_WIDTH, RAIL_WIDTH, RAIL_WIDTH,
+                               cv2.BORDER_CONSTANT, value=RAIL_COLOR)
+    return table, ball_position
+
+
+def random_quad(rng, photo_w, photo_h):
+    # 카메라 기울기를 흉내낸 사다리꼴 (위쪽이 더 좁음) + 약간의 회전/이동
+    table_w = photo_w * rng.uniform(0.6, 0.85)
+    table_h = table_w * 0.5 * rng.uniform(0.55, 0.9)
+    top_ratio = rng.uniform(0.7, 1.0)
+    cx = photo_w / 2 + rng.uniform(-0.05, 0.05) * photo_w
+    cy = photo_h / 2 + rng.uniform(-0.05, 0.05) * photo_h
+
+    quad = np.array([[-table_w * top_ratio / 2, -table_h / 2],
+                     [table_w * top_ratio / 2, -table_h / 2],
+                     [table_w / 2, table_h / 2],
+                     [-table_w / 2, table_h / 2]], dtype=np.float32)
+
+    angle = np.deg2rad(rng.uniform(-5, 5))
+    rot = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]], dtype=np.float32)
+    return quad @ rot.T + np.array([cx, cy], dtype=np.float32)
+
+
+def render_photo(rng, photo_size=PHOTO_SIZE):
+    """
+    합성 사진 한 장과 정답 공 위치({color: (x, y)}, 탑뷰 기준)를 반환합니다.
+    """
+    photo_w, photo_h = photo_size
+    table, ball_position = render_table(rng)
+    th, tw = table.shape[:2]
+
+    # 1) 배경 (어두운 바닥 + 노이즈 질감)
+    base = rng.integers(20, 90, size=3)
+    background = np.empty((photo_h, photo_w, 3), dtype=np.uint8)
+    background[:] = base.astype(np.uint8)
+    texture = rng.normal(0, 12, size=(photo_h // 8, photo_w // 8, 1))
+    texture = cv2.resize(texture.astype(np.float32), (photo_w, photo_h))[:, :, None]
+    background = np.clip(background + texture, 0, 255).astype(np.uint8)
+
+    # 2) 원근 변환으로 테이블 배치
+    src = np.array([[0, 0], [tw - 1, 0], [tw - 1, th - 1], [0, th - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(src, random_quad(rng, photo_w, photo_h))
+    warped = cv2.warpPerspective(table, matrix, (photo_w, photo_h))
+    mask = cv2.warpPerspective(np.full((th, tw), 255, np.uint8), matrix, (photo_w, photo_h))
+    photo = np.where(mask[:, :, None] > 0, warped, background)
+
+    # 3) 조명: 밝기/감마(LUT) + 한쪽에서 비추는 조명 기울기
+    gain = rng.uniform(0.6, 1.3)
+    gamma = rng.uniform(0.8, 1.25)
+    lut = np.clip((np.arange(256) / 255.0) ** gamma * gain * 255, 0, 255).astype(np.uint8)
+    photo = cv2.LUT(photo, lut)
+
+    gx = np.linspace(-1, 1, photo_w, dtype=np.float32)[None, :]
+    gy = np.linspace(-1, 1, photo_h, dtype=np.float32)[:, None]
+    direction = rng.uniform(0, 2 * np.pi)
+    gradient = 1 + rng.uniform(0, 0.25) * (np.cos(direction) * gx + np.sin(direction) * gy)
+    photo = cv2.multiply(photo, cv2.merge([gradient] * 3), dtype=cv2.CV_8U)
+
+    # 4) 블러 + 센서 노이즈
+    sigma = rng.uniform(0, 2.5)
+    if sigma > 0.3:
+        photo = cv2.GaussianBlur(photo, (0, 0), sigma)
+    noise = rng.standard_normal(size=photo.shape, dtype=np.float32) * rng.uniform(0, 8)
+    photo = cv2.add(photo, noise, dtype=cv2.CV_8U)
+
+    return photo, ball_position
+
+
+def render_sample(index, seed=0, photo_size=PHOTO_SIZE):
+    # (seed, index)가 같으면 항상 같은 사진을 생성 (병렬 처리시 재현 가능)
+    rng = np.random.default_rng([seed, index])
+    return render_photo(rng, photo_size)
+
+
+def render_clean_sample(index, seed=0):
+    # render_sample(index, seed)와 같은 공 배치의 깨끗한 탑뷰 (정답 좌표 자체를 검증할 때 사용)
+    # render_photo()는 난수를 render_table()에서 먼저 쓰므로 같은 난수열로 같은 배치가 나옴
+    rng = np.random.default_rng([seed, index])
+    return render_topview(rng)
+
+
+def save_sample(out_dir, index, photo, ball_position):
+    name = os.path.join(out_dir, f"synth_{index:05d}")
+    cv2.imwrite(name + ".jpg", photo, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    with open(name + ".txt", "w") as f:
+        for color, (cx, cy) in ball_position.items():
+            f.write(f"{color} {cx} {cy}\n")
+    return name + ".jpg"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="정답 공 위치가 있는 합성 당구대 사진 생성")
+    parser.add_argument("out_dir", help="저장 폴더")
+    parser.add_argument("--count", type=int, default=100, help="생성할 사진 수")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for index in range(args.count):
+        photo, ball_position = render_sample(index, args.seed)
+        save_sample(args.out_dir, index, photo, ball_position)
+    print(f"합성 사진 {args.count}장 저장: {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
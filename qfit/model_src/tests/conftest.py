@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 테스트는 model_src 모듈을 스크립트와 같은 방식(폴더 기준 import)으로 불러옴
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
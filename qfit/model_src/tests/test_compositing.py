@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from compositing import composite
+
+
+def premultiplied_sprite(rng, h, w):
+    sprite = rng.integers(0, 256, (h, w, 4)).astype(np.uint8)
+    sprite[:, :, :3] = (sprite[:, :, :3].astype(np.uint32) * sprite[:, :, 3:4] // 255).astype(np.uint8)
+    return sprite
+
+
+def reference(dst, src):
+    # float64 기준값: out = src + dst * (max - a) / max
+    peak = float(np.iinfo(dst.dtype).max)
+    return np.round(src[:, :, :dst.shape[2]] + dst * (peak - src[:, :, 3:4]) / peak)
+
+
+@pytest.mark.parametrize("channels", [3, 4])
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_composite_matches_float_reference(dtype, channels):
+    rng = np.random.default_rng(0)
+    sprite = premultiplied_sprite(rng, 20, 30)
+    peak = np.iinfo(dtype).max
+    dst = rng.integers(0, peak + 1, (50, 60, channels)).astype(dtype)
+    expected = dst.copy()
+
+    # uint16 이미지에는 uint8 스프라이트를 257배로 올려서 합성
+    src = sprite.astype(np.float64) * (257 if dtype == np.uint16 else 1)
+    expected[-10:, :25] = reference(dst[-10:, :25], src[:10, 5:])
+
+    out = composite(dst, sprite, -5, 40)  # 왼쪽/아래로 나가는 부분은 잘라냄
+    assert out is dst and out.dtype == dtype
+    assert np.abs(out.astype(np.int64) - expected).max() <= 1
+
+
+def test_composite_rejects_unsupported_dtype():
+    sprite = np.zeros((4, 4, 4), np.uint8)
+    with pytest.raises(ValueError):
+        composite(np.zeros((8, 8, 3), np.float32), sprite, 0, 0)
+    with pytest.raises(ValueError):
+        composite(np.zeros((8, 8, 3), np.uint8), sprite.astype(np.uint16), 0, 0)
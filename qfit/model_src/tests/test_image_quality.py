@@ -0,0 +1,55 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import image_quality
+import topview
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "upload_image", "K_02.jpg")
+
+
+@pytest.fixture(scope="module")
+def photo():
+    image = cv2.imread(SAMPLE)
+    if image is None:
+        pytest.skip("샘플 사진 없음")
+    return image
+
+
+def test_sample_photo_passes(photo):
+    result = image_quality.check_image_quality(photo)
+    assert result["ok"], result
+    # 공 픽셀 기준은 당구대 영역 넓이에 비례 (흰색은 검사하지 않음)
+    assert set(result["metrics"]["ball_pixels"]) == {"red", "yellow"}
+    assert min(result["metrics"]["ball_pixels"].values()) >= 2 * result["metrics"]["ball_min_pixels"]
+
+
+def test_thumbnail_matches_area_resize(photo):
+    thumbnail = image_quality.make_thumbnail(photo)
+    h, w = photo.shape[:2]
+    reference = cv2.resize(photo, (image_quality.THUMB_WIDTH, int(h * image_quality.THUMB_WIDTH / w)),
+                           interpolation=cv2.INTER_AREA)
+    assert thumbnail.shape == reference.shape
+    assert np.abs(thumbnail.astype(np.int16) - reference).mean() < 3
+
+
+def test_bad_photos_are_rejected(photo):
+    assert image_quality.check_image_quality(None)["reason"] == "unreadable"
+    assert image_quality.check_image_quality((photo * 0.2).astype(np.uint8))["reason"] == "too_dark"
+    assert image_quality.check_image_quality(cv2.GaussianBlur(photo, (0, 0), 40))["reason"] == "blur"
+    noise = np.random.default_rng(0).integers(0, 256, photo.shape[:2], dtype=np.uint8)
+    assert image_quality.check_image_quality(cv2.merge([noise] * 3))["reason"] == "no_table"
+
+
+def test_missing_ball_is_rejected(photo):
+    # 노란 공 색상 픽셀을 회색으로 칠해 지움
+    lower, upper = topview.color_range["yellow"]
+    mask = cv2.inRange(cv2.cvtColor(photo, cv2.COLOR_BGR2HSV), lower, upper)
+    mask = cv2.dilate(mask, np.ones((9, 9), np.uint8))
+    erased = photo.copy()
+    erased[mask > 0] = (90, 90, 90)
+    result = image_quality.check_image_quality(erased)
+    assert result["reason"] == "missing_balls"
+    assert result["metrics"]["ball_pixels"]["yellow"] < result["metrics"]["ball_min_pixels"]
@@ -0,0 +1,25 @@
+import pytest
+
+import qfit_simulation_v1
+
+
+class Stop(Exception):
+    pass
+
+
+def test_search_reports_progress_per_angle_and_can_be_stopped(monkeypatch):
+    # 시뮬레이션 없이 탐색 루프만 확인 (모든 샷 실패)
+    monkeypatch.setattr(qfit_simulation_v1, "simulate_shot", lambda *args: (False, "no", {}, [], 0))
+    calls = []
+    assert qfit_simulation_v1.find_direct_path_shot(None, {}, on_progress=lambda: calls.append(1)) is None
+    assert len(calls) == 360 // qfit_simulation_v1.SEARCH_CONFIGS["full"]["angle_step"]
+
+    # on_progress에서 예외를 던지면 (작업 취소) 다음 각도로 넘어가지 않고 바로 중단
+    stats = {}
+
+    def stop():
+        raise Stop()
+
+    with pytest.raises(Stop):
+        qfit_simulation_v1.find_direct_path_shot(None, {}, stats, on_progress=stop)
+    assert stats["simulations"] == len(qfit_simulation_v1.SEARCH_CONFIGS["full"]["powers"])
@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import undistort
+
+PROFILE = {
+    "image_size": [400, 300],
+    "camera_matrix": [[220.0, 0.0, 200.0], [0.0, 220.0, 150.0], [0.0, 0.0, 1.0]],
+    "dist_coeffs": [-0.22, 0.06, 0.001, -0.002, -0.007],
+}
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    # 프로필 파일/캐시 폴더를 임시 폴더로 바꾸고 프로세스 내 캐시를 비움
+    profile_path = tmp_path / "camera_profiles.json"
+
+    def write(profile):
+        profile_path.write_text(json.dumps({"phone": profile}))
+        monkeypatch.setattr(undistort, "_profiles", None)
+        monkeypatch.setattr(undistort, "_maps", {})
+        monkeypatch.setattr(undistort, "_float_maps", {})
+
+    monkeypatch.setattr(undistort, "profile_path", str(profile_path))
+    monkeypatch.setattr(undistort, "cache_folder", str(tmp_path / "cache"))
+    write(PROFILE)
+    return write
+
+
+def test_scaled_intrinsics_landscape_scales_each_axis():
+    camera_matrix, dist_coeffs = undistort._scaled_intrinsics(PROFILE, (200, 150))
+    assert np.allclose(camera_matrix, [[110, 0, 100], [0, 110, 75], [0, 0, 1]])
+    assert np.allclose(dist_coeffs, PROFILE["dist_coeffs"])
+
+
+def test_scaled_intrinsics_portrait_swaps_axes():
+    profile = dict(PROFILE, camera_matrix=[[220.0, 0.0, 190.0], [0.0, 230.0, 140.0], [0.0, 0.0, 1.0]])
+    camera_matrix, dist_coeffs = undistort._scaled_intrinsics(profile, (150, 200))
+    # fx <-> fy, cx <-> cy (0.5배), 접선 왜곡 계수 p1 <-> p2
+    assert np.allclose(camera_matrix, [[115, 0, 70], [0, 110, 95], [0, 0, 1]])
+    assert np.allclose(dist_coeffs, [-0.22, 0.06, -0.002, 0.001, -0.007])
+
+
+def test_scaled_intrinsics_rejects_other_aspect_ratio():
+    assert undistort._scaled_intrinsics(PROFILE, (300, 300)) is None
+
+
+def test_portrait_image_is_transposed_landscape_result(profiles):
+    # 가로 이미지를 보정한 결과와, 전치한(세로) 이미지를 보정한 결과가 서로 전치 관계
+    # (주점이 가운데이고 p1/p2를 바꿨으므로 x/y를 바꾼 같은 렌즈 모델)
+    rng = np.random.default_rng(0)
+    landscape = rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)
+    portrait = np.ascontiguousarray(landscape.transpose(1, 0, 2))
+
+    corrected = undistort.undistort_image(landscape, "phone")
+    corrected_portrait = undistort.undistort_image(portrait, "phone")
+    assert not np.array_equal(corrected, landscape)
+    diff = np.abs(corrected_portrait.astype(int) - corrected.transpose(1, 0, 2).astype(int))
+    assert np.mean(diff) < 1.0
+
+
+def test_mismatched_aspect_ratio_is_left_unchanged(profiles):
+    image = np.zeros((300, 300, 3), np.uint8)
+    assert undistort.undistort_image(image, "phone") is image
+    assert undistort.get_fused_maps("phone", (300, 300), np.eye(3), (40, 20)) is None
+    assert not os.path.exists(undistort.cache_folder) or not os.listdir(undistort.cache_folder)
+
+
+def test_disk_cache_is_keyed_by_intrinsics(profiles):
+    undistort.get_float_maps("phone", (200, 150))
+    first = set(os.listdir(undistort.cache_folder))
+    assert len(first) == 1 and first.pop().startswith("phone_200x150_")
+
+    # 프로필을 고치면 이전 맵을 쓰지 않고 새로 계산
+    profiles(dict(PROFILE, dist_coeffs=[-0.1, 0.0, 0.0, 0.0, 0.0]))
+    map_x, _ = undistort.get_float_maps("phone", (200, 150))
+    files = sorted(os.listdir(undistort.cache_folder))
+    assert len(files) == 2
+    expected, _ = undistort._compute_float_maps(undistort.get_profile("phone"), (200, 150))
+    assert np.array_equal(map_x, expected)
+    # 임시 파일이 남지 않음
+    assert all(not name.endswith(".tmp.npz") for name in files)
+
+
+def test_disk_cache_is_reused(profiles, monkeypatch):
+    maps = undistort.get_float_maps("phone", (200, 150))
+    monkeypatch.setattr(undistort, "_float_maps", {})
+    monkeypatch.setattr(undistort, "_compute_float_maps", lambda *args: pytest.fail("캐시를 다시 계산함"))
+    cached = undistort.get_float_maps("phone", (200, 150))
+    assert np.array_equal(cached[0], maps[0]) and np.array_equal(cached[1], maps[1])
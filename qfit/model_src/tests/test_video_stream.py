@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+import pytest
+
+import topview
+import video_stream
+from video_stream import BallTrack, BallStreamTracker, CROP_X, CROP_Y, MAX_MISSED
+
+YELLOW = (0, 220, 240)  # BGR (HSV 범위 "yellow" 안)
+
+
+def frame_with_ball(center):
+    # 탑뷰 크기의 검은 프레임에 노란 공 하나 (변환 행렬이 항등 행렬이면 탑뷰 좌표 = center)
+    frame = np.zeros((topview.HEIGHT, topview.WIDTH, 3), np.uint8)
+    cv2.circle(frame, (int(center[0]) + CROP_X, int(center[1]) + CROP_Y), 8, YELLOW, -1)
+    return frame
+
+
+@pytest.fixture
+def keyframes(monkeypatch):
+    # 테이블 검출 대신 항등 변환을 쓰고, 전체 검출(키프레임) 횟수를 기록
+    calls = []
+
+    def find_corners(frame):
+        calls.append(frame)
+        return "approx"
+
+    monkeypatch.setattr(video_stream, "FRAME_WIDTH", topview.WIDTH)
+    monkeypatch.setattr(topview, "find_corners", find_corners)
+    monkeypatch.setattr(topview, "get_table_matrix", lambda approx: np.eye(3, dtype=np.float32))
+    return calls
+
+
+def test_ball_track_learns_constant_velocity():
+    track = BallTrack((100, 50))
+    for step in range(1, 30):
+        track.predict()
+        track.correct((100 + 3 * step, 50 + step))
+    # 다음 위치를 등속도로 예측
+    x, y = track.predict()
+    assert abs(x - 190) < 1.5 and abs(y - 80) < 1.5
+    assert abs(track.speed - np.hypot(3, 1)) < 0.3
+    assert track.missed == 0
+
+
+def test_keyframes_follow_interval(keyframes):
+    tracker = BallStreamTracker(keyframe_interval=5, camera_profile=None)
+    events = [tracker.process_frame(frame_with_ball((200, 100))) for _ in range(12)]
+    assert [event["frame_idx"] for event in events if event["keyframe"]] == [0, 5, 10]
+    assert len(keyframes) == 3
+    assert events[-1]["ball_position"] == {"yellow": (200, 100)}
+
+
+def test_moving_ball_is_tracked_between_keyframes(keyframes):
+    tracker = BallStreamTracker(keyframe_interval=1000, camera_profile=None)
+    for step in range(40):
+        truth = (100 + 4 * step, 150 + step)
+        event = tracker.process_frame(frame_with_ball(truth))
+        x, y = event["ball_position"]["yellow"]
+        assert abs(x - truth[0]) <= 3 and abs(y - truth[1]) <= 3
+        assert not event["stable"]
+    assert len(keyframes) == 1  # ROI 추적만으로 따라감
+
+
+def test_lost_ball_is_reacquired_on_forced_keyframe(keyframes):
+    tracker = BallStreamTracker(keyframe_interval=1000, camera_profile=None)
+    for _ in range(3):
+        tracker.process_frame(frame_with_ball((100, 100)))
+
+    # ROI 밖으로 순간 이동: MAX_MISSED번 넘게 놓치면 다음 프레임이 키프레임
+    events = [tracker.process_frame(frame_with_ball((600, 300))) for _ in range(MAX_MISSED + 3)]
+    assert [event["keyframe"] for event in events] == [False] * (MAX_MISSED + 1) + [True, False]
+    assert len(keyframes) == 2
+    assert tracker.tracks["yellow"].missed == 0
+    assert events[-1]["ball_position"] == {"yellow": (600, 300)}
+
+
+def test_stable_position_is_reported_once_per_stop(keyframes):
+    tracker = BallStreamTracker(keyframe_interval=1000, stable_frames=5, camera_profile=None)
+    # 움직이다가 멈춘 뒤 안정 좌표를 한 번만 보고, 다시 움직였다 멈추면 다시 보고
+    path = [(100 + 6 * step, 100) for step in range(10)] + [(154, 100)] * 40 \
+        + [(154 + 6 * step, 100) for step in range(1, 10)] + [(208, 100)] * 40
+    events = [tracker.process_frame(frame_with_ball(center)) for center in path]
+    stable = [event for event in events if event["stable"]]
+    assert len(stable) == 2
+    assert stable[0]["frame_idx"] < 50 <= stable[1]["frame_idx"]
+    for event, center in zip(stable, [(154, 100), (208, 100)]):
+        x, y = event["ball_position"]["yellow"]
+        assert abs(x - center[0]) <= 2 and abs(y - center[1]) <= 2
@@ -0,0 +1,42 @@
+import os
+
+
+import synth_table
+import topview
+import vision_bench
+
+
+def test_unreadable_corpus_files_are_skipped(tmp_path):
+    bad = tmp_path / "bad.jpg"
+    bad.write_bytes(b"not an image")
+    result = vision_bench.evaluate_sample((str(bad), 0, vision_bench.INPUT_SCALE, None))
+    assert result == {"unreadable": True}
+
+    good = {"timings": {"total": 5.0}, "table_found": True, "errors": {"red": 1.0}, "clean_errors": None,
+            "expected": 1}
+    report = vision_bench.build_report([result, good], 1.0, 10.0)
+    assert report["samples"] == 1 and report["unreadable"] == 1
+    assert report["ball_hit_rate_10.0px"] == 1.0
+    assert "ground_truth_check" not in report
+
+
+def test_misses_are_split_by_clean_render_result():
+    # white: 사진/깨끗한 탑뷰 모두 놓침(정답 문제), red: 사진에서만 놓침(파이프라인 문제)
+    result = {"errors": {"red": 80.0, "yellow": 2.0}, "clean_errors": {"red": 1.0, "yellow": 1.0},
+              "expected": 3}
+    assert vision_bench.miss_breakdown([result], 10.0) == {"ground_truth": 1, "pipeline": 1}
+
+
+def test_clean_render_matches_sample_labels(monkeypatch):
+    # 깨끗한 탑뷰는 합성 사진과 같은 공 배치이고, 그 위에서 정답 위치의 공이 다시 검출됨
+    # (천/공 이미지는 ~/aiffelthon_qfit 대신 저장소의 image 폴더에서 읽음)
+    image_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "image")
+    monkeypatch.setattr(topview, "cloth_image_path", os.path.join(image_dir, "table-cloth.png"))
+    monkeypatch.setattr(topview, "ball_image", {color: os.path.join(image_dir, f"{color}.png")
+                                                for color in topview.ball_image})
+    _, labels = synth_table.render_sample(3, seed=1, photo_size=(640, 480))
+    clean, clean_labels = synth_table.render_clean_sample(3, seed=1)
+    assert clean_labels == labels
+    assert clean.shape[:2] == (topview.HEIGHT - 2 * synth_table.CROP_Y, topview.WIDTH - 2 * synth_table.CROP_X)
+    errors = vision_bench.ball_errors(topview.find_ball(clean, "hsv"), labels)
+    assert set(errors) == set(labels) and max(errors.values()) <= 2
@@ -0,0 +1,60 @@
+import numpy as np
+
+import yolo_detector
+
+
+def make_detector(class_colors={0: "red", 1: "white", 2: "yellow"}):
+    # 모델 파일 없이 후처리(_decode)만 검사
+    detector = yolo_detector.YoloBallDetector.__new__(yolo_detector.YoloBallDetector)
+    detector.class_colors = dict(class_colors)
+    return detector
+
+
+def make_pred(boxes, num_classes=3):
+    # boxes: [(cx, cy, class_id, confidence)] -> 모델 출력 형태 (4 + 클래스 수, 후보 수)
+    pred = np.zeros((4 + num_classes, len(boxes)), dtype=np.float32)
+    for i, (cx, cy, class_id, confidence) in enumerate(boxes):
+        pred[:4, i] = (cx, cy, 20, 20)
+        pred[4 + class_id, i] = confidence
+    return pred
+
+
+def test_decode_keeps_highest_confidence_box_per_color():
+    # 같은 공에 겹친 후보가 여러 개 나와도 (NMS 전 출력) 색상별 최고 신뢰도 박스 하나만 남음
+    pred = make_pred([
+        (100, 50, 0, 0.60), (102, 51, 0, 0.90), (98, 49, 0, 0.70),   # red
+        (300, 200, 1, 0.80), (301, 199, 1, 0.85),                     # white
+        (500, 120, 2, 0.95), (503, 118, 2, 0.40),                     # yellow
+    ])
+    result = make_detector()._decode(pred, 1.0, 0, 0)
+    assert result == {"red": (102, 51), "white": (301, 199), "yellow": (500, 120)}
+
+
+def test_decode_ignores_low_confidence_and_missing_colors():
+    pred = make_pred([(100, 50, 0, 0.9), (300, 200, 1, yolo_detector.CONF_THRESHOLD - 0.01)])
+    assert make_detector()._decode(pred, 1.0, 0, 0) == {"red": (100, 50)}
+
+
+def test_decode_maps_back_from_letterbox():
+    # 레터박스(축소 + 여백) 좌표 -> 원본 이미지 좌표
+    pred = make_pred([(60, 110, 2, 0.9)])
+    assert make_detector()._decode(pred, 0.5, 10, 20) == {"yellow": (100, 180)}
+
+
+def test_detect_batch_decodes_each_image_with_its_own_letterbox():
+    detector = make_detector()
+    detector.session = None
+
+    class FakeNet:
+        # 배치 입력 크기를 확인하고 이미지별로 다른 예측을 반환
+        def setInput(self, blob):
+            self.batch = blob.shape[0]
+
+        def forward(self):
+            return np.stack([make_pred([(320, 320, 0, 0.9)]), make_pred([(320, 320, 1, 0.9)])])[:self.batch]
+
+    detector.net = FakeNet()
+    wide = np.zeros((100, 200, 3), np.uint8)
+    tall = np.zeros((200, 100, 3), np.uint8)
+    assert detector.detect_batch([wide, tall]) == [{"red": (100, 50)}, {"white": (50, 100)}]
+    assert detector.detect_batch([]) == []
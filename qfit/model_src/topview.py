@@ -4,6 +4,10 @@ import matplotlib.pyplot as plt  # 최종 표시용
 import os
 import sys
 import logging
+import time
+
+import assets
+import compositing
 
 home_dir = os.path.expanduser("~")  # 홈 디렉토리 가져오기
 
@@ -16,6 +20,12 @@ HEIGHT = 420  # 출력될 테이블 이미지 높이
 TABLE_WIDTH_MM= 800  # 테이블 실제 너비(mm)
 TABLE_HEIGHT_MM = 400  # 테이블 실제 높이(mm)
 
+# 공 검출 방식: "hsv" (색상 범위) 또는 "yolo" (학습된 YOLO 모델, yolo_detector.py)
+BALL_BACKEND = os.environ.get("QFIT_BALL_BACKEND", "hsv")
+
+# 렌즈 왜곡 보정용 카메라 프로필명 (camera_profiles.json, 없으면 보정하지 않음)
+CAMERA_PROFILE = os.environ.get("QFIT_CAMERA_PROFILE")
+
 # HSV 색상 범위 정의 (각 공의 색상을 감지하는 임계값)
 color_range = {
     "red": ((0, 120, 70),  (10, 255, 255)),  # 기존 값
@@ -24,6 +34,9 @@ color_range = {
     "yellow" : ((15, 100, 100), (35, 255, 255))
 }
 
+# 테이블 바탕 이미지(천) 경로
+cloth_image_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "table-cloth.png")
+
 # 공 이미지 경로
 ball_image = {
     "red": os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "red.png"),
@@ -33,10 +46,9 @@ ball_image = {
 
 
 def overlay_frame(base_image, frame_image_path):
-    # 프레임 이미지 로드 (4채널, BGRA)
-    frame_image = cv2.imread(frame_image_path, cv2.IMREAD_UNCHANGED)
+    # 프레임 이미지 (자원 레지스트리의 premultiplied BGRA, 4채널)
+    frame_image = assets.sprite(frame_image_path)
     if frame_image is None:
-        print(f"[오류] 프레임 이미지 불러오기 실패: {frame_image_path}")
         return base_image  # 프레임 이미지가 없을 경우 원본을 그대로 반환
 
     h_b, w_b = base_image.shape[:2]  # 당구대 테이블 크기
@@ -46,27 +58,24 @@ def overlay_frame(base_image, frame_image_path):
     x_offset = (w_f - w_b) // 2
     y_offset = (h_f - h_b) // 2
 
-    # 프레임의 복사본 생성
-    result = frame_image.copy()
+    # 프레임 크기의 검은 배경 생성 (프레임 바깥 투명 영역은 검게 표시)
+    result = np.zeros((h_f, w_f, 3), dtype=np.uint8)
 
     # base_image(공이 배치된 테이블 이미지)를 프레임 중앙에 배치
-    result[y_offset:y_offset + h_b, x_offset:x_offset + w_b, :3] = base_image
-
-    # 알파 블렌딩 (프레임 투명도 적용)
-    if frame_image.shape[2] == 4:
-        alpha = frame_image[:, :, 3] / 255.0  # 알파 채널 정규화
-        alpha = cv2.merge((alpha, alpha, alpha))
+    result[y_offset:y_offset + h_b, x_offset:x_offset + w_b] = base_image
 
-        # 프레임과 base_image를 혼합하여 최종 이미지 생성
-        result = (alpha * frame_image[:, :, :3] + (1 - alpha) * result[:, :, :3]).astype(np.uint8)
+    # 프레임을 위에 합성 (정수 premultiplied alpha 합성, 제자리 계산)
+    return compositing.composite(result, frame_image, 0, 0)
 
-    return result
+def table_mask(input_hsv):
+    # 당구대 천 색상 (파랑 + 초록) 마스크
+    table_image_blue = cv2.inRange(input_hsv, (100, 100, 100), (120, 255, 255))
+    table_image_green = cv2.inRange(input_hsv, (40,  40,  40),  (90, 255, 255))
+    return cv2.bitwise_or(table_image_blue, table_image_green)
 
 def find_corners(input_image, debug = False):
     input_hsv = cv2.cvtColor(input_image, cv2.COLOR_BGR2HSV)  # HSV 변환
-    table_image_blue = cv2.inRange(input_hsv, (100, 100, 100), (120, 255, 255))
-    table_image_green = cv2.inRange(input_hsv, (40,  40,  40),  (90, 255, 255))
-    table_image = cv2.bitwise_or(table_image_blue, table_image_green)
+    table_image = table_mask(input_hsv)
 
     k = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
     table_image_closing = cv2.morphologyEx(table_image, cv2.MORPH_CLOSE, k)
@@ -86,11 +95,8 @@ def find_corners(input_image, debug = False):
 
     return approx
 
-def get_warped_table(input_image, approx):
-    if approx is None:
-        print("유효한 모서리가 없어 테이블 워프 불가")
-        return None
-
+def get_table_matrix(approx):
+    # 모서리 4개로부터 탑뷰(WIDTH x HEIGHT) 원근 변환 행렬 계산
     side_length = [np.linalg.norm(approx[i][0] - approx[i + 1][0]) for i in range(-1, 3)]
     upper_left_point_idx = min(range(4), key = lambda i: approx[i][0][0] + approx[i][0][1])
 
@@ -105,57 +111,88 @@ def get_warped_table(input_image, approx):
                           approx[(si + 3) % 4][0]], dtype = np.float32)
     dst_point = np.array([[0, 0],[0, HEIGHT - 1], [WIDTH - 1, HEIGHT - 1],[WIDTH - 1, 0]], dtype = np.float32)
 
-    matrix = cv2.getPerspectiveTransform(src_point, dst_point)
+    return cv2.getPerspectiveTransform(src_point, dst_point)
+
+def get_warped_table(input_image, approx):
+    if approx is None:
+        print("유효한 모서리가 없어 테이블 워프 불가")
+        return None
+
+    matrix = get_table_matrix(approx)
     dst = cv2.warpPerspective(input_image, matrix, (WIDTH, HEIGHT))
     # 끝부분 자르는 동작
     dst = dst[10:-10, 20:-20]  # 필요에 따라 조정
     return dst
 
-def find_ball(image):
-    ball_position = {}
-    image_hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+def find_color_ball(image_hsv, color):
+    # 한가지 색상(color_range의 키)의 공 중심 좌표를 찾는다. 없으면 None
+    lower, upper = color_range[color]
+    mask = cv2.inRange(image_hsv, np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8))
+    
+    # 빨간 공 감지를 위해 두 개의 마스크를 병합
+    if color == "red":
+        mask2 = cv2.inRange(image_hsv, np.array(color_range["red2"][0], dtype=np.uint8), 
+                                        np.array(color_range["red2"][1], dtype=np.uint8))
+        mask = cv2.bitwise_or(mask, mask2)  # 두 개의 빨간색 마스크 병합
+
+    # 모폴로지 연산을 사용하여 노이즈 제거
+    kernel = np.ones((5, 5), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.dilate(mask, kernel, iterations=2)  # 팽창 연산 추가 (흰 공을 더 뚜렷하게 인식)
+    
+    # 컨투어(윤곽선) 탐색
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-    for color, (lower, upper) in color_range.items():
-        mask = cv2.inRange(image_hsv, np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8))
-        
-        # 빨간 공 감지를 위해 두 개의 마스크를 병합
-        if color == "red":
-            mask2 = cv2.inRange(image_hsv, np.array(color_range["red2"][0], dtype=np.uint8), 
-                                            np.array(color_range["red2"][1], dtype=np.uint8))
-            mask = cv2.bitwise_or(mask, mask2)  # 두 개의 빨간색 마스크 병합
-
-        # 모폴로지 연산을 사용하여 노이즈 제거
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-        mask = cv2.dilate(mask, kernel, iterations=2)  # 팽창 연산 추가 (흰 공을 더 뚜렷하게 인식)
-        
-        # 컨투어(윤곽선) 탐색
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        if not contours:
-            continue
+    if not contours:
+        return None
 
-        # 가장 큰 contour만 선택하여 잡음 제거
-        largest_contour = max(contours, key=cv2.contourArea)
-        area = cv2.contourArea(largest_contour)
+    # 가장 큰 contour만 선택하여 잡음 제거
+    largest_contour = max(contours, key=cv2.contourArea)
+    area = cv2.contourArea(largest_contour)
 
-        # 공 크기 임계값 설정 (너무 작은 객체 제거)
-        if area < 50:  # 작은 공도 감지 가능하도록 수정
+    # 공 크기 임계값 설정 (너무 작은 객체 제거)
+    if area < 50:  # 작은 공도 감지 가능하도록 수정
+        return None
+
+    M = cv2.moments(largest_contour)
+    if M["m00"] == 0:
+        return None
+
+    return int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"])
+
+def find_ball(image, backend = None):
+    backend = backend or BALL_BACKEND
+    if backend == "yolo":
+        import yolo_detector  # 선택적 의존성 (onnxruntime)
+        return yolo_detector.get_detector().detect(image)
+
+    ball_position = {}
+    image_hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+
+    for color in color_range:
+        center = find_color_ball(image_hsv, color)
+        if center is None:
             continue
 
-        M = cv2.moments(largest_contour)
-        if M["m00"] != 0:
-            cx = int(M["m10"] / M["m00"])
-            cy = int(M["m01"] / M["m00"])
-            
-            # 빨간 공은 병합된 마스크에서 좌표 저장
-            if color in ["red", "red2"]:
-                ball_position["red"] = (cx, cy)
-            else:
-                ball_position[color] = (cx, cy)
+        # 빨간 공은 병합된 마스크에서 좌표 저장
+        if color in ["red", "red2"]:
+            ball_position["red"] = center
+        else:
+            ball_position[color] = center
 
     return ball_position
 
+def find_ball_batch(images, backend = None):
+    # 여러 장의 탑뷰 이미지를 한 번에 검출 (yolo는 한 번의 배치 추론으로 처리)
+    # 오프라인 평가용 (bench_ball_detector.py)
+    # 서버는 이미지마다 워커 하나에서 topview -> 샷 탐색을 실행하므로 find_ball을 사용
+    # (이미지당 샷 탐색 수 초에 비해 공 검출은 수 ms라, 검출만 묶으려고 워커 호출을 나누지 않음)
+    backend = backend or BALL_BACKEND
+    if backend == "yolo":
+        import yolo_detector
+        return yolo_detector.get_detector().detect_batch(images)
+    return [find_ball(image, backend) for image in images]
+
 def place_ball_on_table(table_image, ball_position):
     result_image = table_image.copy()
     
@@ -163,9 +200,8 @@ def place_ball_on_table(table_image, ball_position):
         if color not in ball_position:
             continue  # 감지되지 않은 공은 건너뛴다.
 
-        ball_texture = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        ball_texture = assets.sprite(path)  # premultiplied BGRA (프로세스당 한 번 읽음)
         if ball_texture is None:
-            print(f"[오류] 공 이미지 불러오기 실패 : {path}")
             continue
 
         cx, cy = ball_position[color]
@@ -175,23 +211,74 @@ def place_ball_on_table(table_image, ball_position):
         cx = max(bw // 2, min(result_image.shape[1] - bw // 2, cx))
         cy = max(bh // 2, min(result_image.shape[0] - bh // 2, cy))
 
-        y1, y2 = max(0, cy - bh // 2), min(result_image.shape[0], cy + bh // 2)
-        x1, x2 = max(0, cx - bw // 2), min(result_image.shape[1], cx + bw // 2)
+        # 공 영역(ROI)만 정수 premultiplied alpha 합성 (배경 유지)
+        compositing.composite(result_image, ball_texture, cx - bw // 2, cy - bh // 2)
+
+    return result_image
 
-        ball_region = ball_texture[0:(y2 - y1), 0:(x2 - x1)]
+def load_cloth_image():
+    # 테이블 바탕 이미지(천)는 프로세스당 한 번만 읽어서 재사용 (자원 레지스트리)
+    return assets.image(cloth_image_path)
+
+def run_topview(input_image, camera_profile = CAMERA_PROFILE, timings = None, on_event = None):
+    """
+    원본 BGR 이미지에서 탑뷰 변환 및 공 검출을 수행하고 결과를 dict로 반환합니다. (파일 저장/화면 표시 없음)
+    - input_image: 축소/보정된 입력 이미지
+    - warped_table: 탑뷰 변환된 실제 테이블 이미지
+    - ball_position: {color: (cx, cy)}
+    - table_image: 테이블 천 이미지 위에 공을 배치한 이미지 (시뮬레이션 입력)
+    테이블을 찾지 못하면 None을 반환합니다.
+    timings(dict)를 넘기면 단계별 소요시간(ms)을 기록합니다.
+    on_event(name, data)를 넘기면 테이블을 찾은 직후 ("table_found", 모서리 좌표/탑뷰 크기)로 호출합니다.
+    """
+    timings = {} if timings is None else timings
+
+    # 1) 크기 조정
+    t0 = time.perf_counter()
+    input_image = cv2.resize(input_image, (int(input_image.shape[1] * 0.15), int(input_image.shape[0] * 0.15)))
 
-        if ball_texture.shape[2] == 4:
-            # 알파 채널이 있는 경우 (배경 유지)
-            alpha_ball = ball_texture[:, :, 3] / 255.0
-            alpha_ball = alpha_ball[0:(y2 - y1), 0:(x2 - x1)]
-            for c in range(3):
-                result_image[y1:y2, x1:x2, c] = (1 - alpha_ball) * result_image[y1:y2, x1:x2, c] + alpha_ball * ball_region[:, :, c]
-        else:
-            result_image[y1:y2, x1:x2] = ball_region
+    # 1.1) 렌즈 왜곡 보정 (기기 프로필이 지정된 경우, 캐시된 맵으로 remap 한 번)
+    if camera_profile:
+        import undistort
+        input_image = undistort.undistort_image(input_image, camera_profile)
+    timings["resize"] = (time.perf_counter() - t0) * 1000
 
-    return result_image
+    # 2) 테이블 모서리 찾고 원근 변환
+    t0 = time.perf_counter()
+    approx = find_corners(input_image)
+    warped_table = get_warped_table(input_image, approx)
+    timings["find_corners"] = (time.perf_counter() - t0) * 1000
+    if warped_table is None:
+        return None
+    if on_event is not None:
+        on_event("table_found", {"corners": np.asarray(approx).reshape(-1, 2).astype(int).tolist(),
+                                 "table_size": [warped_table.shape[1], warped_table.shape[0]]})
+
+    # 3) 공 찾기
+    t0 = time.perf_counter()
+    ball_position = find_ball(warped_table)
+    timings["find_ball"] = (time.perf_counter() - t0) * 1000
+
+    # 4) 테이블 천 이미지 위에 공 배치
+    cloth_image = load_cloth_image()
+    if cloth_image is None:
+        return None
+    table_image = place_ball_on_table(cloth_image, ball_position)
+
+    return {
+        "input_image": input_image,
+        "warped_table": warped_table,
+        "ball_position": ball_position,
+        "table_image": table_image,
+    }
+
+def save_ball_labels(label_text_path, ball_position):
+    with open(label_text_path, 'w') as f:
+        for color, (cx, cy) in ball_position.items():
+            f.write(f"{color} {cx} {cy}\n")
+    print(f"라벨 데이터 '{label_text_path}'에 저장")
 
-def main(image_file):
+def main(image_file, camera_profile = CAMERA_PROFILE):
     
     # 1) 원본 이미지 불러오기
     input_image = cv2.imread(image_file) #upload_image 폴더내 이미지 파일명(full path형태임)        
@@ -200,23 +287,26 @@ def main(image_file):
         print("[오류] 이미지 불러오기 실패")
         return
 
-    # 1.1) 크기 조정
-    input_image = cv2.resize(input_image, (int(input_image.shape[1] * 0.15), int(input_image.shape[0] * 0.15)))
+    # 1.0) 썸네일로 사진 품질 사전 검사 (흐림/노출/당구대/공 색상)
+    import image_quality
+    quality = image_quality.check_image_quality(input_image)
+    if not quality["ok"]:
+        print(f"[오류] 이미지 품질 불량: {quality['reason']} - {quality['message']}")
+        return
 
-    # 2) 테이블 모서리 찾고 원근 변환
-    approx = find_corners(input_image)
-    warped_table = get_warped_table(input_image, approx)
+    # 2) ~ 3) 크기 조정, 탑뷰 변환, 공 찾기, 테이블 천 위 공 배치
+    topview_result = run_topview(input_image, camera_profile)
+    if topview_result is None:
+        return
 
-    # 3) 공 찾기
-    ball_position = find_ball(warped_table)
+    input_image = topview_result["input_image"]
+    warped_table = topview_result["warped_table"]
+    ball_position = topview_result["ball_position"]
+    result_image = topview_result["table_image"]
 
     # 4) 라벨 데이터 저장
     label_text_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_image", "ball_labels.txt")
-    
-    with open(label_text_path, 'w') as f:
-        for color, (cx, cy) in ball_position.items():
-            f.write(f"{color} {cx} {cy}\n")
-    print(f"라벨 데이터 '{label_text_path}'에 저장")
+    save_ball_labels(label_text_path, ball_position)
 
     # 5) 디버그 표시 (원본)
     input_image_cpy = cv2.cvtColor(input_image, cv2.COLOR_BGR2RGB)
@@ -226,40 +316,24 @@ def main(image_file):
     plt.show()
 
     # 6) 탑뷰에 공 위치 시각적 표시
-    if warped_table is not None:
-        for color, (cx, cy) in ball_position.items():
-            cv2.circle(warped_table, (cx, cy), 9, (30, 200, 255), 2)
-            cv2.putText(warped_table,f'{color} ({cx},{cy})',(cx - 60,cy - 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (30, 200, 255), 2)
-
-        warped_table_cpy = cv2.cvtColor(warped_table, cv2.COLOR_BGR2RGB)
-        plt.imshow(warped_table_cpy)
-        plt.title("Top-View Table with Ball Positions")
-        plt.axis('off')
-        plt.show()
-
-    # 7) 테이블 천 이미지 경로
-    # 테이블 바탕 이미지(천) 불러와서 공 배치
-    cloth_image_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "table-cloth.png")
-    
-    table_image = cv2.imread(cloth_image_path)
-    if table_image is None:
-        print("[오류] 테이블 천 이미지 불러오기 실패")
-        return
+    for color, (cx, cy) in ball_position.items():
+        cv2.circle(warped_table, (cx, cy), 9, (30, 200, 255), 2)
+        cv2.putText(warped_table,f'{color} ({cx},{cy})',(cx - 60,cy - 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (30, 200, 255), 2)
+
+    warped_table_cpy = cv2.cvtColor(warped_table, cv2.COLOR_BGR2RGB)
+    plt.imshow(warped_table_cpy)
+    plt.title("Top-View Table with Ball Positions")
+    plt.axis('off')
+    plt.show()
 
-    result_image = place_ball_on_table(table_image, ball_position)
+    # 7) 테이블 천 위에 배치된 공 표시
     result_image_cpy = cv2.cvtColor(result_image, cv2.COLOR_BGR2RGB)
     plt.imshow(result_image_cpy)
     plt.title("Result - Table with Ball Positions")
     plt.axis('off')
     plt.show()
 
-    # 7.1) 원하는 경로에 저장 (옵션)
-    #billiard_result_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "billiard_result.png")
-    # 이미지 저장
-    #cv2.imwrite(billiard_result_path, result_image)
-    #logger.info(f"결과 이미지: [{billiard_result_path}] 저장")
-
     # 8) 프레임 이미지 합성 (핵심)
     frame_image_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "image", "frame.png")
     final_image = overlay_frame(result_image, frame_image_path)
@@ -280,9 +354,12 @@ def main(image_file):
 
 if __name__ == "__main__": 
     
-    if len(sys.argv) != 2:
-        print("실행내용: python topview.py <image_file>")
+    if len(sys.argv) not in (2, 3):
+        print("실행내용: python topview.py <image_file> [camera_profile]")
         sys.exit(1)
 
     image_file = sys.argv[1]
-    main(image_file)   
\ No newline at end of file
+    if len(sys.argv) == 3:
+        main(image_file, sys.argv[2])
+    else:
+        main(image_file)   
\ No newline at end of file
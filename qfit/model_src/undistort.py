@@ -0,0 +1,192 @@
+"""
+ 렌즈 왜곡 보정 (기기별 보정 맵 캐시)
+
+휴대폰 광각 렌즈의 왜곡으로 쿠션(테이블 가장자리)이 휘어 보이면
+find_corners의 approxPolyDP가 사각형 4개 모서리를 찾지 못합니다.
+기기(또는 카메라 내부 파라미터) 프로필별로 cv2.initUndistortRectifyMap 보정 맵을
+한 번만 계산해 메모리와 디스크에 캐시하고, 이미지마다 cv2.remap 한 번으로 보정합니다.
+테이블 원근 변환 행렬을 알고 있으면 왜곡 보정과 탑뷰 변환을 하나의 remap 맵으로 합칩니다.
+
+- 프로필 파일: camera_profiles.json (QFIT_CAMERA_PROFILES 환경변수로 변경 가능)
+    { "프로필명": { "image_size": [가로, 세로],
+                   "camera_matrix": [[fx, 0, cx], [0, fy, cy], [0, 0, 1]],
+                   "dist_coeffs": [k1, k2, p1, p2, k3] } }
+- 캐시 폴더: model_src/cache/undistort/프로필명_가로x세로_내부파라미터해시.npz
+  (프로필의 image_size/camera_matrix/dist_coeffs를 고치면 해시가 바뀌어 맵을 새로 계산)
+- 세로 사진(프로필은 가로 기준)은 x/y 축을 바꾼 내부 파라미터로 보정하고,
+  가로세로비가 어느 방향으로도 맞지 않는 이미지는 보정하지 않습니다.
+"""
+
+import json
+import os
+import hashlib
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+
+home_dir = os.path.expanduser("~")  # 홈 디렉토리 가져오기
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+profile_path = os.environ.get(
+    "QFIT_CAMERA_PROFILES",
+    os.path.join(home_dir, "aiffelthon_qfit", "model_src", "camera_profiles.json"))
+cache_folder = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "cache", "undistort")
+
+# 보정시 해상도와 입력 이미지의 가로세로비 허용 차이 (축소시 정수 반올림 오차 포함)
+ASPECT_TOLERANCE = 0.02
+
+_profiles = None
+_maps = {}        # {(프로필명, 가로, 세로): (map1, map2) 또는 None}  - remap용 고정소수점 맵
+_float_maps = {}  # {(프로필명, 가로, 세로): (map_x, map_y) 또는 None} - 맵 합성용 float 맵
+
+
+def load_profiles():
+    global _profiles
+    if _profiles is None:
+        try:
+            with open(profile_path, "r", encoding="utf-8") as f:
+                _profiles = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"카메라 프로필 파일 없음: {profile_path}")
+            _profiles = {}
+    return _profiles
+
+
+def get_profile(profile_name):
+    profiles = load_profiles()
+    if profile_name not in profiles:
+        raise KeyError(f"등록되지 않은 카메라 프로필: {profile_name}")
+    return profiles[profile_name]
+
+
+def profile_hash(profile):
+    # 보정 맵에 영향을 주는 값(해상도, 내부 파라미터, 왜곡 계수)의 해시 -> 디스크 캐시 파일명
+    values = {name: profile[name] for name in ("image_size", "camera_matrix", "dist_coeffs")}
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _same_aspect(size_a, size_b):
+    aspect_a, aspect_b = size_a[0] / size_a[1], size_b[0] / size_b[1]
+    return abs(aspect_a - aspect_b) <= ASPECT_TOLERANCE * aspect_a
+
+
+def _scaled_intrinsics(profile, size):
+    """
+    입력 이미지 크기(size)에 맞춘 (camera_matrix, dist_coeffs)를 반환합니다.
+    - 보정시 해상도와 입력 이미지 해상도가 다르면(예: 0.15배 축소) 내부 파라미터를 같은 비율로 조정
+    - 보정 해상도와 가로/세로가 바뀐 이미지(세로 사진)는 x/y 축을 바꿔 적용 (fx<->fy, cx<->cy, p1<->p2)
+    - 가로세로비가 어느 방향으로도 맞지 않으면 None (다른 카메라/잘린 이미지)
+    """
+    calib_w, calib_h = profile["image_size"]
+    camera_matrix = np.array(profile["camera_matrix"], dtype=np.float64)
+    dist_coeffs = np.array(profile["dist_coeffs"], dtype=np.float64)
+
+    if not _same_aspect((calib_w, calib_h), size):
+        if not _same_aspect((calib_h, calib_w), size):
+            return None
+        fx, fy = camera_matrix[0, 0], camera_matrix[1, 1]
+        cx, cy = camera_matrix[0, 2], camera_matrix[1, 2]
+        camera_matrix = np.array([[fy, 0.0, cy], [0.0, fx, cx], [0.0, 0.0, 1.0]])
+        if len(dist_coeffs) >= 4:
+            dist_coeffs[[2, 3]] = dist_coeffs[[3, 2]]  # 접선 왜곡 계수는 축을 바꾸면 서로 바뀜
+        calib_w, calib_h = calib_h, calib_w
+
+    camera_matrix[0] *= size[0] / calib_w
+    camera_matrix[1] *= size[1] / calib_h
+    return camera_matrix, dist_coeffs
+
+
+def _compute_float_maps(profile, size):
+    intrinsics = _scaled_intrinsics(profile, size)
+    if intrinsics is None:
+        return None
+    camera_matrix, dist_coeffs = intrinsics
+    return cv2.initUndistortRectifyMap(camera_matrix, dist_coeffs, None, camera_matrix, size, cv2.CV_32FC1)
+
+
+def _save_maps(cache_path, map_x, map_y):
+    # 프로세스별 임시 파일에 쓴 뒤 교체 (여러 워커가 같은 맵을 동시에 계산해도 서로의 파일을 덮어쓰지 않음)
+    os.makedirs(cache_folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp.npz", dir=cache_folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, map_x=map_x, map_y=map_y)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info(f"왜곡 보정 맵 저장: {cache_path}")
+
+
+def get_float_maps(profile_name, size):
+    """
+    (가로, 세로) 크기 이미지용 float 보정 맵 (map_x, map_y)을 반환합니다.
+    가로세로비가 프로필과 맞지 않아 보정할 수 없으면 None.
+    """
+    key = (profile_name, size[0], size[1])
+    if key not in _float_maps:
+        profile = get_profile(profile_name)
+        cache_path = os.path.join(cache_folder, f"{profile_name}_{size[0]}x{size[1]}_{profile_hash(profile)}.npz")
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                _float_maps[key] = (cached["map_x"], cached["map_y"])
+        else:
+            maps = _compute_float_maps(profile, size)
+            if maps is None:
+                logger.warning(f"카메라 프로필({profile_name}, {profile['image_size']})과 가로세로비가 다른 이미지 "
+                               f"{list(size)}: 왜곡 보정 없이 처리")
+            else:
+                _save_maps(cache_path, *maps)
+            _float_maps[key] = maps
+    return _float_maps[key]
+
+
+def get_undistort_maps(profile_name, size):
+    """
+    (가로, 세로) 크기 이미지용 보정 맵을 반환합니다. (메모리 -> 디스크 -> 새로 계산 순서로 조회)
+    보정할 수 없는 크기면 None.
+    """
+    key = (profile_name, size[0], size[1])
+    if key not in _maps:
+        float_maps = get_float_maps(profile_name, size)
+        # 고정소수점 맵(CV_16SC2)이 float 맵보다 remap이 빠르다
+        _maps[key] = cv2.convertMaps(*float_maps, cv2.CV_16SC2) if float_maps is not None else None
+    return _maps[key]
+
+
+def undistort_image(image, profile_name):
+    h, w = image.shape[:2]
+    maps = get_undistort_maps(profile_name, (w, h))
+    if maps is None:
+        return image
+    return cv2.remap(image, *maps, cv2.INTER_LINEAR)
+
+
+def get_fused_maps(profile_name, size, matrix, out_size):
+    """
+    왜곡 보정 + 원근 변환(matrix, 보정된 이미지 기준)을 합친 remap 맵을 반환합니다.
+    - 결과 맵의 각 픽셀은 왜곡된 원본 이미지에서 읽어올 좌표를 가리킵니다.
+    보정할 수 없는 크기면 None (원근 변환만 사용)
+    """
+    out_w, out_h = out_size
+    float_maps = get_float_maps(profile_name, size)
+    if float_maps is None:
+        return None
+    map_x, map_y = float_maps
+
+    # 출력 픽셀 -> (역 원근 변환) -> 보정된 이미지 좌표
+    grid = np.mgrid[0:out_h, 0:out_w].astype(np.float32)
+    points = np.stack([grid[1], grid[0]], axis=-1).reshape(-1, 1, 2)
+    undistorted = cv2.perspectiveTransform(points, np.linalg.inv(matrix)).reshape(out_h, out_w, 2)
+
+    # 보정된 이미지 좌표 -> (왜곡 보정 맵 조회) -> 왜곡된 원본 좌표
+    fused_x = cv2.remap(map_x, undistorted[..., 0], undistorted[..., 1], cv2.INTER_LINEAR,
+                        borderMode=cv2.BORDER_CONSTANT, borderValue=-1)
+    fused_y = cv2.remap(map_y, undistorted[..., 0], undistorted[..., 1], cv2.INTER_LINEAR,
+                        borderMode=cv2.BORDER_CONSTANT, borderValue=-1)
+    return cv2.convertMaps(fused_x, fused_y, cv2.CV_16SC2)
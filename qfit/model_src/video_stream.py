@@ -0,0 +1,247 @@
+"""
+ 영상 스트림 당구공 추적
+
+동영상 파일이나 프레임 반복자(iterator)를 입력받아 당구공 위치를 추적하는 스크립트입니다.
+매 프레임마다 find_corners / find_ball 전체를 수행하지 않고,
+키프레임에서만 테이블 모서리와 공을 새로 검출한 뒤 그 사이 프레임은
+공 주변 작은 영역(ROI)만 검사하는 등속도 칼만 필터로 따라갑니다.
+공이 모두 멈추면 안정된 공 위치를 보고하므로 CPU에서도 카메라 프레임 속도로 동작합니다.
+
+ 주요 기능:
+- 키프레임: topview.find_corners + topview.find_ball (전체 검출)
+- 일반 프레임: 캐시된 변환 행렬로 탑뷰 변환 후 예측 위치 주변 ROI에서만 색상 검출 + 칼만 필터 보정
+- 카메라 프로필 지정시 왜곡 보정 + 탑뷰 변환을 합친 remap 맵으로 프레임당 remap 한 번
+- 공이 모두 정지하면 stable 이벤트와 함께 탑뷰 기준 공 좌표 보고
+"""
+
+import cv2
+import numpy as np
+import os
+import sys
+import logging
+
+import topview
+import undistort
+
+home_dir = os.path.expanduser("~")  # 홈 디렉토리 가져오기
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 설정 값
+FRAME_WIDTH = 604        # 처리용 프레임 너비 (topview.main의 0.15배 축소 결과와 비슷한 크기)
+KEYFRAME_INTERVAL = 30   # 키프레임 간격 (프레임 수)
+ROI_HALF = 32            # 추적용 ROI 반 크기 (탑뷰 기준 px)
+MAX_MISSED = 5           # 연속으로 놓치면 다음 프레임을 키프레임으로 처리
+STOP_SPEED = 0.5         # 정지 판정 속도 (탑뷰 기준 px/frame)
+STABLE_FRAMES = 15       # 이 프레임 수만큼 모두 정지해 있으면 안정 상태로 판정
+
+# get_warped_table()에서 잘라내는 가장자리 크기 (y, x)
+CROP_Y, CROP_X = 10, 20
+
+
+#-------------------------------------------------------#
+# 공 한 개의 등속도 칼만 필터 (상태: x, y, vx, vy)
+#-------------------------------------------------------#
+class BallTrack:
+    def __init__(self, position):
+        kf = cv2.KalmanFilter(4, 2, 0, cv2.CV_32F)
+        kf.transitionMatrix = np.array([[1, 0, 1, 0],
+                                        [0, 1, 0, 1],
+                                        [0, 0, 1, 0],
+                                        [0, 0, 0, 1]], dtype=np.float32)
+        kf.measurementMatrix = np.array([[1, 0, 0, 0],
+                                         [0, 1, 0, 0]], dtype=np.float32)
+        kf.processNoiseCov = np.eye(4, dtype=np.float32) * 1e-2
+        kf.measurementNoiseCov = np.eye(2, dtype=np.float32) * 1.0
+        kf.errorCovPost = np.eye(4, dtype=np.float32)
+        kf.statePost = np.array([[position[0]], [position[1]], [0], [0]], dtype=np.float32)
+        self.kf = kf
+        self.missed = 0
+
+    def predict(self):
+        state = self.kf.predict()
+        return float(state[0, 0]), float(state[1, 0])
+
+    def correct(self, position):
+        self.kf.correct(np.array([[position[0]], [position[1]]], dtype=np.float32))
+        self.missed = 0
+
+    @property
+    def position(self):
+        return float(self.kf.statePost[0, 0]), float(self.kf.statePost[1, 0])
+
+    @property
+    def speed(self):
+        return float(np.hypot(self.kf.statePost[2, 0], self.kf.statePost[3, 0]))
+
+
+#-------------------------------------------------------#
+# 키프레임 검출 + 프레임 간 추적을 담당하는 스트림 추적기
+#-------------------------------------------------------#
+class BallStreamTracker:
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, roi_half=ROI_HALF,
+                 stop_speed=STOP_SPEED, stable_frames=STABLE_FRAMES, camera_profile=topview.CAMERA_PROFILE):
+        self.camera_profile = camera_profile
+        self.keyframe_interval = keyframe_interval
+        self.roi_half = roi_half
+        self.stop_speed = stop_speed
+        self.stable_frames = stable_frames
+
+        self.frame_idx = 0
+        self.matrix = None          # 처리용 프레임 -> 탑뷰 원근 변환 행렬
+        self.fused_maps = None      # 왜곡 보정 + 탑뷰 변환 합성 맵 (카메라 프로필 사용시)
+        self.tracks = {}            # {color: BallTrack}
+        self.force_keyframe = True
+        self.still_count = 0
+        self.reported = False       # 이번 정지 구간의 안정 좌표를 이미 보고했는지
+
+    def _warp(self, frame):
+        # 캐시된 변환 행렬로 탑뷰 변환 (키프레임과 같은 좌표계를 유지)
+        if self.fused_maps is not None:
+            warped = cv2.remap(frame, *self.fused_maps, cv2.INTER_LINEAR)
+        else:
+            warped = cv2.warpPerspective(frame, self.matrix, (topview.WIDTH, topview.HEIGHT))
+        return warped[CROP_Y:-CROP_Y, CROP_X:-CROP_X]
+
+    def _keyframe(self, frame):
+        if self.camera_profile:
+            approx = topview.find_corners(undistort.undistort_image(frame, self.camera_profile))
+        else:
+            approx = topview.find_corners(frame)
+        if approx is None:
+            if self.matrix is None:
+                return False
+            logger.info("키프레임에서 테이블을 찾지 못해 이전 변환 행렬을 유지")
+        else:
+            self.matrix = topview.get_table_matrix(approx)
+            if self.camera_profile:
+                h, w = frame.shape[:2]
+                self.fused_maps = undistort.get_fused_maps(self.camera_profile, (w, h), self.matrix,
+                                                           (topview.WIDTH, topview.HEIGHT))
+
+        ball_position = topview.find_ball(self._warp(frame))
+
+        # 기존 트랙은 유지하면서 위치만 보정 (속도 추정이 끊기지 않도록)
+        # ROI에서 놓친 트랙은 새로 시작 (보정만 하면 예측 위치가 검출 위치에 못 미쳐 다시 놓침)
+        for color, center in ball_position.items():
+            if color in self.tracks and self.tracks[color].missed == 0:
+                self.tracks[color].predict()
+                self.tracks[color].correct(center)
+            else:
+                self.tracks[color] = BallTrack(center)
+        for color in list(self.tracks):
+            if color not in ball_position:
+                del self.tracks[color]
+        return True
+
+    def _track(self, frame):
+        warped = self._warp(frame)
+        h, w = warped.shape[:2]
+        for color, track in self.tracks.items():
+            fx, fy = track.predict()
+            x1, y1 = max(0, int(fx) - self.roi_half), max(0, int(fy) - self.roi_half)
+            x2, y2 = min(w, int(fx) + self.roi_half), min(h, int(fy) + self.roi_half)
+            if x2 <= x1 or y2 <= y1:
+                track.missed += 1
+                continue
+
+            # 예측 위치 주변 ROI에서만 HSV 변환 및 색상 검출
+            roi_hsv = cv2.cvtColor(warped[y1:y2, x1:x2], cv2.COLOR_BGR2HSV)
+            center = topview.find_color_ball(roi_hsv, color)
+            if center is None:
+                track.missed += 1
+                continue
+            track.correct((center[0] + x1, center[1] + y1))
+
+        if any(track.missed > MAX_MISSED for track in self.tracks.values()):
+            self.force_keyframe = True
+
+    def process_frame(self, frame):
+        """
+        프레임 한 장을 처리하고 이벤트(dict)를 반환합니다.
+        - ball_position: 탑뷰 기준 {color: (cx, cy)}
+        - keyframe: 전체 검출을 수행했는지 여부
+        - stable: 공이 모두 멈춰 안정된 좌표인지 여부 (정지 구간마다 한 번만 True)
+        """
+        scale = FRAME_WIDTH / frame.shape[1]
+        if scale < 1.0:
+            frame = cv2.resize(frame, (FRAME_WIDTH, int(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+
+        is_keyframe = self.force_keyframe or self.frame_idx % self.keyframe_interval == 0
+        if is_keyframe:
+            self.force_keyframe = not self._keyframe(frame)
+        elif self.tracks:
+            self._track(frame)
+
+        moving = any(track.speed > self.stop_speed for track in self.tracks.values())
+        if moving or not self.tracks:
+            self.still_count = 0
+            self.reported = False
+        else:
+            self.still_count += 1
+
+        stable = not self.reported and self.still_count >= self.stable_frames
+        if stable:
+            self.reported = True
+
+        event = {
+            "frame_idx": self.frame_idx,
+            "keyframe": is_keyframe,
+            "ball_position": {color: tuple(int(round(v)) for v in track.position)
+                              for color, track in self.tracks.items()},
+            "stable": stable,
+        }
+        self.frame_idx += 1
+        return event
+
+
+#-------------------------------------------------------#
+# 동영상 파일(또는 카메라 번호)에서 프레임을 순서대로 읽는다
+#-------------------------------------------------------#
+def iter_video_frames(source):
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise IOError(f"영상 열기 실패: {source}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+#-------------------------------------------------------#
+# 프레임 반복자를 받아 프레임별 추적 이벤트를 생성
+#-------------------------------------------------------#
+def stream_ball_positions(frames, **tracker_options):
+    tracker = BallStreamTracker(**tracker_options)
+    for frame in frames:
+        yield tracker.process_frame(frame)
+
+
+def main(video_file):
+    label_text_path = os.path.join(home_dir, "aiffelthon_qfit", "model_src", "result_image", "ball_labels.txt")
+
+    for event in stream_ball_positions(iter_video_frames(video_file)):
+        if not event["stable"]:
+            continue
+
+        logger.info(f"[안정] frame {event['frame_idx']}: {event['ball_position']}")
+
+        # topview.py와 같은 형식으로 마지막 안정 좌표를 저장
+        with open(label_text_path, 'w') as f:
+            for color, (cx, cy) in event["ball_position"].items():
+                f.write(f"{color} {cx} {cy}\n")
+        print(f"라벨 데이터 '{label_text_path}'에 저장")
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) != 2:
+        print("실행내용: python video_stream.py <video_file>")
+        sys.exit(1)
+
+    main(sys.argv[1])
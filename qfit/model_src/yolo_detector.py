@@ -0,0 +1,156 @@
+"""
+ YOLO 기반 당구공 검출 (CPU 추론)
+
+학습된 YOLOv8 모델(models/ms/best_Mansoon.pt, models/jh/best_Jihye.pt)을
+ONNX 그래프로 한 번 변환해 두고, 프로세스당 한 번만 로드하여 CPU에서 추론합니다.
+여러 장의 이미지를 하나의 배치로 묶어 한 번의 추론 호출로 처리할 수 있으며,
+결과는 topview.find_ball()과 같은 {color: (cx, cy)} 형태로 반환합니다.
+
+ 사용 라이브러리:
+- onnxruntime: ONNX 그래프 CPU 추론 (없으면 OpenCV DNN 모듈 사용)
+- ultralytics: .pt -> .onnx 최초 변환시에만 필요
+"""
+
+import ast
+import os
+import logging
+
+import cv2
+import numpy as np
+
+home_dir = os.path.expanduser("~")  # 홈 디렉토리 가져오기
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 설정 값 (환경변수로 변경 가능)
+MODEL_PATH = os.environ.get(
+    "QFIT_YOLO_MODEL",
+    os.path.join(home_dir, "aiffelthon_qfit", "models", "ms", "best_Mansoon.pt"))
+INPUT_SIZE = int(os.environ.get("QFIT_YOLO_IMGSZ", "640"))  # 추론 입력 크기 (정사각형)
+CONF_THRESHOLD = 0.25  # 최소 신뢰도
+NUM_THREADS = int(os.environ.get("QFIT_YOLO_THREADS", "0"))  # 0이면 onnxruntime 기본값
+
+BALL_COLORS = ("red", "white", "yellow")
+
+
+#-------------------------------------------------------#
+# .pt 모델을 ONNX로 변환 (같은 폴더에 .onnx가 있으면 재사용, 변환 결과는 .gitignore로 제외)
+#-------------------------------------------------------#
+def export_onnx(model_path):
+    onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+    if os.path.exists(onnx_path):
+        return onnx_path
+
+    from ultralytics import YOLO  # 변환할 때만 필요
+
+    logger.info(f"ONNX 변환 시작: {model_path}")
+    exported = YOLO(model_path).export(format="onnx", imgsz=INPUT_SIZE, dynamic=True, simplify=True)
+    logger.info(f"ONNX 변환 완료: {exported}")
+    return exported
+
+
+#-------------------------------------------------------#
+# 모델 클래스명 -> 공 색상 매핑 (예: "red_ball" -> "red")
+#-------------------------------------------------------#
+def _class_colors(names):
+    colors = {}
+    for idx, name in names.items():
+        for color in BALL_COLORS:
+            if color in str(name).lower():
+                colors[int(idx)] = color
+                break
+        else:
+            logger.warning(f"공 색상으로 매핑할 수 없는 클래스: {idx}={name}")
+    return colors
+
+
+class YoloBallDetector:
+    def __init__(self, model_path=MODEL_PATH):
+        onnx_path = model_path if model_path.endswith(".onnx") else export_onnx(model_path)
+
+        try:
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if NUM_THREADS > 0:
+                options.intra_op_num_threads = NUM_THREADS
+            self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+            self.input_name = self.session.get_inputs()[0].name
+            meta = self.session.get_modelmeta().custom_metadata_map
+            names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+            self.net = None
+        except ImportError:
+            logger.info("onnxruntime 미설치: OpenCV DNN으로 추론")
+            self.session = None
+            self.net = cv2.dnn.readNetFromONNX(onnx_path)
+            names = {}
+
+        if not names:
+            names = {i: color for i, color in enumerate(BALL_COLORS)}
+        self.class_colors = _class_colors(names)
+        logger.info(f"YOLO 모델 로드 완료: {onnx_path}, 클래스={names}")
+
+    def _letterbox(self, image):
+        # 비율을 유지하며 INPUT_SIZE 정사각형에 맞추고 남는 부분은 회색(114)으로 채움
+        h, w = image.shape[:2]
+        ratio = INPUT_SIZE / max(h, w)
+        nh, nw = int(round(h * ratio)), int(round(w * ratio))
+        pad_x, pad_y = (INPUT_SIZE - nw) // 2, (INPUT_SIZE - nh) // 2
+
+        canvas = np.full((INPUT_SIZE, INPUT_SIZE, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        return canvas, ratio, pad_x, pad_y
+
+    def _decode(self, pred, ratio, pad_x, pad_y):
+        # pred: (4 + 클래스 수, 후보 수) -> 색상별로 신뢰도가 가장 높은 박스의 중심 좌표
+        # 3구 테이블에는 색상별로 공이 하나뿐이라 NMS 없이 클래스별 최고 신뢰도 박스 하나만 남김
+        # (NMS는 최고 신뢰도 박스를 지우지 않으므로 NMS 후 클래스별 1개를 고른 결과와 같음)
+        pred = pred.T
+        scores = pred[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+
+        ball_position = {}
+        for class_id, color in self.class_colors.items():
+            candidates = np.where((class_ids == class_id) & (confidences >= CONF_THRESHOLD))[0]
+            if len(candidates) == 0:
+                continue
+            best = candidates[confidences[candidates].argmax()]
+            cx = (pred[best, 0] - pad_x) / ratio
+            cy = (pred[best, 1] - pad_y) / ratio
+            ball_position[color] = (int(cx), int(cy))
+        return ball_position
+
+    def detect_batch(self, images):
+        """
+        여러 장의 BGR 이미지를 하나의 배치로 추론하여 이미지별 {color: (cx, cy)} 목록을 반환합니다.
+        """
+        if not images:
+            return []
+
+        letterboxed = [self._letterbox(image) for image in images]
+        blob = cv2.dnn.blobFromImages([lb[0] for lb in letterboxed], scalefactor=1 / 255.0, swapRB=True)
+
+        if self.session is not None:
+            output = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            self.net.setInput(blob)
+            output = self.net.forward()
+
+        return [self._decode(output[i], *letterboxed[i][1:]) for i in range(len(images))]
+
+    def detect(self, image):
+        return self.detect_batch([image])[0]
+
+
+#-------------------------------------------------------#
+# 프로세스당 한 번만 모델을 로드하여 재사용
+#-------------------------------------------------------#
+_detectors = {}
+
+def get_detector(model_path=MODEL_PATH):
+    if model_path not in _detectors:
+        _detectors[model_path] = YoloBallDetector(model_path)
+    return _detectors[model_path]